@@ -0,0 +1,4 @@
+"""
+Arcadis Fit - Shared AI service utilities
+Helpers shared by the nutrition and workout services
+"""
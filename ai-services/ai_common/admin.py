@@ -0,0 +1,22 @@
+"""
+Access control for the services' admin endpoints
+"""
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request
+
+# Without an ADMIN_TOKEN, admin endpoints only answer clients on the same host
+LOCAL_ADMIN_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+def require_admin(request: Request, x_admin_token: Optional[str] = Header(None)) -> None:
+    """FastAPI dependency: the X-Admin-Token header when ADMIN_TOKEN is set, else a local client"""
+    token = os.getenv("ADMIN_TOKEN", "")
+    if token:
+        if not hmac.compare_digest(x_admin_token or "", token):
+            raise HTTPException(status_code=403, detail="Admin token required")
+    elif request.client is None or request.client.host not in LOCAL_ADMIN_HOSTS:
+        raise HTTPException(status_code=403, detail="Admin endpoints are only available locally")
@@ -0,0 +1,304 @@
+"""
+Offline bulk plan generation over a JSONL file of requests
+Chunks fan out to a process pool and are written back in input order, with a
+checkpoint after every chunk so an interrupted run resumes where it stopped
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ai_common.columnar_export import EXPORT_FORMATS, ColumnarFileWriter
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("jsonl", "sqlite") + EXPORT_FORMATS
+
+# One generated record: (input line number, user id, JSON payload or None, error or None)
+BulkResult = Tuple[int, str, Optional[bytes], Optional[str]]
+
+# A generated chunk: its records, counters for the report and, for columnar
+# output, the export rows of its plans as column lists
+ChunkOutput = Tuple[List[BulkResult], Dict[str, int], Optional[Dict[str, List[Any]]]]
+
+
+def read_chunks(
+    path: str, chunk_size: int, offset: int = 0, first_line: int = 0
+) -> Iterator[Tuple[int, int, List[Tuple[int, str]]]]:
+    """
+    Stream (end offset, last line number, [(line number, text)]) chunks from a
+    JSONL file, starting at a byte offset; blank lines are skipped but counted
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk: List[Tuple[int, str]] = []
+        line_number = first_line
+        for raw in f:
+            line_number += 1
+            offset += len(raw)
+            text = raw.decode("utf-8").strip()
+            if text:
+                chunk.append((line_number, text))
+            if len(chunk) >= chunk_size:
+                yield offset, line_number, chunk
+                chunk = []
+        if chunk:
+            yield offset, line_number, chunk
+
+
+class Checkpoint:
+    """Progress of a bulk run, saved as JSON next to the output after every chunk"""
+
+    def __init__(self, path: str, settings: Dict[str, Any]):
+        self.path = path
+        self.settings = settings
+        self.state: Dict[str, Any] = {
+            "input_offset": 0, "input_lines": 0, "output_position": 0,
+            "chunks": 0, "records": 0, "errors": 0
+        }
+
+    def load(self) -> bool:
+        """Resume from a saved checkpoint; runs with other settings cannot be resumed"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            saved = json.load(f)
+        for name, value in self.settings.items():
+            if saved.get("settings", {}).get(name) != value:
+                raise ValueError(
+                    f"Checkpoint {self.path} was written with {name}={saved.get('settings', {}).get(name)!r}, "
+                    f"not {value!r}; rerun with --restart"
+                )
+        self.state.update(saved["state"])
+        return True
+
+    def save(self) -> None:
+        # Replace atomically, so a crash leaves either the old or the new checkpoint
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"settings": self.settings, "state": self.state, "saved_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class JsonlWriter:
+    """Appends one JSON line per record; the file is cut back to the checkpoint on resume"""
+
+    columnar = False
+
+    def __init__(self, path: str, resume_at: Optional[int] = None):
+        resume_at = resume_at if resume_at is not None and os.path.exists(path) else 0
+        self.file = open(path, "r+b" if resume_at else "wb")
+        self.file.truncate(resume_at)
+        self.file.seek(resume_at)
+
+    def write(self, results: List[BulkResult], columns: Optional[Dict[str, List[Any]]] = None) -> None:
+        lines = []
+        for line, user_id, payload, error in results:
+            head = b'{"line":' + str(line).encode() + b',"user_id":' + json.dumps(user_id).encode()
+            if payload is not None:
+                lines.append(head + b',"plan":' + payload + b"}\n")
+            else:
+                lines.append(head + b',"error":' + json.dumps(error).encode() + b"}\n")
+        self.file.write(b"".join(lines))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def durable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def position(self) -> int:
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class SqliteWriter:
+    """Upserts records by input line, so chunks rewritten after a crash replace themselves"""
+
+    columnar = False
+
+    def __init__(self, path: str, resume_at: Optional[int] = None):
+        if resume_at is None and os.path.exists(path):
+            os.remove(path)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plans (
+                line INTEGER PRIMARY KEY,
+                user_id TEXT,
+                plan TEXT,
+                error TEXT
+            )
+            """
+        )
+
+    def write(self, results: List[BulkResult], columns: Optional[Dict[str, List[Any]]] = None) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO plans (line, user_id, plan, error) VALUES (?, ?, ?, ?)",
+                [(line, user_id, payload.decode() if payload is not None else None, error)
+                 for line, user_id, payload, error in results]
+            )
+
+    def durable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def position(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class ColumnarWriter:
+    """
+    Streams the export rows of the plans into one Parquet or Arrow file. The
+    file is only readable once its footer is written at the end of the run,
+    so the checkpoint moves then: an interrupted run starts over, with the
+    run's plan cache serving the plans it had already generated, and a run
+    resumed after a finished one (e.g. on a longer input) carries its rows over.
+    """
+
+    columnar = True
+
+    def __init__(
+        self,
+        path: str,
+        export_columns: Sequence[Tuple[str, str]],
+        export_format: str,
+        resume_at: Optional[int] = None,
+        row_group_rows: int = 256 * 1024
+    ):
+        self.file = ColumnarFileWriter(path, export_columns, export_format, row_group_rows, resume_at)
+
+    def write(self, results: List[BulkResult], columns: Optional[Dict[str, List[Any]]] = None) -> None:
+        if columns:
+            self.file.append(columns)
+
+    def durable(self) -> bool:
+        return self.file.closed
+
+    def flush(self) -> None:
+        # The final flush of the run finishes the file
+        self.file.close()
+
+    def position(self) -> int:
+        return self.file.rows
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def open_writer(
+    output_format: str,
+    path: str,
+    resume_at: Optional[int] = None,
+    export_columns: Optional[Sequence[Tuple[str, str]]] = None,
+    row_group_rows: int = 256 * 1024
+):
+    """Writer for an output format, starting over unless resuming at a checkpointed position"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    if output_format in EXPORT_FORMATS:
+        return ColumnarWriter(path, export_columns, output_format, resume_at, row_group_rows)
+    return (JsonlWriter if output_format == "jsonl" else SqliteWriter)(path, resume_at)
+
+
+def run_bulk_pipeline(
+    executor: Executor,
+    process_chunk: Callable[[List[Tuple[int, str]]], ChunkOutput],
+    input_path: str,
+    writer,
+    checkpoint: Checkpoint,
+    chunk_size: int = 200,
+    max_pending: int = 8,
+    progress_seconds: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Generate every chunk of the input after the checkpoint. At most max_pending
+    chunks are in flight; finished chunks are written in input order and the
+    checkpoint advances past each one once it is durably written. Returns the
+    throughput report.
+    """
+    state = checkpoint.state
+    chunks = read_chunks(input_path, chunk_size, state["input_offset"], state["input_lines"])
+    pending: Dict[int, Future] = {}
+    input_ends: Dict[int, Tuple[int, int]] = {}
+    next_submit = next_write = 0
+    exhausted = False
+    records = errors = 0
+    counters: Dict[str, int] = {}
+    start = last_progress = time.perf_counter()
+
+    while True:
+        while not exhausted and len(pending) < max_pending:
+            try:
+                end_offset, end_line, chunk = next(chunks)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[next_submit] = executor.submit(process_chunk, chunk)
+            input_ends[next_submit] = (end_offset, end_line)
+            next_submit += 1
+        if not pending:
+            break
+
+        # Waiting on the oldest chunk keeps the output in input order
+        wait([pending[next_write]], return_when=FIRST_COMPLETED)
+        while next_write in pending and pending[next_write].done():
+            results, chunk_counters, columns = pending.pop(next_write).result()
+            writer.write(results, columns)
+
+            chunk_errors = sum(1 for result in results if result[3] is not None)
+            records += len(results)
+            errors += chunk_errors
+            for name, value in chunk_counters.items():
+                counters[name] = counters.get(name, 0) + value
+
+            state["input_offset"], state["input_lines"] = input_ends.pop(next_write)
+            state["chunks"] += 1
+            state["records"] += len(results)
+            state["errors"] += chunk_errors
+            if writer.durable():
+                state["output_position"] = writer.position()
+                checkpoint.save()
+            next_write += 1
+
+        now = time.perf_counter()
+        if now - last_progress >= progress_seconds:
+            logger.info(f"Bulk run: {state['records']} records, {records / (now - start):.1f} records/s")
+            last_progress = now
+
+    writer.flush()
+    state["output_position"] = writer.position()
+    checkpoint.save()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "records": records,
+        "errors": errors,
+        "chunks": next_write,
+        "elapsed_s": round(elapsed, 3),
+        "records_per_s": round(records / elapsed, 1) if elapsed > 0 else 0.0,
+        "total_records": state["records"],
+        "total_errors": state["errors"],
+        **counters
+    }
@@ -0,0 +1,237 @@
+"""
+Columnar export of generated plans for analytics
+Rows are buffered as column lists and streamed into one Parquet or Arrow IPC
+file, a row group (record batch) at a time, so memory stays bounded by the
+row group size
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("parquet", "arrow")
+
+
+def arrow_schema(columns: Sequence[Tuple[str, str]]):
+    """Arrow schema for the services' (name, type name) export columns"""
+    import pyarrow as pa
+    types = {
+        "string": pa.string(),
+        "date": pa.date32(),
+        "int32": pa.int32(),
+        "float64": pa.float64(),
+        "bool": pa.bool_()
+    }
+    return pa.schema([(name, types[type_name]) for name, type_name in columns])
+
+
+def merge_columns(target: Dict[str, List[Any]], columns: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """Append one set of column lists to another"""
+    for name, values in columns.items():
+        target.setdefault(name, []).extend(values)
+    return target
+
+
+class ColumnarFileWriter:
+    """
+    Streams rows into a single Parquet or Arrow IPC file through one
+    pq.ParquetWriter / ipc.new_file writer, with a row group per
+    row_group_rows rows (or per flush). The file only gets its footer on
+    close, so rows are written to <path>.tmp and the file appears complete
+    at path once closed. Resuming at a row count starts the new file with
+    that many rows of the previous one, copied a row group at a time.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[Tuple[str, str]],
+        export_format: str = "parquet",
+        row_group_rows: int = 256 * 1024,
+        resume_at: Optional[int] = None,
+        compression: str = "zstd"
+    ):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format} (expected one of {', '.join(EXPORT_FORMATS)})")
+        self.path = path
+        self.schema = arrow_schema(columns)
+        self.export_format = export_format
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.rows = 0
+        self.appended = 0
+        self.row_groups = 0
+        self.closed = False
+        self._writer = None
+        self._sink = None
+        self._buffer: Dict[str, List[Any]] = {name: [] for name in self.schema.names}
+        self._buffered = 0
+        self._resume_at = resume_at if resume_at and os.path.exists(path) else 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if not self._resume_at and os.path.exists(path):
+            os.remove(path)
+
+    def append(self, columns: Dict[str, List[Any]]) -> None:
+        """Buffer rows given as column lists, writing a row group once one is full"""
+        merge_columns(self._buffer, columns)
+        self._buffered = len(self._buffer[self.schema.names[0]])
+        self.appended = self.rows + self._buffered
+        if self._buffered >= self.row_group_rows:
+            self._write_row_group()
+
+    def flush(self) -> None:
+        """Write whatever is buffered as a smaller row group"""
+        if self._buffered:
+            self._write_row_group()
+
+    def close(self) -> None:
+        """Flush, write the footer and move the finished file into place"""
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        if self._writer is None:
+            # Nothing appended: a resumed file stays as it was, a new one is written empty
+            if self._resume_at:
+                return
+            self._open()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        self._writer = self._sink = None
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def _open(self) -> None:
+        import pyarrow as pa
+
+        temporary = f"{self.path}.tmp"
+        if self.export_format == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(temporary, self.schema, compression=self.compression)
+        else:
+            self._sink = pa.OSFile(temporary, "wb")
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+        if self._resume_at:
+            self._copy_previous(self._resume_at)
+
+    def _copy_previous(self, n_rows: int) -> None:
+        """Start with the first n_rows rows of the finished file at path"""
+        import pyarrow as pa
+
+        if self.export_format == "parquet":
+            import pyarrow.parquet as pq
+            previous = pq.ParquetFile(self.path)
+            groups = (previous.read_row_group(i) for i in range(previous.num_row_groups))
+        else:
+            source = pa.memory_map(self.path)
+            previous = pa.ipc.open_file(source)
+            groups = (pa.Table.from_batches([previous.get_batch(i)]) for i in range(previous.num_record_batches))
+        for table in groups:
+            if self.rows >= n_rows:
+                break
+            table = table.slice(0, n_rows - self.rows)
+            self._writer.write_table(table)
+            self.rows += table.num_rows
+            self.row_groups += 1
+        if self.export_format == "arrow":
+            source.close()
+
+    def _write_row_group(self) -> None:
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._open()
+        arrays = []
+        for field in self.schema:
+            values = self._buffer[field.name]
+            if pa.types.is_date32(field.type):
+                # Dates arrive as ISO strings from the plan JSON
+                arrays.append(pa.array(values, pa.string()).cast(field.type))
+            else:
+                arrays.append(pa.array(values, field.type))
+            self._buffer[field.name] = []
+        n_rows, self._buffered = self._buffered, 0
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        if self.export_format == "parquet":
+            self._writer.write_table(table, row_group_size=n_rows)
+        else:
+            self._writer.write_table(table, max_chunksize=n_rows)
+        self.rows += n_rows
+        self.row_groups += 1
+
+
+class PlanExporter:
+    """
+    Exports the rows of every plan a service generates into files under a
+    directory, one file per file_rows rows (and per process run). Thread-safe,
+    as plans are generated by request handlers and job workers alike.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        columns: Sequence[Tuple[str, str]],
+        export_rows: Callable[[Dict[str, Any]], Dict[str, List[Any]]],
+        export_format: str = "parquet",
+        row_group_rows: int = 64 * 1024,
+        file_rows: int = 1024 * 1024,
+        prefix: str = "plans"
+    ):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format} (expected one of {', '.join(EXPORT_FORMATS)})")
+        self.directory = directory
+        self.columns = columns
+        self.export_rows = export_rows
+        self.export_format = export_format
+        self.row_group_rows = row_group_rows
+        self.file_rows = file_rows
+        self.prefix = prefix
+        self.files: List[str] = []
+        self.plans = 0
+        self.rows = 0
+        self._writer: Optional[ColumnarFileWriter] = None
+        self._lock = threading.Lock()
+
+    def export(self, plan: Dict[str, Any]) -> None:
+        """Append the rows of one encoded plan; export failures are logged, never raised to the caller"""
+        try:
+            columns = self.export_rows(plan)
+            with self._lock:
+                if self._writer is None:
+                    self._writer = self._open()
+                self._writer.append(columns)
+                self.plans += 1
+                if self._writer.appended >= self.file_rows:
+                    self._close_file()
+        except Exception as e:
+            logger.error(f"Plan export failed: {e}")
+
+    def close(self) -> None:
+        """Finish the current file, if any"""
+        with self._lock:
+            if self._writer is not None:
+                self._close_file()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = self._writer.appended if self._writer is not None else 0
+            return {"directory": self.directory, "format": self.export_format, "plans": self.plans,
+                    "rows": self.rows + pending, "files": list(self.files)}
+
+    def _open(self) -> ColumnarFileWriter:
+        name = f"{self.prefix}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{len(self.files):05d}.{self.export_format}"
+        return ColumnarFileWriter(
+            os.path.join(self.directory, name), self.columns, self.export_format, self.row_group_rows
+        )
+
+    def _close_file(self) -> None:
+        writer, self._writer = self._writer, None
+        writer.close()
+        self.rows += writer.rows
+        self.files.append(writer.path)
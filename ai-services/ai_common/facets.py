@@ -0,0 +1,116 @@
+"""
+Faceted filtering over an in-memory catalog
+Each facet value keeps a packed bitset of the catalog rows carrying it
+"""
+
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Number of set bits in each byte value, to count packed bitsets
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+
+class FacetIndex:
+    """Posting lists per facet value with combined filters, cursor pagination and facet counts"""
+
+    def __init__(self, facets: Dict[str, Sequence[Iterable[Any]]], n_items: int, version: str = ""):
+        self.n_items = n_items
+        self.version = version
+        self.values: Dict[str, List[str]] = {}
+        self.value_index: Dict[str, Dict[str, int]] = {}
+        self.bitsets: Dict[str, np.ndarray] = {}  # facet -> (n_values, n_bytes) uint8
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+        n_bytes = (n_items + 7) // 8
+        for facet, item_values in facets.items():
+            per_item = [{str(value) for value in values} for values in item_values]
+            values = sorted(set().union(*per_item)) if per_item else []
+            index = {value: col for col, value in enumerate(values)}
+
+            rows = np.fromiter((row for row, item in enumerate(per_item) for _ in item), dtype=np.int64)
+            cols = np.fromiter((index[value] for item in per_item for value in item), dtype=np.int64)
+            bitsets = np.zeros((len(values), n_bytes), dtype=np.uint8)
+            np.bitwise_or.at(bitsets, (cols, rows >> 3), (128 >> (rows & 7)).astype(np.uint8))
+
+            self.values[facet] = values
+            self.value_index[facet] = index
+            self.bitsets[facet] = bitsets
+            self.totals[facet] = dict(zip(values, np.bincount(cols, minlength=len(values)).tolist()))
+
+        self._everything = np.packbits(np.ones(n_items, dtype=bool)) if n_items else np.zeros(0, dtype=np.uint8)
+
+    def _any_of(self, facet: str, values: Iterable[Any]) -> np.ndarray:
+        """Bitset of rows carrying any of the values of a facet"""
+        if facet not in self.bitsets:
+            raise ValueError(f"Unknown facet: {facet}")
+        cols = [self.value_index[facet][str(value)] for value in values if str(value) in self.value_index[facet]]
+        if not cols:
+            return np.zeros_like(self._everything)
+        return np.bitwise_or.reduce(self.bitsets[facet][cols], axis=0)
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Iterable[Any]]] = None,
+        exclude: Optional[Dict[str, Iterable[Any]]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Rows matching every filtered facet (any of its values) and none of the
+        excluded values, one page after the cursor. Facet counts for a facet
+        apply all the other filters, so sibling values stay selectable.
+        """
+        filters = {facet: list(values) for facet, values in (filters or {}).items() if values}
+        exclude = {facet: list(values) for facet, values in (exclude or {}).items() if values}
+
+        allowed = self._everything.copy()
+        for facet, values in exclude.items():
+            allowed &= ~self._any_of(facet, values)
+        matches = {facet: self._any_of(facet, values) for facet, values in filters.items()}
+
+        result = allowed.copy()
+        for bitset in matches.values():
+            result &= bitset
+
+        if not filters and not exclude:
+            facets = {facet: dict(totals) for facet, totals in self.totals.items()}
+        else:
+            facets = {}
+            for facet, bitsets in self.bitsets.items():
+                others = allowed.copy()
+                for other, bitset in matches.items():
+                    if other != facet:
+                        others &= bitset
+                counts = POPCOUNT[bitsets & others].sum(axis=1)
+                facets[facet] = {
+                    value: count for value, count in zip(self.values[facet], counts.tolist()) if count
+                }
+
+        rows = np.flatnonzero(np.unpackbits(result, count=self.n_items))
+        if cursor:
+            rows = rows[np.searchsorted(rows, self.decode_cursor(cursor), side="right"):]
+        page = rows[:limit]
+
+        return {
+            "rows": page,
+            "total": int(POPCOUNT[result].sum()),
+            "next_cursor": self.encode_cursor(int(page[-1])) if len(rows) > limit else None,
+            "facets": facets
+        }
+
+    def encode_cursor(self, row: int) -> str:
+        return base64.urlsafe_b64encode(f"{self.version}:{row}".encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> int:
+        """Last row of the previous page; cursors from another catalog version are rejected"""
+        try:
+            decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            version, row = decoded.rsplit(":", 1)
+            row = int(row)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+        if version != self.version:
+            raise ValueError("Cursor is from another catalog version, restart from the first page")
+        return row
@@ -0,0 +1,69 @@
+"""
+Trusted response construction and fast JSON encoding
+Plans built by the services skip Pydantic re-validation unless strict mode is on
+"""
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Type, TypeVar
+
+import numpy as np
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def strict_validation() -> bool:
+    """True when AI_STRICT_VALIDATION (or AI_DEBUG) asks for internally built models to be fully validated"""
+    flag = os.getenv("AI_STRICT_VALIDATION", os.getenv("AI_DEBUG", "0")).lower()
+    return flag in ("1", "true", "yes")
+
+
+def build_model(model_class: Type[ModelT], **fields: Any) -> ModelT:
+    """Instantiate a model from trusted fields, validating only in strict mode"""
+    if strict_validation():
+        return model_class(**fields)
+    return model_class.model_construct(**fields)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode to JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Decode JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_model(model: BaseModel) -> bytes:
+    """Encode a (possibly constructed, unvalidated) model to JSON bytes"""
+    return dumps(model.model_dump())
+
+
+class JSONBytesResponse(Response):
+    """Response for bodies that are already JSON-encoded"""
+    media_type = "application/json"
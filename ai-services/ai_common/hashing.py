@@ -0,0 +1,36 @@
+"""
+Canonical hashing of plan requests
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable
+
+
+def _drop_path(data: Any, path: Iterable[str]) -> None:
+    """Remove a dotted path from a nested dict in place"""
+    parts = list(path)
+    node = data
+    for part in parts[:-1]:
+        if not isinstance(node, dict) or part not in node:
+            return
+        node = node[part]
+    if isinstance(node, dict):
+        node.pop(parts[-1], None)
+
+
+def canonical_json(payload: Dict[str, Any]) -> bytes:
+    """Serialize a payload with sorted keys and no insignificant whitespace"""
+    return json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
+
+
+def canonical_request_hash(payload: Dict[str, Any], volatile_fields: Iterable[str] = (), salt: str = "") -> str:
+    """Hash a request payload, ignoring volatile fields given as dotted paths"""
+    data = json.loads(canonical_json(payload))
+    for field in volatile_fields:
+        _drop_path(data, field.split("."))
+    digest = hashlib.sha256(salt.encode("utf-8"))
+    digest.update(canonical_json(data))
+    return digest.hexdigest()
@@ -0,0 +1,299 @@
+"""
+Durable plan job queue backed by a local SQLite file
+Jobs are picked up by a pool of worker threads and survive restarts. A claimed
+job is leased to its worker, which renews the lease while the job runs; only
+jobs whose lease expired (their worker or process died) are run again
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Completion webhooks may only target services on the same host
+LOCAL_WEBHOOK_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+
+class JobQueue:
+    """SQLite-backed job queue with a local worker pool and completion webhooks"""
+
+    def __init__(
+        self,
+        path: str,
+        handlers: Dict[str, Callable[[Dict[str, Any]], bytes]],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        retention_seconds: int = 7 * 24 * 3600,
+        lease_seconds: float = 60,
+        max_attempts: int = 3
+    ):
+        # Absolute, so workers are unaffected by later working directory changes
+        self.path = os.path.abspath(path)
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        # A running job's worker renews its lease every third of this; a lease left to expire
+        # means the worker lost the job (a database error or a crash) and it is retried
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Unique per queue instance, so processes sharing the database file never take over each other's jobs
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result BLOB,
+                    error TEXT,
+                    callback_url TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            # Queue files created before leases get the lease columns
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("worker_id", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def start(self) -> None:
+        """Requeue jobs whose lease expired (e.g. interrupted by a restart) and start the worker threads"""
+        now = time.time()
+        with self._connect() as conn:
+            self.requeue_expired(conn, now)
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (now - self.retention_seconds,)
+            )
+
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"plan-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the workers; running jobs are requeued once their lease expires if they do not finish"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> str:
+        """Enqueue a job and return its id"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if callback_url:
+            validate_callback_url(callback_url)
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, callback_url, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), callback_url, now, now)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return job status, with the decoded result once it has succeeded"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "attempts": row[5],
+            "created_at": row[6],
+            "updated_at": row[7]
+        }
+        if row[2] == "succeeded" and row[3] is not None:
+            job["result"] = json.loads(zlib.decompress(row[3]))
+        if row[4]:
+            job["error"] = row[4]
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    def requeue_expired(self, conn: sqlite3.Connection, now: float) -> int:
+        """
+        Requeue running jobs whose lease expired before the given time; jobs
+        that already used max_attempts are failed instead of retried forever
+        """
+        expired = "status = 'running' AND (lease_until IS NULL OR lease_until < ?)"
+        failed = conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, worker_id = NULL, lease_until = NULL, updated_at = ? "
+            f"WHERE {expired} AND attempts >= ?",
+            (f"Interrupted {self.max_attempts} times", time.time(), now, self.max_attempts)
+        ).rowcount
+        requeued = conn.execute(
+            "UPDATE jobs SET status = 'queued', worker_id = NULL, lease_until = NULL, updated_at = ? "
+            f"WHERE {expired}",
+            (time.time(), now)
+        ).rowcount
+        if requeued or failed:
+            logger.info(f"Requeued {requeued} interrupted jobs, failed {failed} out of attempts")
+        return requeued
+
+    def _worker_id(self) -> str:
+        return f"{self.owner}/{threading.current_thread().name}"
+
+    def _claim(self, conn: sqlite3.Connection) -> Optional[tuple]:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload, callback_url FROM jobs WHERE status = 'queued' "
+                "ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker_id = ?, lease_until = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (self._worker_id(), now + self.lease_seconds, now, row[0])
+                )
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _worker(self) -> None:
+        conn = self._connect()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    job = self._claim(conn)
+                    if job is None:
+                        self.requeue_expired(conn, time.time())
+                        self._wakeup.wait(self.poll_interval)
+                        self._wakeup.clear()
+                        continue
+                    self._run(conn, *job)
+                except Exception as e:
+                    # Database errors (e.g. locked past the busy timeout) must not end the worker;
+                    # a job left running is requeued once its lease expires
+                    logger.error(f"Job worker {threading.current_thread().name} error: {e}")
+                    self._stopping.wait(self.poll_interval)
+        finally:
+            conn.close()
+
+    def _heartbeat(self, job_id: str, worker_id: str, done: threading.Event) -> None:
+        """Renew a running job's lease until it finishes or the lease is lost"""
+        conn = self._connect()
+        try:
+            while not done.wait(self.lease_seconds / 3):
+                try:
+                    now = time.time()
+                    renewed = conn.execute(
+                        "UPDATE jobs SET lease_until = ?, updated_at = ? "
+                        "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                        (now + self.lease_seconds, now, job_id, worker_id)
+                    ).rowcount
+                except sqlite3.Error as e:
+                    # The next beat retries; the lease only lapses if renewals keep failing
+                    logger.warning(f"Job {job_id} lease renewal failed: {e}")
+                    continue
+                if not renewed:
+                    logger.warning(f"Job {job_id} lease lost by {worker_id}")
+                    return
+        finally:
+            conn.close()
+
+    def _run(self, conn: sqlite3.Connection, job_id: str, kind: str, payload: str, callback_url: Optional[str]) -> None:
+        worker_id = self._worker_id()
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, worker_id, done), name=f"{worker_id}-lease", daemon=True
+        )
+        heartbeat.start()
+        result: Optional[bytes] = None
+        error: Optional[str] = None
+        try:
+            try:
+                result = zlib.compress(self.handlers[kind](json.loads(payload)))
+                status = "succeeded"
+            except Exception as e:
+                logger.error(f"Job {job_id} ({kind}) failed: {e}")
+                error = str(e)
+                status = "failed"
+        finally:
+            done.set()
+            heartbeat.join()
+
+        # Only the lease holder records the outcome; a job requeued meanwhile belongs to its new worker
+        recorded = conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, worker_id = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'running'",
+            (status, result, error, time.time(), job_id, worker_id)
+        ).rowcount
+        if not recorded:
+            logger.warning(f"Job {job_id} finished after losing its lease; result discarded")
+            return
+
+        if callback_url:
+            notify_callback(callback_url, {"job_id": job_id, "kind": kind, "status": status})
+
+
+def validate_callback_url(url: str) -> None:
+    """Reject webhook URLs that do not point at a local HTTP endpoint"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or parsed.hostname not in LOCAL_WEBHOOK_HOSTS:
+        raise ValueError("callback_url must be an http(s) URL on localhost")
+
+
+def notify_callback(url: str, body: Dict[str, Any]) -> None:
+    """POST a job completion notice; failures are logged and never retried"""
+    try:
+        requests.post(url, json=body, timeout=5)
+    except requests.RequestException as e:
+        logger.warning(f"Job callback to {url} failed: {e}")
@@ -0,0 +1,109 @@
+"""
+Non-blocking structured logging
+Handlers only enqueue records; a QueueListener thread formats them as JSON lines
+and does the I/O, so a slow stderr or disk never stalls the event loop
+"""
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from ai_common.fastjson import dumps
+from ai_common.tracing import current_request_id, current_span
+
+# Text format of the services before structured logging, kept for LOG_FORMAT=text
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class ContextQueueHandler(QueueHandler):
+    """Enqueues records with the request id and span of the logging thread, which the listener thread cannot see"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        span = current_span()
+        if not hasattr(record, "request_id"):
+            record.request_id = current_request_id()
+        if span is not None and not hasattr(record, "trace_id"):
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        # Message and traceback are rendered here, as args and exc_info may not survive the queue
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the service, request id, trace ids and extra= fields"""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and value is not None:
+                entry[name] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return dumps(entry).decode("utf-8")
+
+
+def configure_logging(service: str) -> QueueListener:
+    """
+    Route all logging through a queue to a background thread. LOG_LEVEL sets
+    the level, LOG_FORMAT=text keeps the plain format and LOG_PATH writes to a
+    file instead of stderr. A later call (the gateway, after importing both
+    services) replaces the earlier setup.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    log_path = os.getenv("LOG_PATH")
+    if log_path:
+        os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+        handler: logging.Handler = logging.FileHandler(log_path, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        handler.setFormatter(JsonFormatter(service))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(ContextQueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def _stop_listener() -> None:
+    # Writes out whatever is still queued
+    if _listener is not None:
+        _listener.stop()
@@ -0,0 +1,203 @@
+"""
+Memory accounting for the services' admin endpoints
+Sizes of catalogs, indexes, caches and models, process memory, and opt-in
+tracemalloc snapshots grouped by allocation site
+"""
+
+import fnmatch
+import os
+import sys
+import threading
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# Objects never walked into: their size is not the service's data
+OPAQUE_TYPES = (type, threading.Thread, type(threading.Lock()), type(sys))
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Approximate bytes held by an object graph: containers, strings, objects'
+    attributes and NumPy arrays. Objects already in `seen` are not counted
+    again, so sharing one set attributes shared data once.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or item is None or isinstance(item, OPAQUE_TYPES):
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, np.ndarray):
+            # Arrays owning their data include it in getsizeof; views only their header
+            total += sys.getsizeof(item)
+            if item.base is not None:
+                stack.append(item.base)
+            elif item.dtype == object:
+                stack.extend(item.ravel().tolist())
+            continue
+
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, bytearray, int, float, bool, complex)):
+            attributes = getattr(item, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(item), "__slots__", ()):
+                stack.append(getattr(item, slot, None))
+    return total
+
+
+def component_sizes(groups: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Bytes per named component, by group. Data shared between components (the
+    planning catalog holds the same dicts as the raw database) counts once,
+    under the first component listing it.
+    """
+    seen: set = set()
+    report: Dict[str, Any] = {}
+    for group, components in groups.items():
+        sizes = {name: deep_sizeof(obj, seen) for name, obj in components.items()}
+        report[group] = {"total_bytes": sum(sizes.values()), "components": sizes}
+    return report
+
+
+def model_memory(model: Any) -> Optional[int]:
+    """Bytes of a Keras model's weights, without copying them out of the framework"""
+    weights = getattr(model, "weights", None)
+    if weights is None:
+        return None
+    total = 0
+    for weight in weights:
+        shape = [int(dim or 0) for dim in weight.shape]
+        dtype = getattr(weight, "dtype", None)
+        total += int(np.prod(shape)) * int(getattr(dtype, "size", 4) or 4)
+    return total
+
+
+def process_memory() -> Dict[str, Any]:
+    """Resident and virtual memory of the process, with the tracemalloc totals when tracing"""
+    memory: Dict[str, Any] = {}
+    fields = {"VmRSS": "rss_bytes", "VmHWM": "peak_rss_bytes", "VmSize": "virtual_bytes"}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    memory[fields[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        memory["traced_bytes"] = current
+        memory["traced_peak_bytes"] = peak
+    memory["pid"] = os.getpid()
+    return memory
+
+
+class AllocationTracker:
+    """
+    Opt-in tracemalloc tracing with named snapshots. Allocations are grouped by
+    the innermost frame in files matching a pattern (a service passes its own
+    main.py), so NumPy, pydantic or json allocations count against the line
+    of service code that caused them.
+    """
+
+    def __init__(self, site_pattern: str = "*main.py", max_snapshots: int = 8):
+        self.site_pattern = site_pattern
+        self.max_snapshots = max_snapshots
+        self.snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 16) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "snapshots": list(self.snapshots)
+        }
+
+    def snapshot(self, name: str, limit: int = 20) -> Dict[str, Any]:
+        """Take and keep a named snapshot, returning its top allocation sites"""
+        if not tracemalloc.is_tracing():
+            raise ValueError("Allocation tracing is not started")
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")
+        ])
+        with self._lock:
+            self.snapshots[name] = snapshot
+            self.snapshots.move_to_end(name)
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        stats = [(stat.traceback, stat.size, stat.count, stat.size, stat.count) for stat in snapshot.statistics("traceback")]
+        return {"name": name, **self._report(stats, limit)}
+
+    def diff(self, first: str, second: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """Growth between two named snapshots (or a snapshot and now), by allocation site"""
+        if second is None:
+            second = f"diff-{len(self.snapshots)}"
+            self.snapshot(second, limit=0)
+        with self._lock:
+            missing = [name for name in (first, second) if name not in self.snapshots]
+            if missing:
+                raise KeyError(f"Unknown snapshot: {', '.join(missing)}")
+            before, after = self.snapshots[first], self.snapshots[second]
+        stats = [
+            (stat.traceback, stat.size, stat.count, stat.size_diff, stat.count_diff)
+            for stat in after.compare_to(before, "traceback")
+        ]
+        return {"first": first, "second": second, **self._report(stats, limit, by_growth=True)}
+
+    def _site(self, traceback: tracemalloc.Traceback) -> str:
+        # Frames are ordered oldest first; the innermost service frame is the site
+        for frame in reversed(traceback):
+            if fnmatch.fnmatch(frame.filename, self.site_pattern):
+                return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+        frame = traceback[-1]
+        return f"{frame.filename}:{frame.lineno}"
+
+    def _report(self, stats: Iterable[Tuple], limit: int, by_growth: bool = False) -> Dict[str, Any]:
+        sites: Dict[str, Dict[str, Any]] = {}
+        total_size = total_diff = 0
+        for traceback, size, count, size_diff, count_diff in stats:
+            site = sites.setdefault(self._site(traceback), {"size": 0, "count": 0, "size_diff": 0, "count_diff": 0})
+            site["size"] += size
+            site["count"] += count
+            site["size_diff"] += size_diff
+            site["count_diff"] += count_diff
+            total_size += size
+            total_diff += size_diff
+        ranked = sorted(
+            sites.items(),
+            key=lambda item: abs(item[1]["size_diff"]) if by_growth else item[1]["size"],
+            reverse=True
+        )
+        return {
+            "total_bytes": total_size,
+            "total_diff_bytes": total_diff,
+            "sites": [{"site": name, **values} for name, values in ranked[:limit]]
+        }
@@ -0,0 +1,220 @@
+"""
+Batched catalog scoring with the services' ranking models
+Keras models run in-process; exported TFLite or ONNX models run on the CPU
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RANKING_RUNTIMES = ("keras", "tflite", "onnx")
+
+
+class ModelRunner(ABC):
+    """Runs a ranking model on a (n_items, n_features) float32 batch"""
+
+    runtime = ""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        with self._lock:
+            output = np.asarray(self._predict(np.ascontiguousarray(features, dtype=np.float32)))
+        # One output column is the score; for class probabilities the last class is "relevant"
+        return output.reshape(len(features), -1)[:, -1].astype(float)
+
+    @abstractmethod
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        """Raw model output for a contiguous float32 batch"""
+
+
+class KerasRunner(ModelRunner):
+    runtime = "keras"
+
+    def __init__(self, model: Any):
+        super().__init__()
+        self.model = model
+
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        # A direct call avoids predict()'s per-call dataset setup for a single batch
+        return self.model(features, training=False)
+
+
+class TFLiteRunner(ModelRunner):
+    runtime = "tflite"
+
+    def __init__(self, path: str, threads: int = 1):
+        super().__init__()
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        if self.batch_size != len(features):
+            self.interpreter.resize_tensor_input(self.input["index"], [len(features), features.shape[1]])
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = len(features)
+
+        # Integer-quantized models take and return quantized tensors
+        scale, zero_point = self.input["quantization"]
+        if scale:
+            info = np.iinfo(self.input["dtype"])
+            features = np.clip(np.rint(features / scale + zero_point), info.min, info.max)
+        self.interpreter.set_tensor(self.input["index"], features.astype(self.input["dtype"]))
+        self.interpreter.invoke()
+
+        output = self.interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class OnnxRunner(ModelRunner):
+    runtime = "onnx"
+
+    def __init__(self, path: str, threads: int = 1):
+        super().__init__()
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: features})[0]
+
+
+def load_runner(runtime: str, keras_model: Any = None, path: str = "", threads: int = 1) -> Optional[ModelRunner]:
+    """Build the runner for a runtime, or None when ranking is disabled or the model is missing"""
+    runtime = (runtime or "").lower()
+    if not runtime or runtime == "none":
+        return None
+    if runtime not in RANKING_RUNTIMES:
+        raise ValueError(f"Unknown ranking runtime: {runtime} (expected one of {', '.join(RANKING_RUNTIMES)})")
+    if runtime == "keras":
+        return KerasRunner(keras_model) if keras_model is not None else None
+    if not os.path.exists(path):
+        logger.warning(f"Ranking model not found at {path}, ranking stays rule-based")
+        return None
+    if runtime == "tflite":
+        return TFLiteRunner(path, threads)
+    return OnnxRunner(path, threads)
+
+
+def model_fingerprint(runtime: str, path: str) -> str:
+    """Identity of a model file, folded into catalog versions so cached rankings follow model updates"""
+    if not runtime or not os.path.exists(path):
+        return ""
+    stat = os.stat(path)
+    return hashlib.sha256(f"{runtime}:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+def encode_label(label_encoders: Dict[str, Any], column: str, value: Any) -> float:
+    """Code of a categorical value from the fitted label encoders, -1 when unknown"""
+    encoder = label_encoders.get(column)
+    if encoder is None:
+        return -1.0
+    classes = getattr(encoder, "classes_", [])
+    matches = np.flatnonzero(np.asarray(classes) == value)
+    return float(matches[0]) if len(matches) else -1.0
+
+
+class ItemScorer:
+    """
+    Scores a whole item catalog for one context (profile, meal type...) in a
+    single forward pass. Scores are cached per context and dropped when the
+    catalog version changes.
+    """
+
+    def __init__(self, runner: ModelRunner, scaler: Any = None, max_entries: int = 1024):
+        self.runner = runner
+        self.scaler = scaler
+        self.max_entries = max_entries
+        self.catalog_version = ""
+        self.item_features = np.zeros((0, 0))
+        self.hits = 0
+        self.misses = 0
+        self.failed = False
+        self._scores: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_catalog(self, version: str, item_features: np.ndarray) -> None:
+        """Switch to a catalog's (n_items, n_item_features) matrix and drop cached scores"""
+        with self._lock:
+            self.catalog_version = version
+            self.item_features = np.asarray(item_features, dtype=float)
+            self._scores.clear()
+
+    def scores(self, context: Tuple[float, ...]) -> Optional[np.ndarray]:
+        """(n_items,) scores for a context feature tuple, or None if the model fails"""
+        if self.failed:
+            return None
+        key = tuple(float(value) for value in context)
+        with self._lock:
+            cached = self._scores.get(key)
+            if cached is not None:
+                self._scores.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            version, item_features = self.catalog_version, self.item_features
+        if not len(item_features):
+            return np.zeros(0)
+
+        features = np.hstack([np.broadcast_to(np.array(key), (len(item_features), len(key))), item_features])
+        try:
+            if self.scaler is not None:
+                features = self.scaler.transform(features)
+            scores = self.runner.predict(features)
+        except Exception as e:
+            # A model that does not fit the feature layout will not start fitting it later
+            self.failed = True
+            logger.error(f"Ranking model ({self.runner.runtime}) failed, using rule-based ranking from now on: {e}")
+            return None
+
+        scores.setflags(write=False)
+        with self._lock:
+            if version != self.catalog_version:
+                return scores
+            self._scores[key] = scores
+            if len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+        return scores
+
+    def stats(self) -> Dict[str, Any]:
+        """Scorer counters for health endpoints"""
+        return {
+            "runtime": self.runner.runtime,
+            "failed": self.failed,
+            "catalog_version": self.catalog_version,
+            "cached_contexts": len(self._scores),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def run_dummy_batch(model: Any) -> None:
+    """Call a Keras model once on zeros, so graph tracing happens before the first request"""
+    shape = getattr(model, "input_shape", None)
+    if not isinstance(shape, tuple):
+        return
+    model(np.zeros([dim or 1 for dim in shape], dtype=np.float32), training=False)
@@ -0,0 +1,153 @@
+"""
+Persistent plan cache backed by a local SQLite file
+Entries are zlib-compressed JSON payloads, stored with the id of the plan they
+encode, with TTL expiry and LRU eviction
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class PlanCache:
+    """Disk cache for generated plans keyed by request hash and catalog version"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: int = 24 * 3600,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        compression_level: int = 6
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self.catalog_version = ""
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plans (
+                key TEXT PRIMARY KEY,
+                catalog_version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                plan_id TEXT,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        # Cache files created before plan ids were stored get the column; their entries have none
+        if "plan_id" not in {row[1] for row in self._conn.execute("PRAGMA table_info(plans)")}:
+            self._conn.execute("ALTER TABLE plans ADD COLUMN plan_id TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS plans_last_access ON plans (last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM plans").fetchone()[0]
+
+    def set_catalog_version(self, version: str) -> int:
+        """Switch to a catalog version and drop every entry computed from another one"""
+        with self._lock:
+            self.catalog_version = version
+            deleted = self._conn.execute(
+                "DELETE FROM plans WHERE catalog_version != ?", (version,)
+            ).rowcount
+            if deleted:
+                self._refresh_total()
+            return deleted
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached payload for a key, or None if missing or expired"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Return the cached payload for a key and the plan_id stored with it, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, plan_id, expires_at FROM plans WHERE key = ? AND catalog_version = ?",
+                (key, self.catalog_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[2] <= now:
+                self._delete(key)
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE plans SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(row[0]), row[1]
+
+    def put(self, key: str, payload: bytes, ttl_seconds: Optional[int] = None, plan_id: Optional[str] = None) -> None:
+        """Store a payload and the id of the plan it encodes, evicting least recently used entries past the size bound"""
+        blob = zlib.compress(payload, self.compression_level)
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO plans (key, catalog_version, payload, plan_id, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, self.catalog_version, blob, plan_id, len(blob), now + ttl, now)
+            )
+            self._total_bytes += len(blob)
+            if self._total_bytes > self.max_bytes:
+                self._evict(now)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for health and admin endpoints"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "catalog_version": self.catalog_version
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute("SELECT size FROM plans WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+
+    def _evict(self, now: float) -> None:
+        # Expired entries go first, then the least recently used until under the bound
+        self._conn.execute("DELETE FROM plans WHERE expires_at <= ?", (now,))
+        self._refresh_total()
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM plans ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def _refresh_total(self) -> None:
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM plans").fetchone()[0]
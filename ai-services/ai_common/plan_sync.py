@@ -0,0 +1,83 @@
+"""
+Content-addressed plan ids, ETags and plan deltas
+A plan's id is a hash of its content, so regenerating an unchanged plan keeps
+its id and clients only fetch the sessions or meals that changed
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from ai_common.fastjson import dumps, loads
+from ai_common.hashing import canonical_json
+
+# Hex digits of the content hash kept in an id
+CONTENT_ID_LENGTH = 20
+
+
+def _integral_floats_as_ints(value: Any) -> Any:
+    # A float field built from an int (unvalidated models) and read back as a float must hash alike
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {name: _integral_floats_as_ints(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_integral_floats_as_ints(item) for item in value]
+    return value
+
+
+def content_id(prefix: str, data: Dict[str, Any], exclude: Iterable[str] = ("id",)) -> str:
+    """Deterministic id of a dict's content, ignoring the given top-level fields"""
+    excluded = set(exclude)
+    # Hashed in the JSON form clients receive, so NumPy scalars and dates hash like their decoded values
+    content = loads(dumps({name: value for name, value in data.items() if name not in excluded}))
+    content = _integral_floats_as_ints(content)
+    return f"{prefix}_{hashlib.sha256(canonical_json(content)).hexdigest()[:CONTENT_ID_LENGTH]}"
+
+
+def plan_content_id(prefix: str, fields: Dict[str, Any], item_ids: List[str]) -> str:
+    """Id of a whole plan from its own fields and the ids of its items, which already hash their content"""
+    return content_id(prefix, {**fields, "item_ids": item_ids}, exclude=("plan_id",))
+
+
+def plan_etag(plan_id: str) -> str:
+    return f'"{plan_id}"'
+
+
+def etag_matches(if_none_match: Optional[str], plan_id: str) -> bool:
+    """Whether an If-None-Match header names this plan version"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == plan_etag(plan_id):
+            return True
+    return False
+
+
+def plan_delta(old: Dict[str, Any], new: Dict[str, Any], items_field: str) -> Dict[str, Any]:
+    """
+    Changes from one version of a plan to another: the plan fields that differ,
+    the items (sessions or meals) the old version lacks, the ids it has that the
+    new one dropped, and the new item order
+    """
+    old_ids = {item["id"] for item in old.get(items_field, [])}
+    new_items = new.get(items_field, [])
+    new_ids = {item["id"] for item in new_items}
+    return {
+        "plan_id": new.get("plan_id"),
+        "base_plan_id": old.get("plan_id"),
+        "full": False,
+        "fields": {
+            name: value for name, value in new.items()
+            if name not in (items_field, "plan_id") and old.get(name) != value
+        },
+        "items_field": items_field,
+        "upserted": [item for item in new_items if item["id"] not in old_ids],
+        "removed": [item["id"] for item in old.get(items_field, []) if item["id"] not in new_ids],
+        "order": [item["id"] for item in new_items]
+    }
+
+
+def full_plan_delta(base_plan_id: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Delta for a client whose version is unknown (expired or never generated here): the whole plan"""
+    return {"plan_id": plan.get("plan_id"), "base_plan_id": base_plan_id, "full": True, "plan": plan}
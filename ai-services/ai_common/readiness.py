@@ -0,0 +1,101 @@
+"""
+Service warm-up tracking and readiness gating
+Requests other than health checks get a 503 until the warm-up phases have completed
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Paths served while warming up (matched as suffixes, so they also work under a mount prefix)
+HEALTH_PATHS = ("/health", "/health/live", "/health/ready")
+
+
+class Readiness:
+    """Timed warm-up phases of a service and whether it is ready to take traffic"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = datetime.now()
+        self.phases: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time one warm-up phase; a failing phase fails the whole warm-up"""
+        entry = {"name": name, "status": "running"}
+        self.phases.append(entry)
+        start = time.perf_counter()
+        try:
+            yield entry
+            entry["status"] = "done"
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            raise
+        finally:
+            entry["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def run(self, warm_up: Callable[["Readiness"], None]) -> None:
+        """Run the warm-up in the calling thread and flip to ready if it succeeds"""
+        start = time.perf_counter()
+        try:
+            warm_up(self)
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"{self.name} warm-up failed: {e}")
+            return
+        self._ready.set()
+        logger.info(f"{self.name} ready after {(time.perf_counter() - start) * 1000:.0f} ms of warm-up")
+
+    def start(self, warm_up: Callable[["Readiness"], None]) -> "asyncio.Future":
+        """Run the warm-up in a background thread, so liveness answers while it runs"""
+        return asyncio.get_running_loop().run_in_executor(None, self.run, warm_up)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def report(self) -> Dict[str, Any]:
+        """Readiness with per-phase timings, for the readiness endpoint"""
+        return {
+            "service": self.name,
+            "ready": self.ready,
+            "status": "ready" if self.ready else ("failed" if self.error else "warming_up"),
+            "error": self.error,
+            "started_at": self.started_at.isoformat(),
+            "warm_up_ms": round(sum(phase.get("duration_ms", 0) for phase in self.phases), 1),
+            "phases": [dict(phase) for phase in self.phases]
+        }
+
+
+class ReadinessGate:
+    """ASGI middleware answering 503 to everything but health checks until the service is ready"""
+
+    def __init__(self, app, readiness: Readiness, retry_after_seconds: int = 5):
+        self.app = app
+        self.readiness = readiness
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self.readiness.ready and not scope["path"].endswith(HEALTH_PATHS):
+            response = JSONResponse(
+                {"detail": f"{self.readiness.name} is warming up"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,29 @@
+"""
+Per-service settings
+A service reads each setting from its overrides, then the environment, then its
+default, and resolves relative paths against its own directory, so services
+sharing one process (the gateway) never change its working directory or environment
+"""
+
+import os
+from typing import Dict, Optional
+
+
+class ServiceSettings:
+    """Settings of one service"""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        # A value of None makes the service use its default, whatever the environment says
+        self.overrides: Dict[str, Optional[str]] = {}
+
+    def get(self, name: str, default: str = "") -> str:
+        if name in self.overrides:
+            value = self.overrides[name]
+            return default if value is None else value
+        return os.getenv(name, default)
+
+    def path(self, name: str, default: str) -> str:
+        """A path setting, relative to the service directory unless absolute; empty stays empty (disabled)"""
+        value = self.get(name, default)
+        return os.path.join(self.base_dir, value) if value else value
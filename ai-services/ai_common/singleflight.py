@@ -0,0 +1,46 @@
+"""
+Single-flight coalescing of identical concurrent requests
+"""
+
+import asyncio
+from typing import Any, Callable, Dict
+
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers using the same key"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn in the thread pool, or wait for the identical call already running"""
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # Shield so a cancelled follower does not cancel the leader's work
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await run_in_threadpool(fn, *args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Number of computations currently running"""
+        return len(self._in_flight)
@@ -0,0 +1,349 @@
+"""
+Request ids and lightweight span tracing
+Spans are batched by a background thread and exported as OTLP JSON, to a file
+(one export request per line, as read by the collector's otlpjsonfile receiver)
+or to a local OTLP/HTTP collector, so tracing never blocks a request
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from ai_common.fastjson import dumps
+
+logger = logging.getLogger(__name__)
+
+# Id of the request being served, from the caller's X-Request-ID header when it sends one
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def current_span() -> Optional["Span"]:
+    return _current_span.get()
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ("service", "name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, service: str, name: str, kind: int, trace_id: str, parent_id: Optional[str]):
+        self.service = service
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.status = STATUS_OK
+        self.error: Optional[str] = None
+
+    def set_attribute(self, name: str, value: Any) -> None:
+        self.attributes[name] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def traceparent(self) -> str:
+        """W3C trace context header continuing this span's trace"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace id, parent span id) from a W3C traceparent header, or None if absent or malformed"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_export_request(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest for a batch of finished spans, grouped by service"""
+    by_service: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        entry = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": name, "value": _otlp_value(value)} for name, value in span.attributes.items()],
+            "status": {"code": span.status, **({"message": span.error} if span.error else {})}
+        }
+        if span.parent_id:
+            entry["parentSpanId"] = span.parent_id
+        by_service.setdefault(span.service, []).append(entry)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{"scope": {"name": "ai_common.tracing"}, "spans": entries}]
+            }
+            for service, entries in by_service.items()
+        ]
+    }
+
+
+class FileSpanSink:
+    """Appends one OTLP JSON export request per batch to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, body: bytes) -> None:
+        with open(self.path, "ab") as f:
+            f.write(body + b"\n")
+
+
+class OtlpHttpSpanSink:
+    """Posts OTLP JSON export requests to a collector's /v1/traces endpoint"""
+
+    def __init__(self, endpoint: str, timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def write(self, body: bytes) -> None:
+        response = self.session.post(
+            self.endpoint, data=body, headers={"Content-Type": "application/json"}, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+class BatchSpanExporter:
+    """
+    Hands finished spans to a background thread that exports them in batches.
+    The queue is bounded and full queues drop spans rather than block requests.
+    """
+
+    def __init__(self, sink, max_queue: int = 8192, batch_size: int = 512, interval_seconds: float = 2.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._failing = False
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Export what is queued, then stop the thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sink": type(self.sink).__name__,
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.interval_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[Span]) -> None:
+        try:
+            self.sink.write(dumps(otlp_export_request(batch)))
+            self.exported += len(batch)
+            self._failing = False
+        except Exception as e:
+            # Counted, and logged once per failure streak, so a missing collector does not flood the logs
+            if not self._failing:
+                logger.warning(f"Span export to {type(self.sink).__name__} failed: {e}")
+            self._failing = True
+            self.failed += len(batch)
+
+
+_exporter: Optional[BatchSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def span_exporter() -> Optional[BatchSpanExporter]:
+    """
+    The process-wide exporter configured by TRACE_EXPORT: "file" (TRACE_FILE_PATH),
+    "otlp" (OTLP_TRACES_ENDPOINT) or unset for no export. Spans still carry ids
+    for log correlation when nothing exports them.
+    """
+    global _exporter
+    mode = os.getenv("TRACE_EXPORT", "").lower()
+    if not mode:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            if mode == "file":
+                sink = FileSpanSink(os.getenv("TRACE_FILE_PATH", "logs/traces.jsonl"))
+            elif mode == "otlp":
+                sink = OtlpHttpSpanSink(os.getenv("OTLP_TRACES_ENDPOINT", "http://localhost:4318/v1/traces"))
+            else:
+                raise ValueError(f"Unknown TRACE_EXPORT: {mode} (expected file or otlp)")
+            _exporter = BatchSpanExporter(sink)
+            atexit.register(_exporter.stop)
+        return _exporter
+
+
+class Tracer:
+    """Creates the spans of one service, nested through a context variable"""
+
+    def __init__(self, service: str):
+        self.service = service
+        self.exporter = span_exporter()
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        parent: Optional[Tuple[str, str]] = None
+    ) -> Iterator[Span]:
+        """Time a block as a child of the current span, or of a remote (trace id, span id) parent"""
+        enclosing = _current_span.get()
+        if parent is not None:
+            trace_id, parent_id = parent
+        elif enclosing is not None:
+            trace_id, parent_id = enclosing.trace_id, enclosing.span_id
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+        span = Span(self.service, name, kind, trace_id, parent_id)
+        if attributes:
+            span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = STATUS_ERROR
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            if self.exporter is not None:
+                self.exporter.export(span)
+
+
+class RequestTracing:
+    """
+    ASGI middleware giving every request an id and a server span. The id comes
+    from the caller's X-Request-ID (and the trace from its traceparent) or is
+    generated; responses carry X-Request-ID, X-Response-Time and traceparent,
+    and one structured access log line is written per request, as a warning
+    past SLOW_REQUEST_MS. Inside the gateway, mounted services see the
+    gateway's span and only add a child span.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+        self.slow_request_ms = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if _current_span.get() is not None:
+            with self.tracer.span(f"{self.tracer.service} {scope['path']}"):
+                await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1").strip()[:128] or uuid.uuid4().hex
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        method, path = scope["method"], scope["path"]
+        status = 500
+
+        token = _request_id.set(request_id)
+        try:
+            with self.tracer.span(
+                f"{method} {path}", {"http.method": method, "http.target": path, "request.id": request_id},
+                kind=SPAN_KIND_SERVER, parent=parent
+            ) as span:
+                async def send_with_headers(message):
+                    nonlocal status
+                    if message["type"] == "http.response.start":
+                        status = message["status"]
+                        message["headers"] = list(message.get("headers", [])) + [
+                            (b"x-request-id", request_id.encode("latin-1")),
+                            (b"x-response-time", f"{span.duration_ms:.1f}ms".encode()),
+                            (b"traceparent", span.traceparent().encode())
+                        ]
+                    await send(message)
+
+                await self.app(scope, receive, send_with_headers)
+                span.set_attribute("http.status_code", status)
+                if status >= 500:
+                    span.status = STATUS_ERROR
+        finally:
+            duration_ms = span.duration_ms
+            level = logging.WARNING if duration_ms >= self.slow_request_ms else logging.INFO
+            logger.log(level, f"{method} {path} {status} {duration_ms:.1f}ms", extra={
+                "http_method": method, "http_path": path, "http_status": status,
+                "duration_ms": round(duration_ms, 1), "trace_id": span.trace_id, "span_id": span.span_id
+            })
+            _request_id.reset(token)
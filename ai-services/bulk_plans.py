@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Arcadis Fit - Bulk plan generation
+Generates meal or workout plans for a JSONL file of members in-process, with the
+same engines and catalog snapshot as the service and a plan cache of its own
+
+    python bulk_plans.py nutrition members.jsonl --output meal_plans.jsonl --defaults '{"days": 7}'
+    python bulk_plans.py workout members.jsonl --output workout_plans.sqlite --workers 8
+    python bulk_plans.py nutrition members.jsonl --output meal_slots.parquet
+
+Each input line is either a full plan request or a bare user profile, which is
+combined with --defaults. Parquet and Arrow output is one file of the
+service's export rows (meal slots or session exercises), streamed a row group
+at a time. An interrupted run resumes from its checkpoint.
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SERVICES_DIR)
+from ai_common.bulk_pipeline import OUTPUT_FORMATS, ChunkOutput, Checkpoint, open_writer, run_bulk_pipeline
+from ai_common.columnar_export import EXPORT_FORMATS, merge_columns
+from ai_common.fastjson import loads
+from ai_common.plan_cache import DEFAULT_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Service directory, the job handler generating one plan from a request payload,
+# and the export columns and row builder of its plans
+SERVICES = {
+    "nutrition": ("nutrition-ai", "run_meal_plan_job", "MEAL_EXPORT_COLUMNS", "meal_plan_export_rows"),
+    "workout": ("workout-ai", "run_workout_plan_job", "SESSION_EXPORT_COLUMNS", "workout_plan_export_rows")
+}
+
+# Set in each worker process by init_worker
+service = None
+handler = None
+export_rows = None
+request_defaults: Dict[str, Any] = {}
+
+
+def load_service(name: str, plan_cache_path: str, processes: int = 1):
+    """
+    Import a service's main.py from its own directory and load its models and
+    catalogs. The run uses its own plan cache file, so it never evicts the live
+    service's plans, and its processes split the cache's byte budget, as each
+    one only counts its own writes.
+    """
+    directory = os.path.join(SERVICES_DIR, SERVICES[name][0])
+    sys.path.insert(0, directory)
+    module = importlib.import_module("main")
+    max_bytes = int(module.settings.get("PLAN_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
+    module.settings.overrides.update({
+        "PLAN_CACHE_PATH": plan_cache_path,
+        "PLAN_CACHE_MAX_BYTES": str(max_bytes // max(1, processes)),
+        # The run writes its own output; it never adds to the service's analytics export
+        "PLAN_EXPORT_DIR": ""
+    })
+    module.load_models()
+    return module
+
+
+def init_worker(
+    name: str,
+    catalog_version: str,
+    defaults: Dict[str, Any],
+    columnar: bool,
+    plan_cache_path: str,
+    processes: int
+):
+    """Pool initializer: load the service once per worker, on the catalog the run started with"""
+    global service, handler, export_rows, request_defaults
+    service = load_service(name, plan_cache_path, processes)
+    if service.catalog_version != catalog_version:
+        raise RuntimeError(f"Catalog changed since the run started ({service.catalog_version} != {catalog_version})")
+    handler = getattr(service, SERVICES[name][1])
+    export_rows = getattr(service, SERVICES[name][3]) if columnar else None
+    request_defaults = defaults
+
+
+def process_chunk(chunk: List[Tuple[int, str]]) -> ChunkOutput:
+    """Generate the plans of one chunk; a bad record becomes an error row instead of failing the chunk"""
+    cache = service.plan_cache
+    hits = cache.hits if cache is not None else 0
+    results = []
+    columns: Dict[str, List[Any]] = {}
+    for line, text in chunk:
+        user_id = ""
+        try:
+            record = json.loads(text)
+            request = {**request_defaults, **record} if "user_profile" in record else {**request_defaults, "user_profile": record}
+            user_id = str(request["user_profile"].get("user_id", ""))
+            payload = handler(request)
+            if export_rows is not None:
+                # Rows are flattened here, in parallel, and only they go back to the writer
+                merge_columns(columns, export_rows(loads(payload)))
+                payload = b""
+            results.append((line, user_id, payload, None))
+        except Exception as e:
+            results.append((line, user_id, None, str(e)))
+    counters = {"plan_cache_hits": (cache.hits - hits) if cache is not None else 0}
+    return results, counters, columns if export_rows is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate plans for a JSONL file of members")
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("input", help="JSONL file with one plan request or user profile per line")
+    parser.add_argument("--output", required=True, help="JSONL, SQLite, Parquet or Arrow file to write to")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format (default: from the output extension)")
+    parser.add_argument("--defaults", default="{}", help="JSON object of request fields for every member")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--row-group-rows", type=int, default=256 * 1024, help="Rows per Parquet row group or Arrow record batch")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--plan-cache", help="Plan cache of the run (default: <output>.plan_cache.sqlite, empty to disable)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    parser.add_argument("--report", help="Also write the throughput report to this file")
+    args = parser.parse_args()
+
+    input_path = os.path.abspath(args.input)
+    output_path = os.path.abspath(args.output)
+    extension = os.path.splitext(output_path.rstrip("/"))[1].lstrip(".")
+    output_format = args.format or {"db": "sqlite", "sqlite": "sqlite", "parquet": "parquet", "arrow": "arrow"}.get(extension, "jsonl")
+    checkpoint_path = os.path.abspath(args.checkpoint or f"{output_path}.checkpoint.json")
+    defaults = json.loads(args.defaults)
+    plan_cache_path = f"{output_path.rstrip('/')}.plan_cache.sqlite" if args.plan_cache is None else args.plan_cache
+    if plan_cache_path:
+        plan_cache_path = os.path.abspath(plan_cache_path)
+
+    # The parent loads the catalog once to pin the version every worker must match
+    parent_service = load_service(args.service, plan_cache_path)
+    catalog_version = parent_service.catalog_version
+    columnar = output_format in EXPORT_FORMATS
+
+    checkpoint = Checkpoint(checkpoint_path, {
+        "service": args.service,
+        "input": input_path,
+        "format": output_format,
+        "chunk_size": args.chunk_size,
+        "defaults": defaults,
+        "catalog_version": catalog_version,
+        "plan_date": date.today().isoformat()
+    })
+    if args.restart:
+        checkpoint.remove()
+    resume_at = None
+    if checkpoint.load():
+        logger.info(f"Resuming after line {checkpoint.state['input_lines']} ({checkpoint.state['records']} records done)")
+        resume_at = checkpoint.state["output_position"]
+
+    writer = open_writer(
+        output_format, output_path, resume_at,
+        getattr(parent_service, SERVICES[args.service][2]), args.row_group_rows
+    )
+    # Spawned workers open their own plan cache and model sessions instead of sharing forked ones
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(args.service, catalog_version, defaults, columnar, plan_cache_path, args.workers)
+    ) as executor:
+        try:
+            report = run_bulk_pipeline(
+                executor, process_chunk, input_path, writer, checkpoint,
+                chunk_size=args.chunk_size, max_pending=args.workers * 2
+            )
+        finally:
+            writer.close()
+
+    report.update({"service": args.service, "workers": args.workers, "catalog_version": catalog_version, "output": output_path})
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Arcadis Fit - Combined AI Gateway
+Serves the nutrition and workout services from one process, with one ML runtime
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional, Type
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, create_model
+from starlette.concurrency import run_in_threadpool
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SERVICES_DIR)
+from ai_common.fastjson import JSONBytesResponse, dumps, loads
+from ai_common.log_config import configure_logging
+from ai_common.readiness import Readiness, ReadinessGate
+from ai_common.tracing import RequestTracing, Tracer
+
+
+def load_service(module_name: str, directory: str):
+    """Import a service's main.py under its own module name, with its directory importable"""
+    service_dir = os.path.join(SERVICES_DIR, directory)
+    sys.path.insert(0, service_dir)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(service_dir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+nutrition = load_service("nutrition_service", "nutrition-ai")
+workout = load_service("workout_service", "workout-ai")
+
+# Replaces the services' own logging setup, so lines are tagged with the gateway
+configure_logging("ai-gateway")
+logger = logging.getLogger(__name__)
+tracer = Tracer("ai-gateway")
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="Arcadis Fit AI Gateway",
+    description="Nutrition and workout AI services in one process",
+    version="1.0.0"
+)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Configure appropriately for production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Requests wait for both services to finish warming up, health checks excepted
+readiness = Readiness("ai-gateway")
+app.add_middleware(ReadinessGate, readiness=readiness)
+
+# The gateway's request span is the parent of the mounted services' spans
+app.add_middleware(RequestTracing, tracer=tracer)
+
+# Each service keeps its full API under a prefix
+app.mount("/nutrition", nutrition.app)
+app.mount("/workout", workout.app)
+
+# Settings both services read under the same name. In the gateway they are given
+# per service with a NUTRITION_ or WORKOUT_ prefix, e.g. WORKOUT_PLAN_CACHE_PATH
+SERVICE_SCOPED_SETTINGS = (
+    "PLAN_CACHE_PATH", "JOB_QUEUE_PATH", "SCALER_PATH", "ENCODERS_PATH",
+    "RANKING_RUNTIME", "RANKING_MODEL_PATH"
+)
+
+# Planned training replaces the activity multiplier, so it is not counted twice
+PROGRAM_BASE_ACTIVITY_LEVEL = "sedentary"
+
+
+def plan_options_model(name: str, request_model: Type[BaseModel]) -> Type[BaseModel]:
+    """A service's plan request fields other than user_profile, rejecting any other key with a 422"""
+    fields = {
+        field_name: (field.annotation, field)
+        for field_name, field in request_model.model_fields.items() if field_name != "user_profile"
+    }
+    return create_model(name, __config__=ConfigDict(extra="forbid"), **fields)
+
+
+WorkoutPlanOptions = plan_options_model("WorkoutPlanOptions", workout.WorkoutPlanRequest)
+MealPlanOptions = plan_options_model("MealPlanOptions", nutrition.MealPlanRequest)
+
+
+class ProgramRequest(BaseModel):
+    """Request for a combined meal and workout program"""
+    user_profile: Dict[str, Any] = Field(..., description="Fields of both the nutrition and the workout user profiles")
+    workout: WorkoutPlanOptions = Field(default_factory=WorkoutPlanOptions, description="Other WorkoutPlanRequest fields")
+    meal_plan: MealPlanOptions = Field(default_factory=MealPlanOptions, description="Other MealPlanRequest fields")
+
+
+def scoped_settings(prefix: str) -> Dict[str, Optional[str]]:
+    """A service's overrides for the shared setting names: its prefixed value, or None for its default"""
+    return {name: os.environ.get(f"{prefix}_{name}") for name in SERVICE_SCOPED_SETTINGS}
+
+
+# Each service resolves its own paths against its directory, so nothing process-wide changes at warm-up
+nutrition.settings.overrides.update(scoped_settings("NUTRITION"))
+workout.settings.overrides.update(scoped_settings("WORKOUT"))
+
+
+def warm_up(readiness: Readiness):
+    """Warm up both services in turn"""
+    for service in (nutrition, workout):
+        with readiness.phase(service.readiness.name):
+            service.readiness.run(service.warm_up)
+            if not service.readiness.ready:
+                raise RuntimeError(service.readiness.error)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Warm up both services in the background (mounted apps do not receive startup events themselves)"""
+    readiness.start(warm_up)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop both services' background workers"""
+    await nutrition.shutdown_event()
+    await workout.shutdown_event()
+
+
+@app.get("/health")
+async def health_check():
+    """Health of both services"""
+    return {
+        "status": "healthy" if readiness.ready else readiness.report()["status"],
+        "timestamp": datetime.now().isoformat(),
+        "nutrition": await nutrition.health_check(),
+        "workout": await workout.health_check()
+    }
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness of the gateway and both services, with per-phase timings"""
+    report = readiness.report()
+    report["services"] = [nutrition.readiness.report(), workout.readiness.report()]
+    return JSONResponse(report, status_code=200 if readiness.ready else 503)
+
+
+def average_daily_workout_calories(workout_plan: Dict[str, Any]) -> float:
+    """Calories burned by the planned sessions, averaged over the days of the plan"""
+    days = max(1, workout_plan.get("total_weeks", 0) * 7)
+    burned = sum(
+        (session.get("prescription") or {}).get("estimated_calories", session.get("total_calories", 0))
+        for session in workout_plan.get("sessions", [])
+    )
+    return burned / days
+
+
+@app.post("/generate-program")
+async def generate_program(request: ProgramRequest):
+    """
+    Generate matching workout and meal plans in one call. The meal plan's
+    calorie target comes from the burn of the workout plan actually served
+    (not an estimate), so by default the workout plan is generated first, with the meal candidates ranked meanwhile,
+    and the meal plan after it. With a target_calories in meal_plan, both plans
+    are generated concurrently.
+    """
+    try:
+        workout_request = workout.WorkoutPlanRequest(
+            user_profile=request.user_profile, **request.workout.model_dump(exclude_unset=True)
+        )
+        meal_profile = nutrition.UserProfile(**request.user_profile)
+        workout_key = workout.workout_plan_request_key(workout_request)
+        base_calories = nutrition.calculate_target_calories(meal_profile, PROGRAM_BASE_ACTIVITY_LEVEL)
+        meal_fields = request.meal_plan.model_dump(exclude_unset=True)
+
+        async def generate_workout_plan():
+            payload, _ = await workout.plan_requests.do(
+                workout_key, workout.get_or_generate_workout_plan, workout_request, workout_key
+            )
+            return payload
+
+        async def generate_meal_plan(meal_request):
+            meal_key = nutrition.meal_plan_request_key(meal_request)
+            with tracer.span("meal_plan"):
+                payload, _ = await nutrition.plan_requests.do(
+                    meal_key, nutrition.get_or_generate_meal_plan, meal_request, meal_key
+                )
+            return payload
+
+        if meal_fields.get("target_calories"):
+            # A given target does not depend on the workout plan
+            meal_request = nutrition.MealPlanRequest(user_profile=meal_profile, **meal_fields)
+            with tracer.span("workout_and_meal_plans"):
+                workout_payload, meal_payload = await asyncio.gather(
+                    generate_workout_plan(),
+                    generate_meal_plan(meal_request)
+                )
+            workout_calories = average_daily_workout_calories(loads(workout_payload))
+        else:
+            # Meal candidates are ranked while the workout plan is generated
+            meal_types = meal_fields.get("meal_types") or list(nutrition.MEAL_CALORIE_RATIOS)
+            with tracer.span("workout_plan_and_meal_ranking"):
+                workout_payload, _ = await asyncio.gather(
+                    generate_workout_plan(),
+                    run_in_threadpool(lambda: [
+                        nutrition.rank_foods_for_meal(meal_type, meal_profile.allergies, meal_profile)
+                        for meal_type in meal_types
+                    ])
+                )
+
+            # The workout burn raises the meal plan's calorie target
+            workout_calories = average_daily_workout_calories(loads(workout_payload))
+            meal_fields["target_calories"] = int(round(base_calories + workout_calories))
+            meal_request = nutrition.MealPlanRequest(user_profile=meal_profile, **meal_fields)
+            meal_payload = await generate_meal_plan(meal_request)
+
+        energy_balance = dumps({
+            "base_target_calories": round(base_calories),
+            "average_daily_workout_calories": round(workout_calories, 1),
+            "target_calories": meal_request.target_calories
+        })
+        return JSONBytesResponse(
+            b'{"user_id":' + dumps(meal_profile.user_id)
+            + b',"workout_plan":' + workout_payload
+            + b',"meal_plan":' + meal_payload
+            + b',"energy_balance":' + energy_balance + b"}"
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    except Exception as e:
+        logger.error(f"Error generating program: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    # Uvicorn's loggers go through the queue too; RequestTracing writes the access log
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("GATEWAY_PORT", "8000")), log_config=None, access_log=False)
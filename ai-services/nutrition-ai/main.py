@@ -5,14 +5,16 @@ AI-powered nutrition and meal planning service with Senegalese diet focus
 """
 
 import os
+import sys
 import json
 import logging
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime, date
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 import tensorflow as tf
 from tensorflow import keras
@@ -21,15 +23,37 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 import requests
 from dotenv import load_dotenv
 
+# Shared service utilities live next to the service directories
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ai_common.admin import require_admin
+from ai_common.columnar_export import PlanExporter
+from ai_common.fastjson import JSONBytesResponse, build_model, dumps, encode_model, loads, strict_validation
+from ai_common.facets import FacetIndex
+from ai_common.hashing import canonical_request_hash
+from ai_common.job_queue import JobQueue
+from ai_common.log_config import configure_logging
+from ai_common.memory import AllocationTracker, component_sizes, model_memory, process_memory
+from ai_common.model_runtime import ItemScorer, encode_label, load_runner, model_fingerprint, run_dummy_batch
+from ai_common.plan_cache import PlanCache
+from ai_common.plan_sync import (
+    content_id, etag_matches, full_plan_delta, plan_content_id, plan_delta, plan_etag
+)
+from ai_common.readiness import Readiness, ReadinessGate
+from ai_common.settings import ServiceSettings
+from ai_common.singleflight import SingleFlight
+from ai_common.tracing import RequestTracing, Tracer
+from meal_optimizer import keep_largest, solve_portions, solve_portions_within_budget
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: JSON lines written by a background thread
+configure_logging("nutrition-ai")
 logger = logging.getLogger(__name__)
+tracer = Tracer("nutrition-ai")
+
+# Settings, with data, model and cache paths relative to this directory
+settings = ServiceSettings(os.path.dirname(os.path.abspath(__file__)))
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -47,12 +71,118 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requests wait for warm-up to finish (503 until then), health checks excepted
+readiness = Readiness("nutrition-ai")
+app.add_middleware(ReadinessGate, readiness=readiness)
+
+# Request ids, a span per request and timing headers (outermost, so 503s are traced too)
+app.add_middleware(RequestTracing, tracer=tracer)
+
 # Global variables for models and data
 nutrition_model = None
 food_database = None
 senegalese_foods = None
 scaler = None
 label_encoders = {}
+plan_cache = None
+plan_exporter = None
+catalog_version = ""
+job_queue = None
+
+# Columnar view of the foods used in plans, built once in load_models
+food_catalog = []
+food_id_index = {}
+food_macro_matrix = None   # (n_foods, 4) calories, protein, carbs, fat per gram
+food_cost_per_gram = None  # (n_foods,) estimated XOF per gram
+nutrient_columns = []      # macro columns followed by the catalog's micronutrients
+food_nutrient_matrix = None  # (n_foods, n_nutrients) amounts per gram
+slot_candidates = {}       # (meal_type, allergies) -> catalog rows, most relevant first
+meal_keyword_matches = {}  # meal_type -> (n_foods,) meal keywords found in each food name
+food_ranker = None         # optional model scoring the catalog per profile and meal type
+food_facets = None         # FacetIndex over senegalese_foods for /senegalese-foods
+food_substitute_space = None  # (n_foods, n_nutrients) weighted, standardized nutrients
+food_substitute_norms = None  # (n_foods,) squared row norms of food_substitute_space
+food_categories = None     # (n_foods,) category of each catalog food
+allergen_columns = {}      # allergen -> column of food_allergen_matrix
+food_allergen_matrix = None  # (n_foods, n_allergens) whether a food contains an allergen
+food_neighbours = {}       # food id -> (rows, distances) of its nearest foods
+optimizer_budget_s = 0.05
+
+# Bump when the generated plan format changes so cached plans are recomputed
+PLAN_FORMAT_VERSION = 8
+
+MACRO_COLUMNS = ["calories", "protein_g", "carbs_g", "fat_g"]
+
+# Adult reference daily intakes, in the units used by the food catalog
+# (vitamins A, B12, D, K and selenium in µg, everything else in mg)
+DAILY_REFERENCE_INTAKES = {
+    "vitamin_A": 900,
+    "vitamin_B1": 1.2,
+    "vitamin_B3": 16,
+    "vitamin_B6": 1.3,
+    "vitamin_B12": 2.4,
+    "vitamin_C": 90,
+    "vitamin_D": 15,
+    "vitamin_E": 15,
+    "vitamin_K": 120,
+    "calcium": 1000,
+    "iron": 18,
+    "magnesium": 400,
+    "phosphorus": 700,
+    "potassium": 3400,
+    "selenium": 55,
+    "zinc": 11
+}
+
+# Share of daily targets per meal
+MEAL_CALORIE_RATIOS = {
+    "breakfast": 0.25,
+    "lunch": 0.35,
+    "dinner": 0.30,
+    "snack": 0.10
+}
+
+# Keywords used to rank foods by relevance to a meal
+MEAL_KEYWORDS = {
+    "breakfast": ["céréale", "lait", "pain", "œuf", "fruit"],
+    "lunch": ["riz", "poisson", "viande", "légume", "sauce"],
+    "dinner": ["poisson", "viande", "légume", "soupe"],
+    "snack": ["fruit", "noix", "yogourt", "pain"]
+}
+
+# Food categories that suit a meal, counted with the keywords
+MEAL_CATEGORIES = {
+    "breakfast": ["grains", "fruits", "dairy"],
+    "lunch": ["grains", "protein", "vegetables"],
+    "dinner": ["protein", "vegetables", "grains"],
+    "snack": ["fruits", "nuts", "dairy"]
+}
+
+MAX_PORTION_G = 300
+MIN_PORTION_G = 10
+FOODS_PER_MEAL = 3
+CANDIDATES_PER_MEAL = 6
+SUBSTITUTE_CANDIDATES = 256  # nearest foods cached per food, before constraints are applied
+
+# Identical concurrent plan requests share one computation
+plan_requests = SingleFlight()
+
+# Opt-in tracemalloc snapshots for /admin/memory, grouped by line of this file
+memory_tracker = AllocationTracker(__file__)
+
+# Request fields that do not influence the generated plan (client retry metadata)
+MEAL_PLAN_VOLATILE_FIELDS = (
+    "user_profile.preferences.request_id",
+    "user_profile.preferences.client_timestamp",
+)
+
+# Columns of the meal slot export (name, Arrow type), filled by meal_plan_export_rows
+MEAL_EXPORT_COLUMNS = [
+    ("user_id", "string"), ("plan_id", "string"), ("date", "date"), ("meal_type", "string"),
+    ("food_id", "string"), ("food_name", "string"), ("category", "string"), ("is_senegalese", "bool"),
+    ("portion_g", "float64"), ("calories", "float64"), ("protein_g", "float64"),
+    ("carbs_g", "float64"), ("fat_g", "float64"), ("cost_xof", "float64")
+]
 
 class UserProfile(BaseModel):
     """User profile for nutrition planning"""
@@ -75,8 +205,9 @@ class MealPlanRequest(BaseModel):
     target_protein: Optional[int] = None
     target_carbs: Optional[int] = None
     target_fat: Optional[int] = None
-    days: int = 7
+    days: int = Field(7, ge=1)
     include_senegalese: bool = True
+    max_daily_cost_xof: Optional[float] = None
     meal_types: List[str] = Field(default_factory=lambda: ["breakfast", "lunch", "dinner", "snack"])
 
 class FoodItem(BaseModel):
@@ -134,6 +265,39 @@ class MealPlanResponse(BaseModel):
     total_cost_xof: Optional[float] = None
     shopping_list: Optional[List[Dict[str, Any]]] = None
     nutrition_summary: Dict[str, Any]
+    plan_id: Optional[str] = None
+
+class MealPlanChange(BaseModel):
+    """Change applied to a single meal slot of an existing plan"""
+    action: str = Field(..., description="replace_meal or exclude_food")
+    date: date
+    meal_type: str
+    food_id: Optional[str] = Field(None, description="Food to remove from the slot (exclude_food)")
+
+class MealPlanDeltaRequest(BaseModel):
+    """Request to re-plan one slot of an existing meal plan"""
+    plan: Optional[MealPlanResponse] = None
+    plan_id: Optional[str] = Field(None, description="Id of a plan held in the plan cache")
+    change: MealPlanChange
+    user_profile: Optional[UserProfile] = Field(None, description="Needed to keep excluding the user's allergens")
+
+class MealPlanSyncRequest(BaseModel):
+    """Request for what changed since the version of a plan a client holds"""
+    since: str = Field(..., description="plan_id of the version the client holds")
+    request: Optional[MealPlanRequest] = Field(None, description="Sync to the current plan for this request")
+    plan_id: Optional[str] = Field(None, description="Sync to this cached version instead, e.g. after a replan")
+
+class FoodLogEntry(BaseModel):
+    """One logged food"""
+    user_id: Optional[str] = Field(None, description="Defaults to the request's user_id")
+    date: date
+    food_id: str
+    grams: float = Field(..., ge=0)
+
+class FoodLogTotalsRequest(BaseModel):
+    """Logged foods of one or many users, over any number of days"""
+    user_id: Optional[str] = None
+    entries: List[FoodLogEntry]
 
 class NutritionRecommendation(BaseModel):
     """Nutrition recommendation"""
@@ -147,44 +311,177 @@ class NutritionRecommendation(BaseModel):
 def load_models():
     """Load AI models and data"""
     global nutrition_model, food_database, senegalese_foods, scaler, label_encoders
+    global plan_cache, plan_exporter, catalog_version, optimizer_budget_s, food_ranker, food_facets
     
     try:
         # Load nutrition recommendation model
-        model_path = os.getenv("NUTRITION_MODEL_PATH", "models/nutrition_recommendation_model.h5")
+        model_path = settings.path("NUTRITION_MODEL_PATH", "models/nutrition_recommendation_model.h5")
         if os.path.exists(model_path):
             nutrition_model = keras.models.load_model(model_path)
             logger.info("Nutrition model loaded successfully")
         
         # Load food database
-        food_db_path = os.getenv("FOOD_DATABASE_PATH", "data/food_database.json")
+        food_db_path = settings.path("FOOD_DATABASE_PATH", "data/food_database.json")
         if os.path.exists(food_db_path):
             with open(food_db_path, 'r', encoding='utf-8') as f:
                 food_database = json.load(f)
             logger.info("Food database loaded successfully")
         
         # Load Senegalese foods specifically
-        senegalese_path = os.getenv("SENEGALESE_FOODS_PATH", "data/senegalese_foods.json")
+        senegalese_path = settings.path("SENEGALESE_FOODS_PATH", "data/senegalese_foods.json")
         if os.path.exists(senegalese_path):
             with open(senegalese_path, 'r', encoding='utf-8') as f:
                 senegalese_foods = json.load(f)
             logger.info("Senegalese foods database loaded successfully")
         
         # Load scaler and encoders
-        scaler_path = os.getenv("SCALER_PATH", "models/scaler.pkl")
+        scaler_path = settings.path("SCALER_PATH", "models/scaler.pkl")
         if os.path.exists(scaler_path):
             scaler = joblib.load(scaler_path)
         
         # Load label encoders
-        encoders_path = os.getenv("ENCODERS_PATH", "models/label_encoders.pkl")
+        encoders_path = settings.path("ENCODERS_PATH", "models/label_encoders.pkl")
         if os.path.exists(encoders_path):
             label_encoders = joblib.load(encoders_path)
         
+        # Index foods for the meal optimizer
+        build_food_catalog()
+        optimizer_budget_s = float(settings.get("MEAL_OPTIMIZER_BUDGET_MS", "50")) / 1000
+        
+        # Optional model ranking: keras uses the model above, tflite / onnx an exported copy
+        ranking_runtime = settings.get("RANKING_RUNTIME", "").lower()
+        ranking_path = settings.path(
+            "RANKING_MODEL_PATH",
+            model_path if ranking_runtime == "keras" else f"{os.path.splitext(model_path)[0]}.{ranking_runtime}"
+        )
+        runner = load_runner(ranking_runtime, nutrition_model, ranking_path, int(settings.get("RANKING_THREADS", "1")))
+        food_ranker = ItemScorer(runner, scaler) if runner is not None else None
+        
+        # Cached plans are only valid for the catalog (and ranking model) they were computed from
+        catalog_version = canonical_request_hash({
+            "format": PLAN_FORMAT_VERSION,
+            "foods": senegalese_foods,
+            "food_database": food_database,
+            "ranking": model_fingerprint(ranking_runtime, ranking_path) if food_ranker else ""
+        })[:16]
+        if food_ranker is not None:
+            food_ranker.set_catalog(catalog_version, food_item_features())
+            logger.info(f"Food ranking model ready ({runner.runtime})")
+        food_facets = FacetIndex({
+            "category": [[food.get("category", "")] for food in senegalese_foods or []],
+            "allergen": [[allergen.lower() for allergen in food.get("allergens") or []] for food in senegalese_foods or []]
+        }, len(senegalese_foods or []), catalog_version)
+        
+        # Load persistent plan cache
+        cache_path = settings.path("PLAN_CACHE_PATH", "cache/meal_plans.sqlite")
+        if cache_path:
+            plan_cache = PlanCache(
+                cache_path,
+                ttl_seconds=int(settings.get("PLAN_CACHE_TTL_SECONDS", "86400")),
+                max_bytes=int(settings.get("PLAN_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+            )
+            dropped = plan_cache.set_catalog_version(catalog_version)
+            logger.info(f"Plan cache ready at {cache_path} (catalog {catalog_version}, {dropped} stale entries dropped)")
+        
+        # Optional columnar export of every generated plan for analytics
+        if plan_exporter is not None:
+            plan_exporter.close()
+            plan_exporter = None
+        export_dir = settings.path("PLAN_EXPORT_DIR", "")
+        if export_dir:
+            plan_exporter = PlanExporter(
+                export_dir, MEAL_EXPORT_COLUMNS, meal_plan_export_rows,
+                export_format=settings.get("PLAN_EXPORT_FORMAT", "parquet"),
+                row_group_rows=int(settings.get("PLAN_EXPORT_ROW_GROUP_ROWS", str(64 * 1024))),
+                file_rows=int(settings.get("PLAN_EXPORT_FILE_ROWS", str(1024 * 1024))),
+                prefix="meal_slots"
+            )
+            logger.info(f"Exporting generated plans to {export_dir} ({plan_exporter.export_format})")
+        
         logger.info("All models and data loaded successfully")
         
     except Exception as e:
         logger.error(f"Error loading models: {e}")
         raise
 
+def build_food_catalog():
+    """Pack the plannable foods into NumPy arrays for vectorized planning"""
+    global food_catalog, food_id_index, food_macro_matrix, food_cost_per_gram
+    global nutrient_columns, food_nutrient_matrix, food_substitute_space, food_substitute_norms
+    global food_categories, allergen_columns, food_allergen_matrix
+    
+    food_catalog = [
+        food for food in senegalese_foods or []
+        if food.get("is_senegalese", False) and food.get("calories_per_100g", 0) > 0
+    ]
+    food_id_index = {food["id"]: row for row, food in enumerate(food_catalog)}
+    food_macro_matrix = np.array([
+        [
+            food.get("calories_per_100g", 0),
+            food.get("protein_per_100g", 0),
+            food.get("carbs_per_100g", 0),
+            food.get("fat_per_100g", 0)
+        ]
+        for food in food_catalog
+    ], dtype=float).reshape(-1, 4) / 100
+    food_cost_per_gram = np.array([
+        estimate_food_cost(food.get("name_fr", food.get("name", "")), 1000) / 1000
+        for food in food_catalog
+    ], dtype=float)
+    
+    # Nested vitamin / mineral maps become dense columns next to the macros
+    vitamins = sorted({name for food in food_catalog for name in (food.get("vitamins") or {})})
+    minerals = sorted({name for food in food_catalog for name in (food.get("minerals") or {})})
+    nutrient_columns = MACRO_COLUMNS + [f"vitamin_{name}" for name in vitamins] + minerals
+    micro_matrix = np.zeros((len(food_catalog), len(vitamins) + len(minerals)))
+    for row, food in enumerate(food_catalog):
+        for col, name in enumerate(vitamins):
+            micro_matrix[row, col] = (food.get("vitamins") or {}).get(name, 0)
+        for col, name in enumerate(minerals):
+            micro_matrix[row, len(vitamins) + col] = (food.get("minerals") or {}).get(name, 0)
+    food_nutrient_matrix = np.hstack([food_macro_matrix, micro_matrix / 100])
+    
+    # Substitutes are compared on log-scaled, standardized amounts per 100 g, with the
+    # micronutrients scaled to weigh as much in total as the four macros
+    logged = np.log1p(food_nutrient_matrix * 100)
+    spread = logged.std(axis=0)
+    weights = np.ones(len(nutrient_columns))
+    weights[len(MACRO_COLUMNS):] = np.sqrt(len(MACRO_COLUMNS) / max(1, len(nutrient_columns) - len(MACRO_COLUMNS)))
+    food_substitute_space = (logged - logged.mean(axis=0)) / np.where(spread > 0, spread, 1) * weights
+    food_substitute_norms = np.einsum("ij,ij->i", food_substitute_space, food_substitute_space)
+    
+    food_categories = np.array([food.get("category", "") for food in food_catalog], dtype=object)
+    allergens = sorted({allergen.lower() for food in food_catalog for allergen in food.get("allergens") or []})
+    allergen_columns = {allergen: col for col, allergen in enumerate(allergens)}
+    food_allergen_matrix = np.zeros((len(food_catalog), len(allergens)), dtype=bool)
+    for row, food in enumerate(food_catalog):
+        for allergen in food.get("allergens") or []:
+            food_allergen_matrix[row, allergen_columns[allergen.lower()]] = True
+    
+    slot_candidates.clear()
+    meal_keyword_matches.clear()
+    food_neighbours.clear()
+
+def food_item_features() -> np.ndarray:
+    """(n_foods, 5) ranking model item features: macros per 100 g and encoded category"""
+    categories = np.array([
+        encode_label(label_encoders, "category", food.get("category", "")) for food in food_catalog
+    ], dtype=float)
+    return np.column_stack([food_macro_matrix * 100, categories])
+
+def food_context_features(user_profile: UserProfile, meal_type: str) -> tuple:
+    """Ranking model context features for a profile and meal type, in model input order"""
+    goal = user_profile.fitness_goals[0] if user_profile.fitness_goals else "maintenance"
+    return (
+        user_profile.age,
+        encode_label(label_encoders, "gender", user_profile.gender.lower()),
+        user_profile.height_cm,
+        user_profile.weight_kg,
+        encode_label(label_encoders, "activity_level", user_profile.activity_level.lower()),
+        encode_label(label_encoders, "fitness_goal", goal),
+        encode_label(label_encoders, "meal_type", meal_type)
+    )
+
 def calculate_bmr(weight_kg: float, height_cm: float, age: int, gender: str) -> float:
     """Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation"""
     if gender.lower() == "male":
@@ -204,6 +501,18 @@ def calculate_tdee(bmr: float, activity_level: str) -> float:
     }
     return bmr * activity_multipliers.get(activity_level.lower(), 1.2)
 
+def calculate_target_calories(user_profile: UserProfile, activity_level: Optional[str] = None) -> float:
+    """Daily calorie target: energy expenditure adjusted for the user's goals"""
+    bmr = calculate_bmr(user_profile.weight_kg, user_profile.height_cm, user_profile.age, user_profile.gender)
+    tdee = calculate_tdee(bmr, activity_level or user_profile.activity_level)
+    
+    # Adjust calories based on goals
+    if "weight_loss" in user_profile.fitness_goals:
+        return tdee - 500  # 500 calorie deficit
+    elif "muscle_gain" in user_profile.fitness_goals:
+        return tdee + 300  # 300 calorie surplus
+    return tdee
+
 def calculate_macro_targets(calories: int, goals: List[str]) -> Dict[str, int]:
     """Calculate macronutrient targets based on goals"""
     if "weight_loss" in goals:
@@ -229,54 +538,232 @@ def calculate_macro_targets(calories: int, goals: List[str]) -> Dict[str, int]:
         "carbs": int(carbs_cals / 4)       # 4 cal/g
     }
 
-def get_senegalese_food_suggestions(meal_type: str, target_calories: int) -> List[Dict[str, Any]]:
+def get_meal_keyword_matches(meal_type: str) -> np.ndarray:
+    """(n_foods,) number of the meal's keywords found in each food name, plus one for a suitable category"""
+    matches = meal_keyword_matches.get(meal_type)
+    if matches is None:
+        keywords = [kw.lower() for kw in MEAL_KEYWORDS.get(meal_type, [])]
+        categories = MEAL_CATEGORIES.get(meal_type, [])
+        matches = np.array([
+            sum(1 for kw in keywords if kw in food.get("name_fr", "").lower())
+            + (food.get("category", "") in categories)
+            for food in food_catalog
+        ], dtype=int)
+        meal_keyword_matches[meal_type] = matches
+    return matches
+
+def rank_foods_for_meal(
+    meal_type: str,
+    allergies: List[str] = None,
+    user_profile: Optional[UserProfile] = None
+) -> List[int]:
+    """
+    Catalog rows suitable for a meal, most relevant first, without the user's allergens.
+    With a ranking model and a profile, foods matching the meal equally well are
+    ordered by the model's score for that profile.
+    """
+    avoid = tuple(sorted(allergy.lower() for allergy in allergies or []))
+    key = (meal_type, avoid)
+    ranked = slot_candidates.get(key)
+    matches = get_meal_keyword_matches(meal_type)
+    
+    if ranked is None:
+        ranked = [
+            row for row, food in enumerate(food_catalog)
+            if not set(avoid) & {allergen.lower() for allergen in food.get("allergens") or []}
+        ]
+        ranked.sort(key=lambda row: matches[row], reverse=True)
+        slot_candidates[key] = ranked
+    
+    if food_ranker is None or user_profile is None or not ranked:
+        return ranked
+    
+    # The whole catalog is scored in one batch, then cached for the profile
+    scores = food_ranker.scores(food_context_features(user_profile, meal_type))
+    if scores is None:
+        return ranked
+    rows = np.array(ranked)
+    return rows[np.lexsort((-scores[rows], -matches[rows]))].tolist()
+
+def get_meal_candidates(ranked: List[int], day: int, matches: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Candidate foods for one day's meal, rotating through the most relevant foods for variety.
+    With the meal's matches, only foods relevant to the meal are candidates, as long as
+    there are enough of them to fill it.
+    """
+    pool = ranked[:2 * CANDIDATES_PER_MEAL]
+    if matches is not None:
+        relevant = [row for row in pool if matches[row] > 0]
+        if len(relevant) >= FOODS_PER_MEAL:
+            pool = relevant
+    if len(pool) <= CANDIDATES_PER_MEAL:
+        return pool
+    start = day % len(pool)
+    return [pool[(start + i) % len(pool)] for i in range(CANDIDATES_PER_MEAL)]
+
+def get_senegalese_food_suggestions(
+    meal_type: str,
+    target_calories: int,
+    user_profile: Optional[UserProfile] = None
+) -> List[Dict[str, Any]]:
     """Get Senegalese food suggestions for meal planning"""
-    if not senegalese_foods:
+    if not food_catalog:
         return []
     
     suggestions = []
-    for food in senegalese_foods:
-        if food.get("is_senegalese", False):
-            # Calculate appropriate portion size
-            calories_per_100g = food.get("calories_per_100g", 0)
-            if calories_per_100g > 0:
-                portion_g = min(300, target_calories / calories_per_100g * 100)
-                food_copy = food.copy()
-                food_copy["suggested_portion_g"] = portion_g
-                food_copy["estimated_calories"] = (portion_g / 100) * calories_per_100g
-                suggestions.append(food_copy)
-    
-    # Sort by relevance to meal type
-    meal_keywords = {
-        "breakfast": ["céréale", "lait", "pain", "œuf", "fruit"],
-        "lunch": ["riz", "poisson", "viande", "légume", "sauce"],
-        "dinner": ["poisson", "viande", "légume", "soupe"],
-        "snack": ["fruit", "noix", "yogourt", "pain"]
-    }
-    
-    keywords = meal_keywords.get(meal_type, [])
-    suggestions.sort(key=lambda x: sum(1 for kw in keywords if kw.lower() in x.get("name_fr", "").lower()), reverse=True)
+    allergies = user_profile.allergies if user_profile else []
+    for row in rank_foods_for_meal(meal_type, allergies, user_profile):
+        food = food_catalog[row]
+        # Calculate appropriate portion size
+        calories_per_100g = food.get("calories_per_100g", 0)
+        portion_g = min(300, target_calories / calories_per_100g * 100)
+        food_copy = food.copy()
+        food_copy["suggested_portion_g"] = portion_g
+        food_copy["estimated_calories"] = (portion_g / 100) * calories_per_100g
+        suggestions.append(food_copy)
     
     return suggestions[:10]  # Return top 10 suggestions
 
+def food_distances(row: int) -> np.ndarray:
+    """Distance in substitute space from one catalog food to every other (inf to itself)"""
+    squared = food_substitute_norms - 2 * food_substitute_space @ food_substitute_space[row] + food_substitute_norms[row]
+    distances = np.sqrt(np.maximum(squared, 0))
+    distances[row] = np.inf
+    return distances
+
+def nearest_foods(row: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The SUBSTITUTE_CANDIDATES catalog rows nearest to a food and their distances, cached per food"""
+    food_id = food_catalog[row]["id"]
+    cached = food_neighbours.get(food_id)
+    if cached is None:
+        distances = food_distances(row)
+        count = min(SUBSTITUTE_CANDIDATES, len(distances) - 1)
+        rows = np.argpartition(distances, count)[:count] if count < len(distances) - 1 else np.arange(len(distances))
+        rows = rows[np.argsort(distances[rows], kind="stable")][:count]
+        cached = food_neighbours[food_id] = (rows, distances[rows])
+    return cached
+
+def find_food_substitutes(
+    food_id: str,
+    k: int = 5,
+    allergen_free: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+    max_cost_per_kg: Optional[float] = None,
+    cheaper: bool = False
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Catalog row of a food and its k nearest substitutes meeting the constraints,
+    with their distances. Raises KeyError for foods outside the catalog.
+    """
+    row = food_id_index[food_id]
+    avoid = [allergen_columns[allergen.lower()] for allergen in allergen_free or [] if allergen.lower() in allergen_columns]
+    
+    def allowed(rows: np.ndarray) -> np.ndarray:
+        keep = np.ones(len(rows), dtype=bool)
+        if avoid:
+            keep &= ~food_allergen_matrix[np.ix_(rows, avoid)].any(axis=1)
+        if categories:
+            keep &= np.isin(food_categories[rows], categories)
+        if max_cost_per_kg is not None:
+            keep &= food_cost_per_gram[rows] * 1000 <= max_cost_per_kg
+        if cheaper:
+            keep &= food_cost_per_gram[rows] < food_cost_per_gram[row]
+        return keep
+    
+    # Constraints are checked on the cached neighbours only, unless too few of them pass
+    rows, distances = nearest_foods(row)
+    keep = allowed(rows)
+    if keep.sum() < k and len(rows) < len(food_catalog) - 1:
+        all_distances = food_distances(row)
+        candidates = np.flatnonzero(allowed(np.arange(len(food_catalog))) & np.isfinite(all_distances))
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(all_distances[candidates], k)[:k]]
+        rows = candidates[np.argsort(all_distances[candidates], kind="stable")]
+        return row, rows, all_distances[rows]
+    return row, rows[keep][:k], distances[keep][:k]
+
+def optimize_meal_slots(
+    slot_targets: np.ndarray,
+    slot_candidates_rows: List[List[int]],
+    daily_targets: np.ndarray,
+    slot_days: Optional[np.ndarray] = None,
+    max_daily_cost: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Choose foods and portions for many meal slots in one batched solve.
+    Returns the catalog rows involved and a (n_slots, n_rows) matrix of grams.
+    """
+    columns = np.unique(np.fromiter(
+        (row for rows in slot_candidates_rows for row in rows), dtype=int
+    ))
+    portions = np.zeros((len(slot_candidates_rows), len(columns)))
+    if not len(columns):
+        return columns, portions
+    
+    # Portion bounds double as the candidate / allergen mask
+    upper = np.zeros_like(portions)
+    for slot, rows in enumerate(slot_candidates_rows):
+        upper[slot, np.searchsorted(columns, rows)] = MAX_PORTION_G
+    
+    nutrients = food_macro_matrix[columns]
+    scale = 1 / np.maximum(daily_targets, 1)
+    
+    def solve(upper: np.ndarray, time_budget_s: float) -> np.ndarray:
+        # A daily budget is a constraint of the fit, so it picks cheaper foods rather than smaller portions
+        if max_daily_cost and slot_days is not None:
+            return solve_portions_within_budget(
+                nutrients, slot_targets, upper, scale, time_budget_s,
+                food_cost_per_gram[columns], slot_days, max_daily_cost
+            )
+        return solve_portions(nutrients, slot_targets, upper, scale, time_budget_s)[0]
+    
+    # First pass picks the foods, second pass fits portions of the kept ones
+    portions = solve(upper, optimizer_budget_s * 0.6)
+    upper = keep_largest(portions * nutrients[:, 0], upper, FOODS_PER_MEAL)
+    portions = solve(upper, optimizer_budget_s * 0.4)
+    # Dropping portions too small to serve only lowers each day's cost
+    portions[portions < MIN_PORTION_G] = 0
+    
+    # Rounded to the grams shown to users, so food estimates and summaries agree with a recompute
+    return columns, np.round(portions, 1)
+
+def build_meal_foods(columns: np.ndarray, portions: np.ndarray) -> List[Dict[str, Any]]:
+    """Food entries for one slot, largest portion first"""
+    foods = []
+    for col in np.argsort(-portions):
+        portion = float(portions[col])
+        if portion <= 0:
+            break
+        row = columns[col]
+        calories, protein, carbs, fat = food_macro_matrix[row] * portion
+        food = food_catalog[row].copy()
+        food["suggested_portion_g"] = round(portion, 1)
+        food["estimated_calories"] = float(calories)
+        food["estimated_protein_g"] = float(protein)
+        food["estimated_carbs_g"] = float(carbs)
+        food["estimated_fat_g"] = float(fat)
+        foods.append(food)
+    return foods
+
+def summarize_meal_foods(meal: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill a meal's totals from its foods"""
+    foods = meal["foods"]
+    meal["total_calories"] = sum(f.get("estimated_calories", 0) for f in foods)
+    meal["total_protein_g"] = sum(f.get("estimated_protein_g", 0) for f in foods)
+    meal["total_carbs_g"] = sum(f.get("estimated_carbs_g", 0) for f in foods)
+    meal["total_fat_g"] = sum(f.get("estimated_fat_g", 0) for f in foods)
+    return meal
+
 def generate_meal_plan(user_profile: UserProfile, request: MealPlanRequest) -> MealPlanResponse:
     """Generate personalized meal plan"""
     
     # Calculate calorie needs
-    bmr = calculate_bmr(user_profile.weight_kg, user_profile.height_cm, user_profile.age, user_profile.gender)
-    tdee = calculate_tdee(bmr, user_profile.activity_level)
-    
-    # Adjust calories based on goals
-    if "weight_loss" in user_profile.fitness_goals:
-        target_calories = tdee - 500  # 500 calorie deficit
-    elif "muscle_gain" in user_profile.fitness_goals:
-        target_calories = tdee + 300  # 300 calorie surplus
-    else:
-        target_calories = tdee
+    target_calories = calculate_target_calories(user_profile)
     
     # Override if specified in request
     if request.target_calories:
         target_calories = request.target_calories
+    target_calories = int(round(target_calories))
     
     # Calculate macro targets
     macro_targets = calculate_macro_targets(target_calories, user_profile.fitness_goals)
@@ -289,44 +776,60 @@ def generate_meal_plan(user_profile: UserProfile, request: MealPlanRequest) -> M
     if request.target_fat:
         macro_targets["fat"] = request.target_fat
     
-    # Generate meals for each day
-    meals = []
+    daily_targets = np.array([
+        target_calories, macro_targets["protein"], macro_targets["carbs"], macro_targets["fat"]
+    ], dtype=float)
+    
+    # Lay out every (day, meal) slot so all of them are optimized in one batch
     start_date = date.today()
+    meals = []
+    slot_targets = []
+    slot_rows = []
+    slot_days = []
     
-    for day in range(request.days):
-        day_date = start_date + pd.Timedelta(days=day)
-        day_meals = []
-        
-        for meal_type in request.meal_types:
-            # Calculate meal calories (rough distribution)
-            meal_calorie_ratios = {
-                "breakfast": 0.25,
-                "lunch": 0.35,
-                "dinner": 0.30,
-                "snack": 0.10
-            }
-            
-            meal_calories = target_calories * meal_calorie_ratios.get(meal_type, 0.25)
+    with tracer.span("rank_candidates"):
+        for day in range(request.days):
+            day_date = start_date + pd.Timedelta(days=day)
             
-            # Get food suggestions
-            if request.include_senegalese:
-                suggestions = get_senegalese_food_suggestions(meal_type, meal_calories)
-            else:
-                suggestions = []  # Use general food database
-            
-            # Create meal
-            meal = {
-                "date": day_date.isoformat(),
-                "meal_type": meal_type,
-                "target_calories": meal_calories,
-                "foods": suggestions[:3],  # Top 3 suggestions
-                "total_calories": sum(f.get("estimated_calories", 0) for f in suggestions[:3]),
-                "notes": generate_meal_notes(meal_type, user_profile.language)
-            }
-            
-            day_meals.append(meal)
-        
-        meals.extend(day_meals)
+            for meal_type in request.meal_types:
+                ratio = MEAL_CALORIE_RATIOS.get(meal_type, 0.25)
+                
+                if request.include_senegalese:
+                    candidates = get_meal_candidates(
+                        rank_foods_for_meal(meal_type, user_profile.allergies, user_profile), day,
+                        get_meal_keyword_matches(meal_type)
+                    )
+                else:
+                    candidates = []  # Use general food database
+                
+                meals.append({
+                    "date": day_date.isoformat(),
+                    "meal_type": meal_type,
+                    "target_calories": target_calories * ratio,
+                    "foods": [],
+                    "notes": generate_meal_notes(meal_type, user_profile.language)
+                })
+                slot_targets.append(daily_targets * ratio)
+                slot_rows.append(candidates)
+                slot_days.append(day)
+    
+    with tracer.span("optimize_meal_slots", {"slots": len(meals)}):
+        columns, portions = optimize_meal_slots(
+            np.array(slot_targets).reshape(-1, 4),
+            slot_rows,
+            daily_targets,
+            np.array(slot_days, dtype=int),
+            request.max_daily_cost_xof
+        )
+    for slot, meal in enumerate(meals):
+        meal["foods"] = build_meal_foods(columns, portions[slot])
+        summarize_meal_foods(meal)
+    
+    # Per-day nutrient totals in one product of day portions x nutrients
+    day_portions = np.zeros((request.days, len(columns)))
+    np.add.at(day_portions, np.array(slot_days, dtype=int), portions)
+    daily_nutrients = day_portions @ food_nutrient_matrix[columns]
+    dates = [(start_date + pd.Timedelta(days=day)).isoformat() for day in range(request.days)]
     
     # Generate shopping list
     shopping_list = generate_shopping_list(meals)
@@ -335,9 +838,10 @@ def generate_meal_plan(user_profile: UserProfile, request: MealPlanRequest) -> M
     total_cost = calculate_estimated_cost(shopping_list)
     
     # Generate nutrition summary
-    nutrition_summary = generate_nutrition_summary(meals, macro_targets)
+    nutrition_summary = generate_nutrition_summary(meals, macro_targets, daily_nutrients, dates)
     
-    return MealPlanResponse(
+    return build_model(
+        MealPlanResponse,
         user_id=user_profile.user_id,
         start_date=start_date,
         end_date=start_date + pd.Timedelta(days=request.days - 1),
@@ -351,6 +855,202 @@ def generate_meal_plan(user_profile: UserProfile, request: MealPlanRequest) -> M
         nutrition_summary=nutrition_summary
     )
 
+def assign_meal_plan_ids(plan: MealPlanResponse, slots: Optional[List[int]] = None) -> MealPlanResponse:
+    """
+    Content-hash ids for the meals and for the plan, so unchanged meals keep
+    their ids across versions. With slots, only those meals (and any without
+    an id) are hashed again; the plan id only needs the meal ids.
+    """
+    for slot, meal in enumerate(plan.meals):
+        if slots is None or slot in slots or not meal.get("id"):
+            meal["id"] = content_id("meal", meal)
+    plan.plan_id = plan_content_id(
+        "meal_plan",
+        plan.model_dump(exclude={"meals", "plan_id"}),
+        [meal["id"] for meal in plan.meals]
+    )
+    return plan
+
+def meal_plan_request_key(request: MealPlanRequest) -> str:
+    """Canonical hash of a meal plan request (plans start today, so the date is part of the key)"""
+    return canonical_request_hash(
+        request.model_dump(mode="json"),
+        MEAL_PLAN_VOLATILE_FIELDS,
+        salt=date.today().isoformat()
+    )
+
+def get_or_generate_meal_plan(request: MealPlanRequest, key: Optional[str] = None) -> Tuple[bytes, str]:
+    """Return the JSON-encoded meal plan for a request and its plan_id, served from the plan cache when possible"""
+    key = key or meal_plan_request_key(request)
+    
+    if plan_cache is not None:
+        with tracer.span("plan_cache.get") as span:
+            entry = plan_cache.get_entry(key)
+            # Entries cached before plan ids were stored with them are regenerated
+            cached = entry if entry is not None and entry[1] else None
+            span.set_attribute("hit", cached is not None)
+        if cached is not None:
+            return cached
+    
+    with tracer.span("generate_meal_plan", {"days": request.days, "meal_types": len(request.meal_types)}):
+        meal_plan = assign_meal_plan_ids(generate_meal_plan(request.user_profile, request))
+    with tracer.span("encode_plan"):
+        payload = encode_model(meal_plan)
+    if plan_exporter is not None:
+        with tracer.span("export_plan"):
+            plan_exporter.export(loads(payload))
+    
+    if plan_cache is not None:
+        # Under the request for reuse, and under its plan_id for replans and delta syncs
+        with tracer.span("plan_cache.put"):
+            plan_cache.put(key, payload, plan_id=meal_plan.plan_id)
+            plan_cache.put(meal_plan.plan_id, payload, plan_id=meal_plan.plan_id)
+    
+    return payload, meal_plan.plan_id
+
+def plan_response(payload: bytes, plan_id: str, if_none_match: Optional[str] = None):
+    """Serve an encoded plan as-is (re-validated in strict mode) with its ETag, or 304 if the client has it"""
+    headers = {"ETag": plan_etag(plan_id)}
+    if etag_matches(if_none_match, plan_id):
+        return Response(status_code=304, headers=headers)
+    if strict_validation():
+        MealPlanResponse.model_validate_json(payload)
+    return JSONBytesResponse(payload, headers=headers)
+
+def run_meal_plan_job(payload: Dict[str, Any]) -> bytes:
+    """Job handler: generate the meal plan for a queued request"""
+    return get_or_generate_meal_plan(MealPlanRequest.model_validate(payload))[0]
+
+def run_meal_plan_batch_job(payload: Dict[str, Any]) -> bytes:
+    """Job handler: generate meal plans for a whole cohort of queued requests"""
+    plans = [get_or_generate_meal_plan(MealPlanRequest.model_validate(item))[0] for item in payload["requests"]]
+    return b"[" + b",".join(plans) + b"]"
+
+def meal_plan_export_rows(plan: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Meal slot rows of an encoded meal plan as column lists, one row per planned food"""
+    columns = {name: [] for name, _ in MEAL_EXPORT_COLUMNS}
+    for meal in plan.get("meals", []):
+        for food in meal.get("foods", []):
+            portion = food.get("suggested_portion_g", 0)
+            row = (
+                plan.get("user_id"), plan.get("plan_id"), meal.get("date"), meal.get("meal_type"),
+                food.get("id"), food.get("name"), food.get("category"), food.get("is_senegalese", False),
+                portion, food.get("estimated_calories", 0), food.get("estimated_protein_g", 0),
+                food.get("estimated_carbs_g", 0), food.get("estimated_fat_g", 0),
+                estimate_food_cost(food.get("name_fr", food.get("name", "")), portion)
+            )
+            for (name, _), value in zip(MEAL_EXPORT_COLUMNS, row):
+                columns[name].append(value)
+    return columns
+
+def find_meal_slot(plan: MealPlanResponse, day: date, meal_type: str) -> int:
+    """Locate a meal in the plan without scanning other days (meals are stored day by day)"""
+    day_offset = (day - plan.start_date).days
+    if not plan.meals or day_offset < 0 or day > plan.end_date:
+        raise ValueError(f"Date {day.isoformat()} is outside the plan")
+    
+    first_date = plan.meals[0]["date"]
+    meals_per_day = 0
+    while meals_per_day < len(plan.meals) and plan.meals[meals_per_day]["date"] == first_date:
+        meals_per_day += 1
+    
+    start = day_offset * meals_per_day
+    for index in range(start, min(start + meals_per_day, len(plan.meals))):
+        if plan.meals[index]["meal_type"] == meal_type:
+            return index
+    raise ValueError(f"No {meal_type} planned on {day.isoformat()}")
+
+def update_shopping_list(index: Dict[str, Dict[str, Any]], foods: List[Dict[str, Any]], sign: int) -> float:
+    """Add (sign=1) or remove (sign=-1) foods from an indexed shopping list, returning the cost delta"""
+    cost_delta = 0.0
+    for food in foods:
+        food_name = food.get("name_fr", food.get("name", ""))
+        portion = food.get("suggested_portion_g", 0)
+        item = index.get(food_name)
+        if item is None:
+            item = {"name": food_name, "category": food.get("category", ""), "total_grams": 0.0, "estimated_cost_xof": 0.0}
+            index[food_name] = item
+        
+        previous_cost = item["estimated_cost_xof"]
+        item["total_grams"] = max(0.0, item["total_grams"] + sign * portion)
+        item["estimated_cost_xof"] = estimate_food_cost(food_name, item["total_grams"])
+        cost_delta += item["estimated_cost_xof"] - previous_cost
+    return cost_delta
+
+def replan_meal_slot(
+    plan: MealPlanResponse,
+    change: MealPlanChange,
+    user_profile: Optional[UserProfile] = None
+) -> MealPlanResponse:
+    """Recompute one meal slot and update the plan's aggregates incrementally"""
+    slot = find_meal_slot(plan, change.date, change.meal_type)
+    meal = plan.meals[slot]
+    old_foods = meal.get("foods", [])
+    
+    if change.action == "replace_meal":
+        excluded = {food.get("id") for food in old_foods}
+        kept = []
+    elif change.action == "exclude_food":
+        if not change.food_id:
+            raise ValueError("food_id is required to exclude a food")
+        excluded = {change.food_id}
+        kept = [food for food in old_foods if food.get("id") != change.food_id]
+    else:
+        raise ValueError(f"Unknown change action: {change.action}")
+    
+    # Re-optimize the slot over the kept foods and the next best candidates
+    allergies = user_profile.allergies if user_profile else []
+    ranked = [row for row in rank_foods_for_meal(change.meal_type, allergies, user_profile)
+              if food_catalog[row]["id"] not in excluded]
+    day = (change.date - plan.start_date).days
+    candidates = [food_id_index[food["id"]] for food in kept if food.get("id") in food_id_index]
+    candidates += [
+        row for row in get_meal_candidates(ranked, day, get_meal_keyword_matches(change.meal_type))
+        if row not in candidates
+    ]
+    
+    daily_targets = np.array([
+        plan.target_calories, plan.target_protein, plan.target_carbs, plan.target_fat
+    ], dtype=float)
+    ratio = MEAL_CALORIE_RATIOS.get(change.meal_type, 0.25)
+    columns, portions = optimize_meal_slots(np.array([daily_targets * ratio]), [candidates], daily_targets)
+    new_foods = build_meal_foods(columns, portions[0])
+    
+    new_meal = dict(meal)
+    new_meal["foods"] = new_foods
+    summarize_meal_foods(new_meal)
+    plan.meals[slot] = new_meal
+    
+    # Shopping list and cost are additive over foods
+    shopping_index = {item["name"]: item for item in plan.shopping_list or []}
+    cost_delta = update_shopping_list(shopping_index, old_foods, -1)
+    cost_delta += update_shopping_list(shopping_index, new_foods, 1)
+    plan.shopping_list = [item for item in shopping_index.values() if item["total_grams"] > 1e-6]
+    plan.total_cost_xof = (plan.total_cost_xof or 0) + cost_delta
+    
+    # Nutrition summary keeps additive per-day and plan totals, so only the slot delta is applied
+    summary = plan.nutrition_summary or {}
+    targets = summary.get("macro_targets") or {
+        "protein": plan.target_protein, "carbs": plan.target_carbs, "fat": plan.target_fat
+    }
+    daily_totals = summary.get("daily_totals")
+    totals = summary.get("totals")
+    if (isinstance(totals, dict) and isinstance(daily_totals, list) and day < len(daily_totals)
+            and isinstance(daily_totals[day], dict)):
+        delta = foods_nutrient_vector(new_foods) - foods_nutrient_vector(old_foods)
+        daily_totals = list(daily_totals)
+        day_entry = dict(daily_totals[day])
+        for col, name in enumerate(nutrient_columns):
+            day_entry[name] = float(day_entry.get(name, 0)) + delta[col]
+        daily_totals[day] = day_entry
+        totals = np.array([float(totals.get(name, 0)) for name in nutrient_columns]) + delta
+        plan.nutrition_summary = build_nutrition_summary(totals, daily_totals, targets)
+    else:
+        # Plans sent by clients may carry a partial summary: rebuild it from the meals
+        plan.nutrition_summary = generate_nutrition_summary(plan.meals, targets)
+    
+    return assign_meal_plan_ids(plan, slots=[slot])
+
 def generate_meal_notes(meal_type: str, language: str) -> str:
     """Generate meal-specific notes"""
     notes = {
@@ -385,10 +1085,13 @@ def generate_shopping_list(meals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 shopping_items[food_name] = {
                     "name": food_name,
                     "category": food.get("category", ""),
-                    "total_grams": portion,
-                    "estimated_cost_xof": estimate_food_cost(food_name, portion)
+                    "total_grams": portion
                 }
     
+    # Cost is linear in weight, so price each item once on its total
+    for item in shopping_items.values():
+        item["estimated_cost_xof"] = estimate_food_cost(item["name"], item["total_grams"])
+    
     return list(shopping_items.values())
 
 def estimate_food_cost(food_name: str, grams: float) -> float:
@@ -413,12 +1116,120 @@ def calculate_estimated_cost(shopping_list: List[Dict[str, Any]]) -> float:
     """Calculate total estimated cost"""
     return sum(item.get("estimated_cost_xof", 0) for item in shopping_list)
 
-def generate_nutrition_summary(meals: List[Dict[str, Any]], targets: Dict[str, int]) -> Dict[str, Any]:
-    """Generate nutrition summary"""
-    total_calories = sum(meal.get("total_calories", 0) for meal in meals)
-    avg_daily_calories = total_calories / (len(meals) / len(set(meal["date"] for meal in meals)))
+def foods_nutrient_vector(foods: List[Dict[str, Any]]) -> np.ndarray:
+    """Nutrient totals of a list of planned foods"""
+    rows = [food_id_index[food["id"]] for food in foods if food.get("id") in food_id_index]
+    grams = np.array([food.get("suggested_portion_g", 0) for food in foods if food.get("id") in food_id_index])
+    if not rows:
+        return np.zeros(len(nutrient_columns))
+    return grams @ food_nutrient_matrix[rows]
+
+def generate_nutrition_summary(
+    meals: List[Dict[str, Any]],
+    targets: Dict[str, int],
+    daily_nutrients: Optional[np.ndarray] = None,
+    dates: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Generate nutrition summary, from precomputed (days, nutrients) totals when available"""
+    if daily_nutrients is None:
+        # Gather every planned food once and reduce with a single product
+        dates = list(dict.fromkeys(meal["date"] for meal in meals))
+        day_of = {day: index for index, day in enumerate(dates)}
+        day_index, rows, grams = [], [], []
+        for meal in meals:
+            for food in meal.get("foods", []):
+                if food.get("id") in food_id_index:
+                    day_index.append(day_of[meal["date"]])
+                    rows.append(food_id_index[food["id"]])
+                    grams.append(food.get("suggested_portion_g", 0))
+        day_portions = np.zeros((len(dates), len(food_catalog)))
+        np.add.at(day_portions, (np.array(day_index, dtype=int), np.array(rows, dtype=int)), grams)
+        daily_nutrients = day_portions @ food_nutrient_matrix
+    
+    daily_totals = [
+        {"date": day, **dict(zip(nutrient_columns, values.tolist()))}
+        for day, values in zip(dates, daily_nutrients)
+    ]
+    return build_nutrition_summary(daily_nutrients.sum(axis=0), daily_totals, targets)
+
+def food_log_totals(request: FoodLogTotalsRequest) -> Dict[str, Any]:
+    """Per-user, per-day nutrient totals of logged foods, with one gather and one segmented sum"""
+    entries = request.entries
+    day_index: Dict[Tuple[str, date], int] = {}
+    groups = np.fromiter(
+        (day_index.setdefault((entry.user_id or request.user_id or "", entry.date), len(day_index)) for entry in entries),
+        dtype=np.int64, count=len(entries)
+    )
+    rows = np.fromiter((food_id_index.get(entry.food_id, -1) for entry in entries), dtype=np.int64, count=len(entries))
+    grams = np.fromiter((entry.grams for entry in entries), dtype=float, count=len(entries))
+    
+    # Entries sorted by (user, day) make every day a contiguous run of gathered nutrient rows
+    known = np.flatnonzero(rows >= 0)
+    known = known[np.argsort(groups[known], kind="stable")]
+    day_totals = np.zeros((len(day_index), len(nutrient_columns)))
+    day_entries = np.bincount(groups[known], minlength=len(day_index))
+    if len(known):
+        sorted_groups = groups[known]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+        contributions = food_nutrient_matrix[rows[known]] * grams[known, None]
+        day_totals[sorted_groups[starts]] = np.add.reduceat(contributions, starts, axis=0)
+    
+    users: Dict[str, List[Tuple[date, int]]] = {}
+    for (user_id, day), index in day_index.items():
+        users.setdefault(user_id, []).append((day, index))
+    
+    # Converted to Python values once, not per day
+    day_values = day_totals.tolist()
+    entry_counts = day_entries.tolist()
+    day_names = {day: day.isoformat() for _, day in day_index}
+    
+    results = []
+    for user_id, days in users.items():
+        days.sort()
+        indexes = [index for _, index in days]
+        totals = day_totals[indexes].sum(axis=0)
+        average_daily = dict(zip(nutrient_columns, (totals / len(days)).tolist()))
+        results.append({
+            "user_id": user_id,
+            "days": [
+                {"date": day_names[day], "entries": entry_counts[index], **dict(zip(nutrient_columns, day_values[index]))}
+                for day, index in days
+            ],
+            "totals": dict(zip(nutrient_columns, totals.tolist())),
+            "average_daily": average_daily,
+            "percent_reference_intake": {
+                name: average_daily[name] / DAILY_REFERENCE_INTAKES[name] * 100
+                for name in nutrient_columns if name in DAILY_REFERENCE_INTAKES
+            }
+        })
     
     return {
+        "users": results,
+        "entries": len(entries),
+        "unknown_food_ids": sorted({entries[i].food_id for i in np.flatnonzero(rows < 0).tolist()})
+    }
+
+def build_nutrition_summary(
+    totals: np.ndarray,
+    daily_totals: List[Dict[str, Any]],
+    targets: Dict[str, int]
+) -> Dict[str, Any]:
+    """Build the nutrition summary from additive plan totals"""
+    days = len(daily_totals)
+    averages = totals / days if days else np.zeros_like(totals)
+    average_daily = dict(zip(nutrient_columns, averages.tolist()))
+    avg_daily_calories = average_daily.get("calories", 0)
+    
+    return {
+        "total_calories": float(totals[0]) if len(totals) else 0,
+        "days": days,
+        "totals": dict(zip(nutrient_columns, totals.tolist())),
+        "daily_totals": daily_totals,
+        "average_daily": average_daily,
+        "percent_reference_intake": {
+            name: average_daily[name] / DAILY_REFERENCE_INTAKES[name] * 100
+            for name in nutrient_columns if name in DAILY_REFERENCE_INTAKES
+        },
         "average_daily_calories": avg_daily_calories,
         "target_calories": targets.get("protein", 0) * 4 + targets.get("carbs", 0) * 4 + targets.get("fat", 0) * 9,
         "calorie_deficit": targets.get("protein", 0) * 4 + targets.get("carbs", 0) * 4 + targets.get("fat", 0) * 9 - avg_daily_calories,
@@ -441,30 +1252,185 @@ def generate_nutrition_recommendations(calories: float, targets: Dict[str, int])
     
     return recommendations
 
+# Common profiles whose rankings and plans are computed during warm-up
+WARMUP_PROFILES = [
+    {"age": 30, "gender": "male", "height_cm": 175, "weight_kg": 78, "activity_level": "moderate", "fitness_goals": ["weight_loss"]},
+    {"age": 30, "gender": "female", "height_cm": 163, "weight_kg": 65, "activity_level": "light", "fitness_goals": ["weight_loss"]},
+    {"age": 28, "gender": "female", "height_cm": 165, "weight_kg": 60, "activity_level": "moderate", "fitness_goals": ["maintenance"]},
+    {"age": 25, "gender": "male", "height_cm": 178, "weight_kg": 70, "activity_level": "active", "fitness_goals": ["muscle_gain"]}
+]
+
+def warm_up(readiness: Readiness):
+    """Load and index the catalogs, warm models and caches, then start the job queue"""
+    global job_queue
+    with readiness.phase("load_models"):
+        load_models()
+    
+    profiles = [UserProfile(user_id=f"warmup-{i}", **profile) for i, profile in enumerate(WARMUP_PROFILES)]
+    with readiness.phase("models"):
+        # A dummy batch (or the real ranking batches) traces the model graph
+        if food_ranker is not None:
+            for profile in profiles:
+                for meal_type in MEAL_CALORIE_RATIOS:
+                    food_ranker.scores(food_context_features(profile, meal_type))
+        elif nutrition_model is not None:
+            run_dummy_batch(nutrition_model)
+    
+    with readiness.phase("plan_caches"):
+        # Fills slot candidates and keyword matches and exercises the optimizer
+        for profile in profiles:
+            generate_meal_plan(profile, MealPlanRequest(user_profile=profile))
+    
+    with readiness.phase("job_queue"):
+        # Start the durable plan job queue
+        job_queue = JobQueue(
+            settings.path("JOB_QUEUE_PATH", "cache/meal_jobs.sqlite"),
+            {
+                "meal-plan": run_meal_plan_job,
+                "meal-plan-batch": run_meal_plan_batch_job
+            },
+            workers=int(settings.get("JOB_WORKERS", "2"))
+        )
+        job_queue.start()
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize models on startup"""
-    load_models()
+    """Warm up in the background; /health/live answers meanwhile and /health/ready once done"""
+    readiness.start(warm_up)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers and finish the export file"""
+    if job_queue is not None:
+        job_queue.stop()
+    if plan_exporter is not None:
+        plan_exporter.close()
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
-        "status": "healthy",
+        "status": "healthy" if readiness.ready else readiness.report()["status"],
         "timestamp": datetime.now().isoformat(),
-        "models_loaded": nutrition_model is not None
+        "models_loaded": nutrition_model is not None,
+        "ranking": food_ranker.stats() if food_ranker else None,
+        "tracing": tracer.exporter.stats() if tracer.exporter else None,
+        "plan_export": plan_exporter.stats() if plan_exporter else None
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: catalogs indexed, caches warm and models run once, with per-phase timings"""
+    return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
 @app.post("/generate-meal-plan", response_model=MealPlanResponse)
-async def generate_meal_plan_endpoint(request: MealPlanRequest):
+async def generate_meal_plan_endpoint(request: MealPlanRequest, if_none_match: Optional[str] = Header(None)):
     """Generate personalized meal plan"""
     try:
-        meal_plan = generate_meal_plan(request.user_profile, request)
-        return meal_plan
+        key = meal_plan_request_key(request)
+        payload, plan_id = await plan_requests.do(key, get_or_generate_meal_plan, request, key)
+        return plan_response(payload, plan_id, if_none_match)
     except Exception as e:
         logger.error(f"Error generating meal plan: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def submit_plan_job(kind: str, payload: Dict[str, Any], callback_url: Optional[str]) -> Dict[str, Any]:
+    """Queue a plan job and describe where to poll for it"""
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue not started")
+    try:
+        job_id = job_queue.submit(kind, payload, callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.post("/jobs/meal-plan", status_code=202)
+async def submit_meal_plan_job(request: MealPlanRequest, callback_url: Optional[str] = None):
+    """Queue meal plan generation and return a job id immediately"""
+    return submit_plan_job("meal-plan", request.model_dump(mode="json"), callback_url)
+
+@app.post("/jobs/meal-plan/batch", status_code=202)
+async def submit_meal_plan_batch_job(batch: List[MealPlanRequest], callback_url: Optional[str] = None):
+    """Queue meal plan generation for a cohort of users as a single job"""
+    payload = {"requests": [request.model_dump(mode="json") for request in batch]}
+    return submit_plan_job("meal-plan-batch", payload, callback_url)
+
+@app.get("/jobs/{job_id}")
+async def get_plan_job(job_id: str):
+    """Get job status, including the generated plan once it has succeeded"""
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue not started")
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/meal-plan/replan", response_model=MealPlanResponse)
+async def replan_meal_plan_endpoint(request: MealPlanDeltaRequest):
+    """Swap one meal or exclude one food without regenerating the whole plan"""
+    plan = request.plan
+    if plan is None and request.plan_id and plan_cache is not None:
+        cached = plan_cache.get(request.plan_id)
+        if cached is not None:
+            plan = MealPlanResponse.model_validate_json(cached)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found; send the plan or a cached plan_id")
+    
+    try:
+        plan = replan_meal_slot(plan, request.change, request.user_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (KeyError, TypeError) as e:
+        # Meals and summaries are free-form dicts, so a client-sent plan may lack fields or mistype them
+        raise HTTPException(status_code=400, detail=f"Malformed plan: {type(e).__name__}: {e}")
+    
+    # Keep the re-planned version addressable for further swaps
+    payload = encode_model(plan)
+    if plan_cache is not None:
+        plan_cache.put(plan.plan_id, payload, plan_id=plan.plan_id)
+    return plan_response(payload, plan.plan_id)
+
+@app.post("/meal-plan/delta")
+async def meal_plan_delta_endpoint(sync: MealPlanSyncRequest, if_none_match: Optional[str] = Header(None)):
+    """Only the meals and plan fields that changed since the version a client holds (304 if none)"""
+    if sync.request is not None:
+        key = meal_plan_request_key(sync.request)
+        try:
+            payload, plan_id = await plan_requests.do(key, get_or_generate_meal_plan, sync.request, key)
+        except Exception as e:
+            logger.error(f"Error generating meal plan: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    elif sync.plan_id:
+        payload = plan_cache.get(sync.plan_id) if plan_cache is not None else None
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Plan not found in the plan cache")
+        # Plans are cached under their plan_id
+        plan_id = sync.plan_id
+    else:
+        raise HTTPException(status_code=400, detail="Send the plan request or the plan_id to sync to")
+    
+    headers = {"ETag": plan_etag(plan_id)}
+    if plan_id == sync.since or etag_matches(if_none_match, plan_id):
+        return Response(status_code=304, headers=headers)
+    
+    # Versions the cache no longer holds are synced in full
+    base = plan_cache.get(sync.since) if plan_cache is not None else None
+    plan = loads(payload)
+    delta = plan_delta(loads(base), plan, "meals") if base is not None else full_plan_delta(sync.since, plan)
+    return JSONBytesResponse(dumps(delta), headers=headers)
+
+@app.post("/food-log/totals")
+async def get_food_log_totals(request: FoodLogTotalsRequest):
+    """Daily calories, macros and micronutrients of logged foods, for one or many users"""
+    if not food_catalog:
+        raise HTTPException(status_code=404, detail="Senegalese foods database not loaded")
+    return JSONBytesResponse(dumps(food_log_totals(request)))
+
 @app.post("/nutrition-recommendations")
 async def get_nutrition_recommendations(user_profile: UserProfile):
     """Get personalized nutrition recommendations"""
@@ -521,16 +1487,62 @@ async def get_nutrition_recommendations(user_profile: UserProfile):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/senegalese-foods")
-async def get_senegalese_foods(category: Optional[str] = None):
-    """Get Senegalese food database"""
-    if not senegalese_foods:
+async def get_senegalese_foods(
+    category: Optional[List[str]] = Query(None),
+    allergen_free: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Browse the Senegalese food database with filters, facet counts and cursor pagination"""
+    if not senegalese_foods or food_facets is None:
+        raise HTTPException(status_code=404, detail="Senegalese foods database not loaded")
+    
+    try:
+        page = food_facets.query(
+            {"category": category},
+            exclude={"allergen": [allergen.lower() for allergen in allergen_free or []]},
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "foods": [senegalese_foods[row] for row in page["rows"].tolist()],
+        "total": page["total"],
+        "next_cursor": page["next_cursor"],
+        "facets": page["facets"]
+    }
+
+@app.get("/food-substitutes")
+async def get_food_substitutes(
+    food_id: str,
+    k: int = Query(5, ge=1, le=50),
+    allergen_free: Optional[List[str]] = Query(None),
+    category: Optional[List[str]] = Query(None),
+    max_cost_per_kg: Optional[float] = Query(None, ge=0),
+    cheaper: bool = False
+):
+    """Foods closest in nutrients to a given food, without the given allergens and within category and price limits"""
+    if not food_catalog:
         raise HTTPException(status_code=404, detail="Senegalese foods database not loaded")
     
-    if category:
-        filtered_foods = [food for food in senegalese_foods if food.get("category") == category]
-        return {"foods": filtered_foods}
+    try:
+        row, rows, distances = find_food_substitutes(food_id, k, allergen_free, category, max_cost_per_kg, cheaper)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Food not found: {food_id}")
     
-    return {"foods": senegalese_foods}
+    return {
+        "food": {**food_catalog[row], "cost_per_kg_xof": round(float(food_cost_per_gram[row] * 1000), 1)},
+        "substitutes": [
+            {
+                **food_catalog[substitute],
+                "distance": round(float(distance), 4),
+                "cost_per_kg_xof": round(float(food_cost_per_gram[substitute] * 1000), 1)
+            }
+            for substitute, distance in zip(rows.tolist(), distances.tolist())
+        ]
+    }
 
 @app.post("/food-search")
 async def search_foods(query: str, language: str = "fr"):
@@ -555,6 +1567,79 @@ async def search_foods(query: str, language: str = "fr"):
     
     return {"results": results[:20]}  # Limit to 20 results
 
+def memory_components() -> Dict[str, Dict[str, Any]]:
+    """The service's long-lived data, by group, for /admin/memory"""
+    return {
+        "catalogs": {
+            "food_database": food_database,
+            "senegalese_foods": senegalese_foods,
+            "food_catalog": food_catalog
+        },
+        "indexes": {
+            "food_id_index": food_id_index,
+            "food_macro_matrix": food_macro_matrix,
+            "food_cost_per_gram": food_cost_per_gram,
+            "food_nutrient_matrix": food_nutrient_matrix,
+            "food_substitute_space": food_substitute_space,
+            "food_substitute_norms": food_substitute_norms,
+            "food_categories": food_categories,
+            "food_allergen_matrix": food_allergen_matrix,
+            "food_facets": food_facets
+        },
+        "caches": {
+            "slot_candidates": slot_candidates,
+            "meal_keyword_matches": meal_keyword_matches,
+            "food_neighbours": food_neighbours
+        },
+        "models": {
+            "food_ranker": food_ranker,
+            "scaler": scaler,
+            "label_encoders": label_encoders
+        }
+    }
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+def get_memory_report():
+    """Process memory and the size of each catalog, index, cache and model"""
+    return {
+        "service": "nutrition-ai",
+        "timestamp": datetime.now().isoformat(),
+        "process": process_memory(),
+        "components": component_sizes(memory_components()),
+        "nutrition_model_bytes": model_memory(nutrition_model),
+        "plan_cache": plan_cache.stats() if plan_cache is not None else None,
+        "tracing": memory_tracker.status()
+    }
+
+@app.post("/admin/memory/tracing/start", dependencies=[Depends(require_admin)])
+def start_memory_tracing(frames: int = Query(16, ge=1, le=64)):
+    """Start tracemalloc; allocations made before this are not tracked"""
+    return memory_tracker.start(frames)
+
+@app.post("/admin/memory/tracing/stop", dependencies=[Depends(require_admin)])
+def stop_memory_tracing():
+    """Stop tracemalloc and drop its snapshots"""
+    return memory_tracker.stop()
+
+@app.post("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+def take_memory_snapshot(name: str, limit: int = Query(20, ge=1, le=200)):
+    """Take a named snapshot and return its top allocation sites"""
+    try:
+        return memory_tracker.snapshot(name, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+def get_memory_diff(first: str, second: Optional[str] = None, limit: int = Query(20, ge=1, le=200)):
+    """Allocation growth by site between two snapshots, or between one and now"""
+    try:
+        return memory_tracker.diff(first, second, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # Uvicorn's loggers go through the queue too; RequestTracing writes the access log
+    uvicorn.run(app, host="0.0.0.0", port=8001, log_config=None, access_log=False)
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+Arcadis Fit - Meal portion optimizer
+Batched box-constrained least squares fitting food portions to macro targets,
+optionally under a daily cost cap
+"""
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Relative weight of calories, protein, carbs and fat deviations
+MACRO_WEIGHTS = np.array([4.0, 1.0, 1.0, 1.0])
+
+# Penalty per squared gram of portion, in units of squared relative macro error
+PORTION_RIDGE = 1e-7
+
+MAX_ITERATIONS = 2000
+CONVERGENCE_GRAMS = 0.05
+CONVERGENCE_RELATIVE = 1e-5
+CHECK_EVERY = 16
+
+# Bisection steps on each over-budget day's cost multiplier
+COST_BISECTION_STEPS = 12
+
+
+def solve_portions(
+    nutrients: np.ndarray,
+    targets: np.ndarray,
+    upper: np.ndarray,
+    scale: np.ndarray,
+    time_budget_s: float,
+    ridge: float = PORTION_RIDGE,
+    linear: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, int]:
+    """
+    Fit portions for a batch of slots at once.
+
+    nutrients: (n_foods, 4) calories, protein, carbs, fat per gram
+    targets:   (n_slots, 4) slot targets in the same units
+    upper:     (n_slots, n_foods) portion upper bounds in grams, 0 for excluded foods
+    scale:     (4,) normalization of each macro (typically 1 / daily target)
+    linear:    optional (n_slots, n_foods) penalty per gram, e.g. a priced cost
+
+    Minimizes sum over slots of ||W * scale * (portions @ nutrients - target)||^2
+    + ridge * ||portions||^2 + sum(linear * portions) with 0 <= portions <= upper, using accelerated
+    projected gradient (FISTA). The ridge term favours dense foods over
+    filling a slot with large portions of low-calorie ones. Iteration stops
+    on convergence or when the time budget runs out.
+    Returns the portions and the number of iterations used.
+    """
+    weights = np.sqrt(MACRO_WEIGHTS) * scale
+    a = nutrients * weights
+    t = targets * weights
+
+    # Step size from the Lipschitz constant of the gradient
+    lipschitz = 2.0 * float(np.linalg.eigvalsh(a.T @ a).max()) + 2.0 * ridge + 1e-12
+    step = 1.0 / lipschitz
+
+    x = np.zeros_like(upper, dtype=float)
+    y = x.copy()
+    momentum = 1.0
+    objective = np.inf
+    deadline = time.perf_counter() + time_budget_s
+
+    iteration = 0
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        gradient = 2.0 * (y @ a - t) @ a.T + 2.0 * ridge * y
+        if linear is not None:
+            gradient += linear
+        x_next = np.clip(y - step * gradient, 0.0, upper)
+        momentum_next = (1.0 + np.sqrt(1.0 + 4.0 * momentum * momentum)) / 2.0
+        y = x_next + ((momentum - 1.0) / momentum_next) * (x_next - x)
+
+        change = np.abs(x_next - x).max() if x.size else 0.0
+        x, momentum = x_next, momentum_next
+        if change < CONVERGENCE_GRAMS:
+            break
+        if iteration % CHECK_EVERY == 0:
+            # Stop once the fit no longer improves meaningfully, or the budget is spent
+            next_objective = float(np.square(x @ a - t).sum() + ridge * np.square(x).sum())
+            if linear is not None:
+                next_objective += float((linear * x).sum())
+            if np.isfinite(objective) and objective - next_objective <= CONVERGENCE_RELATIVE * objective:
+                break
+            objective = next_objective
+            if time.perf_counter() > deadline:
+                break
+
+    return x, iteration
+
+
+def solve_portions_within_budget(
+    nutrients: np.ndarray,
+    targets: np.ndarray,
+    upper: np.ndarray,
+    scale: np.ndarray,
+    time_budget_s: float,
+    cost_per_gram: np.ndarray,
+    slot_days: np.ndarray,
+    max_daily_cost: float
+) -> np.ndarray:
+    """
+    Fit portions so that each day's slots cost at most max_daily_cost.
+
+    cost_per_gram: (n_foods,) price of each food
+    slot_days:     (n_slots,) day of each slot
+
+    The cap is a constraint of the fit: days over budget get a Lagrange
+    multiplier pricing each gram, found by bisection, so the solve trades
+    macro error for cheaper foods instead of shrinking every portion.
+    """
+    # Half the time goes to the unconstrained fit, which is the answer whenever every day fits the cap
+    portions, _ = solve_portions(nutrients, targets, upper, scale, time_budget_s / 2)
+    day_cost = np.bincount(slot_days, weights=portions @ cost_per_gram)
+    over_days = np.flatnonzero(day_cost > max_daily_cost)
+    if not len(over_days):
+        return portions
+
+    active = np.flatnonzero(np.isin(slot_days, over_days))
+    cost = np.maximum(cost_per_gram, 1e-12)
+    # Past this multiplier no food's macro gain from an empty slot is worth its price, so empty slots are optimal
+    weights = np.sqrt(MACRO_WEIGHTS) * scale
+    gain = 2.0 * (targets[active] * weights) @ (nutrients * weights).T
+    highest = float(np.max(np.where(upper[active] > 0, gain, 0.0) / cost, initial=0.0)) + 1e-12
+
+    low = np.zeros(len(day_cost))
+    high = np.full(len(day_cost), highest)
+    portions[active] = 0.0
+    active_days = slot_days[active]
+    step_budget = time_budget_s / (2 * COST_BISECTION_STEPS)
+    for _ in range(COST_BISECTION_STEPS):
+        multiplier = np.sqrt(np.maximum(low, high * 1e-6) * high)
+        trial, _ = solve_portions(
+            nutrients, targets[active], upper[active], scale, step_budget,
+            linear=multiplier[active_days][:, None] * cost[None, :]
+        )
+        trial_cost = np.bincount(active_days, weights=trial @ cost_per_gram, minlength=len(day_cost))
+        within = trial_cost <= max_daily_cost
+        # Feasible days keep the trial and try a lower price, the others a higher one
+        keep = within[active_days]
+        portions[active[keep]] = trial[keep]
+        high = np.where(within, multiplier, high)
+        low = np.where(within, low, multiplier)
+    return portions
+
+
+def keep_largest(contributions: np.ndarray, upper: np.ndarray, k: int) -> np.ndarray:
+    """Upper bounds restricted to the k foods contributing most to each slot"""
+    if contributions.shape[1] <= k:
+        return upper
+    top = np.argpartition(-contributions, k - 1, axis=1)[:, :k]
+    restricted = np.zeros_like(upper)
+    rows = np.arange(contributions.shape[0])[:, None]
+    restricted[rows, top] = upper[rows, top]
+    # Foods the first pass left empty stay excluded
+    restricted[contributions <= 0] = 0.0
+    return restricted
@@ -0,0 +1,77 @@
+"""
+Shared fixtures for the AI services tests
+Run from ai-services with: python -m pytest tests
+"""
+
+import importlib.util
+import os
+import sys
+from typing import Any
+
+import pytest
+
+AI_SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Shared code, and the services' helper modules (meal_optimizer, session_packer)
+for path in (AI_SERVICES_DIR, os.path.join(AI_SERVICES_DIR, "nutrition-ai"), os.path.join(AI_SERVICES_DIR, "workout-ai")):
+    sys.path.insert(0, path)
+# Validate every internally built model in tests, unless the run asks otherwise
+os.environ.setdefault("AI_STRICT_VALIDATION", "1")
+
+
+def load_service_module(directory: str, name: str):
+    """Import a service's main.py under its own module name, as the gateway does, since both are called main"""
+    if name in sys.modules:
+        return sys.modules[name]
+    service_dir = os.path.join(AI_SERVICES_DIR, directory)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(service_dir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_service(directory: str, name: str, state_dir) -> Any:
+    """Load a service and run its warm-up, with caches and job queues under state_dir"""
+    patch = pytest.MonkeyPatch()
+    patch.setenv("PLAN_CACHE_PATH", str(state_dir / "plan_cache.sqlite"))
+    patch.setenv("JOB_QUEUE_PATH", str(state_dir / "jobs.sqlite"))
+    patch.setenv("JOB_WORKERS", "1")
+    patch.delenv("TRACE_EXPORT", raising=False)
+    patch.delenv("PLAN_EXPORT_DIR", raising=False)
+    try:
+        module = load_service_module(directory, name)
+        module.readiness.run(module.warm_up)
+    finally:
+        patch.undo()
+    assert module.readiness.ready, module.readiness.report()
+    return module
+
+
+def stop_service(module) -> None:
+    if module.job_queue is not None:
+        module.job_queue.stop()
+
+
+@pytest.fixture(scope="session")
+def nutrition_service(tmp_path_factory):
+    """The nutrition service module, warmed up once per test run"""
+    module = start_service("nutrition-ai", "nutrition_main", tmp_path_factory.mktemp("nutrition"))
+    yield module
+    stop_service(module)
+
+
+@pytest.fixture(scope="session")
+def workout_service(tmp_path_factory):
+    """The workout service module, warmed up once per test run"""
+    module = start_service("workout-ai", "workout_main", tmp_path_factory.mktemp("workout"))
+    yield module
+    stop_service(module)
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Point plan caches, job queues and logs at a per-test directory"""
+    monkeypatch.setenv("PLAN_CACHE_PATH", str(tmp_path / "plan_cache.sqlite"))
+    monkeypatch.setenv("JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite"))
+    monkeypatch.delenv("TRACE_EXPORT", raising=False)
+    yield tmp_path
@@ -0,0 +1,63 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from conftest import AI_SERVICES_DIR
+
+MEMBERS = [
+    {"user_id": f"m{i}", "age": 25 + i, "gender": "female" if i % 2 else "male", "height_cm": 160 + i,
+     "weight_kg": 60 + i, "fitness_level": "beginner", "fitness_goals": ["weight_loss"],
+     "time_availability": 30, "available_equipment": ["none"]}
+    for i in range(6)
+]
+
+
+def run_bulk(tmp_path, *args, output_name="plans.jsonl"):
+    members = tmp_path / "members.jsonl"
+    members.write_text("\n".join(json.dumps(member) for member in MEMBERS + [MEMBERS[0]]) + "\nnot json\n")
+    output = tmp_path / output_name
+    result = subprocess.run(
+        [sys.executable, os.path.join(AI_SERVICES_DIR, "bulk_plans.py"), "workout", str(members),
+         "--output", str(output), "--workers", "2", "--chunk-size", "3", "--report", "report.json", *args],
+        cwd=tmp_path, capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return output, json.loads((tmp_path / "report.json").read_text())
+
+
+def test_bulk_run_uses_its_own_plan_cache(tmp_path, monkeypatch):
+    service_cache = tmp_path / "service_cache.sqlite"
+    monkeypatch.setenv("PLAN_CACHE_PATH", str(service_cache))
+
+    output, report = run_bulk(tmp_path)
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert report["records"] == 8 and report["errors"] == 1
+    assert sorted(row["user_id"] for row in rows if "plan" in row) == sorted(m["user_id"] for m in MEMBERS + [MEMBERS[0]])
+    # The live service's cache is left alone; the run caches next to its output
+    assert not service_cache.exists()
+    with sqlite3.connect(tmp_path / "plans.jsonl.plan_cache.sqlite") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0] >= len(MEMBERS)
+
+
+def test_bulk_run_without_plan_cache(tmp_path):
+    _, report = run_bulk(tmp_path, "--plan-cache", "")
+    assert report["errors"] == 1
+    assert not (tmp_path / "plans.jsonl.plan_cache.sqlite").exists()
+
+
+def test_bulk_run_exports_session_rows(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output, report = run_bulk(tmp_path, "--row-group-rows", "20", output_name="sessions.parquet")
+
+    table = pq.read_table(str(output))
+    assert report["errors"] == 1
+    assert output.is_file()
+    assert pq.ParquetFile(str(output)).metadata.num_row_groups > 1
+    assert set(table.column("user_id").to_pylist()) == {m["user_id"] for m in MEMBERS}
+    # Every row is a prescribed main exercise
+    assert None not in table.column("sets").to_pylist()
@@ -0,0 +1,191 @@
+import os
+from datetime import date
+
+import pytest
+
+from ai_common.columnar_export import ColumnarFileWriter, PlanExporter, merge_columns
+from ai_common.fastjson import encode_model, loads
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+COLUMNS = [("user_id", "string"), ("day", "date"), ("sets", "int32"), ("grams", "float64"), ("is_deload", "bool")]
+
+
+def rows(start, count):
+    return {
+        "user_id": [f"u{i}" for i in range(start, start + count)],
+        "day": [f"2026-01-{1 + i % 28:02d}" for i in range(start, start + count)],
+        "sets": [i % 5 for i in range(start, start + count)],
+        "grams": [i * 0.5 for i in range(start, start + count)],
+        "is_deload": [i % 4 == 3 for i in range(start, start + count)]
+    }
+
+
+def read_arrow(path):
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        return reader.read_all(), reader.num_record_batches
+
+
+def dates(values):
+    return [date.fromisoformat(day) for day in values]
+
+
+def test_merge_columns_appends():
+    merged = merge_columns({"a": [1]}, {"a": [2, 3], "b": ["x"]})
+    assert merged == {"a": [1, 2, 3], "b": ["x"]}
+
+
+def test_parquet_row_groups_end_at_appends(tmp_path):
+    path = tmp_path / "out.parquet"
+    writer = ColumnarFileWriter(str(path), COLUMNS, row_group_rows=10)
+    for start in range(0, 35, 7):
+        writer.append(rows(start, 7))
+        assert writer.appended == start + 7
+    # The file appears only once its footer is written
+    assert not path.exists()
+    writer.close()
+
+    assert writer.rows == 35 and writer.closed
+    assert os.listdir(tmp_path) == ["out.parquet"]
+    metadata = pq.ParquetFile(str(path)).metadata
+    # A row group holds whatever was buffered once it reached row_group_rows
+    assert metadata.num_row_groups == writer.row_groups == 3
+    assert [metadata.row_group(i).num_rows for i in range(3)] == [14, 14, 7]
+
+    table = pq.read_table(str(path))
+    assert table.schema.field("day").type == pa.date32()
+    assert table.schema.field("sets").type == pa.int32()
+    assert table.to_pydict() == {**rows(0, 35), "day": dates(rows(0, 35)["day"])}
+
+
+def test_arrow_format(tmp_path):
+    path = tmp_path / "out.arrow"
+    writer = ColumnarFileWriter(str(path), COLUMNS, export_format="arrow", row_group_rows=4)
+    writer.append(rows(0, 5))
+    writer.append(rows(5, 2))
+    writer.close()
+    table, batches = read_arrow(path)
+    assert batches == 2
+    assert table.column("user_id").to_pylist() == rows(0, 7)["user_id"]
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_resume_carries_rows_over(tmp_path, export_format):
+    path = str(tmp_path / f"out.{export_format}")
+    writer = ColumnarFileWriter(path, COLUMNS, export_format, row_group_rows=5)
+    for start in range(0, 20, 5):
+        writer.append(rows(start, 5))
+    writer.close()
+
+    # Resuming at 12 rows keeps those and drops the rest of the previous run
+    resumed = ColumnarFileWriter(path, COLUMNS, export_format, row_group_rows=5, resume_at=12)
+    resumed.append(rows(12, 5))
+    resumed.close()
+    table = pq.read_table(path) if export_format == "parquet" else read_arrow(path)[0]
+    assert table.column("user_id").to_pylist() == rows(0, 17)["user_id"]
+
+    # A resumed file without new rows is left as it was; starting over empties it
+    ColumnarFileWriter(path, COLUMNS, export_format, resume_at=17).close()
+    assert (pq.read_table(path) if export_format == "parquet" else read_arrow(path)[0]).num_rows == 17
+    ColumnarFileWriter(path, COLUMNS, export_format).close()
+    assert (pq.read_table(path) if export_format == "parquet" else read_arrow(path)[0]).num_rows == 0
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnarFileWriter(str(tmp_path / "out.csv"), COLUMNS, export_format="csv")
+    with pytest.raises(ValueError):
+        PlanExporter(str(tmp_path), COLUMNS, lambda plan: plan, export_format="csv")
+
+
+def test_plan_exporter_rolls_files(tmp_path):
+    exporter = PlanExporter(str(tmp_path / "export"), COLUMNS, lambda plan: rows(*plan), row_group_rows=4, file_rows=10)
+    for start in range(0, 24, 6):
+        exporter.export((start, 6))
+    # A failing plan is logged and skipped
+    exporter.export(None)
+    exporter.close()
+
+    stats = exporter.stats()
+    assert stats["plans"] == 4 and stats["rows"] == 24
+    assert len(stats["files"]) == 2
+    tables = [pq.read_table(path) for path in stats["files"]]
+    assert [table.num_rows for table in tables] == [12, 12]
+    assert pa.concat_tables(tables).column("user_id").to_pylist() == rows(0, 24)["user_id"]
+
+
+def test_meal_plan_rows(nutrition_service, tmp_path):
+    service = nutrition_service
+    profile = service.UserProfile(
+        user_id="u1", age=30, gender="female", height_cm=165, weight_kg=60,
+        activity_level="light", fitness_goals=["maintenance"]
+    )
+    plan = service.assign_meal_plan_ids(
+        service.generate_meal_plan(profile, service.MealPlanRequest(user_profile=profile, days=2))
+    )
+    encoded = loads(encode_model(plan))
+    columns = service.meal_plan_export_rows(encoded)
+
+    foods = [(meal, food) for meal in plan.meals for food in meal["foods"]]
+    assert len(columns["food_id"]) == len(foods)
+    assert columns["food_id"] == [food["id"] for _, food in foods]
+    assert columns["meal_type"] == [meal["meal_type"] for meal, _ in foods]
+    assert sum(columns["calories"]) == pytest.approx(sum(meal["total_calories"] for meal in plan.meals))
+
+    writer = ColumnarFileWriter(str(tmp_path / "meals.parquet"), service.MEAL_EXPORT_COLUMNS)
+    writer.append(columns)
+    writer.close()
+    table = pq.read_table(str(tmp_path / "meals.parquet"))
+    assert table.num_rows == len(foods)
+    assert set(table.column("plan_id").to_pylist()) == {plan.plan_id}
+
+
+def test_workout_plan_rows(workout_service):
+    service = workout_service
+    request = service.WorkoutPlanRequest(
+        user_profile={
+            "user_id": "u1", "age": 30, "gender": "male", "height_cm": 180, "weight_kg": 80,
+            "fitness_level": "beginner", "fitness_goals": ["weight_loss"], "time_availability": 30,
+            "available_equipment": ["none"]
+        },
+        duration_weeks=2, workouts_per_week=3
+    )
+    plan = service.generate_workout_plan(request.user_profile, request)
+    columns = service.workout_plan_export_rows(loads(encode_model(plan)))
+
+    expected = [
+        (index, session.prescription["week_number"], item["exercise_id"], item["sets"], item["reps"])
+        for index, session in enumerate(plan.sessions) for item in session.prescription["exercises"]
+    ]
+    got = list(zip(columns["session_index"], columns["week_number"], columns["exercise_id"], columns["sets"], columns["reps"]))
+    assert got == expected
+    assert set(columns["user_id"]) == {"u1"}
+
+
+@pytest.mark.parametrize("fixture, generate", [
+    ("nutrition_service", "get_or_generate_meal_plan"),
+    ("workout_service", "get_or_generate_workout_plan")
+])
+def test_services_export_generated_plans(request, fixture, generate, tmp_path, monkeypatch):
+    service = request.getfixturevalue(fixture)
+    profile = {
+        "user_id": "exported", "age": 41, "gender": "female", "height_cm": 170, "weight_kg": 70,
+        "activity_level": "light", "fitness_level": "beginner", "fitness_goals": ["weight_loss"],
+        "time_availability": 30, "available_equipment": ["none"]
+    }
+    model = service.MealPlanRequest if fixture == "nutrition_service" else service.WorkoutPlanRequest
+    export_rows = service.meal_plan_export_rows if fixture == "nutrition_service" else service.workout_plan_export_rows
+    columns = service.MEAL_EXPORT_COLUMNS if fixture == "nutrition_service" else service.SESSION_EXPORT_COLUMNS
+    exporter = service.PlanExporter(str(tmp_path / "export"), columns, export_rows)
+    monkeypatch.setattr(service, "plan_cache", None)
+    monkeypatch.setattr(service, "plan_exporter", exporter)
+
+    payload, _ = getattr(service, generate)(model(user_profile=profile))
+    exporter.close()
+
+    [path] = exporter.stats()["files"]
+    table = pq.read_table(path)
+    assert table.num_rows == len(export_rows(loads(payload))["user_id"]) > 0
+    assert set(table.column("user_id").to_pylist()) == {"exported"}
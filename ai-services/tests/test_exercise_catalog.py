@@ -0,0 +1,118 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+def brute_force_recommendations(service, muscle_groups, difficulty, equipment, time_available,
+                                exclude_exercises=(), exclude_muscle_groups=(), language=None):
+    """Recommended exercise ids, filtering and ranking the catalog dicts one by one"""
+    boost = service.SENEGALESE_LOCALE_BOOST.get(language or "", 0.0)
+    ranked = []
+    for row, exercise in enumerate(service.exercise_catalog):
+        groups = set(exercise.get("muscle_groups", []))
+        minutes = service.estimate_exercise_time(exercise, difficulty)
+        if (
+            exercise.get("difficulty_level") == difficulty
+            and groups & set(muscle_groups)
+            and not groups & set(exclude_muscle_groups)
+            and set(exercise.get("equipment_needed", [])) <= set(equipment)
+            and minutes <= time_available
+            and exercise["id"] not in exclude_exercises
+        ):
+            relevance = len(groups & set(muscle_groups)) + boost * exercise["is_senegalese"]
+            ranked.append((-relevance, minutes, row, exercise["id"]))
+    return [exercise_id for *_, exercise_id in sorted(ranked)]
+
+
+def test_catalog_merges_sources_by_id(workout_service, monkeypatch):
+    service = workout_service
+    monkeypatch.setattr(service, "exercise_database", [
+        {"id": "a", "name": "Squat", "category": "strength"},
+        {"id": "b", "name": "Push-up"}
+    ])
+    monkeypatch.setattr(service, "senegalese_exercises", [
+        {"id": "b", "name_wo": "Push-up", "category": "traditional"},
+        {"id": "c", "name": "Laamb", "is_senegalese": True}
+    ])
+    catalog = {exercise["id"]: exercise for exercise in service.build_exercise_catalog()}
+
+    assert sorted(catalog) == ["a", "b", "c"]
+    assert catalog["a"]["is_senegalese"] is False
+    # The Senegalese file's fields win, and the general file's other fields are kept
+    assert catalog["b"] == {"id": "b", "name": "Push-up", "name_wo": "Push-up", "category": "traditional", "is_senegalese": True}
+    assert catalog["c"]["is_senegalese"] is True
+
+
+def test_catalog_arrays_are_aligned(workout_service):
+    service = workout_service
+    catalog = service.exercise_catalog
+    ids = [exercise["id"] for exercise in catalog]
+    assert len(ids) == len(set(ids))
+    assert any(exercise["is_senegalese"] for exercise in catalog)
+    for row, exercise in enumerate(catalog):
+        assert service.exercise_row_index[exercise["id"]] == row
+        assert service.exercise_is_senegalese[row] == exercise["is_senegalese"]
+        assert service.exercise_difficulty[row] == exercise.get("difficulty_level", "")
+        groups = {mg for mg, col in service.muscle_group_index.items() if service.exercise_muscle_matrix[row, col]}
+        assert groups == set(exercise.get("muscle_groups", []))
+
+
+@pytest.mark.parametrize("difficulty", ["beginner", "intermediate", "advanced"])
+@pytest.mark.parametrize("language", [None, "wo"])
+def test_recommendations_match_brute_force(workout_service, difficulty, language):
+    service = workout_service
+    groups = sorted(service.muscle_group_index)
+    # Leaving one piece of equipment out exercises the equipment filter too
+    equipment = sorted(service.equipment_index)[1:]
+    found = 0
+    for targets, avoid in ((groups[:3], []), (groups[2:6], groups[:1]), (groups, groups[-2:])):
+        got = service.get_exercise_recommendations(
+            targets, difficulty, equipment, 60, exclude_muscle_groups=avoid, limit=None, language=language
+        )
+        expected = brute_force_recommendations(
+            service, targets, difficulty, equipment, 60, exclude_muscle_groups=avoid, language=language
+        )
+        assert [exercise["id"] for exercise in got] == expected
+        found += len(expected)
+    assert found
+
+
+def test_recommendations_exclude_ids_and_limit(workout_service):
+    service = workout_service
+    groups = sorted(service.muscle_group_index)
+    full = service.get_exercise_recommendations(groups, "beginner", ["none"], 60, limit=None)
+    assert len(full) > 3
+    excluded = [full[0]["id"], full[2]["id"]]
+    rest = service.get_exercise_recommendations(groups, "beginner", ["none"], 60, exclude_exercises=excluded, limit=None)
+    assert [exercise["id"] for exercise in rest] == [exercise["id"] for exercise in full if exercise["id"] not in excluded]
+    assert service.get_exercise_recommendations(groups, "beginner", ["none"], 60, limit=2) == full[:2]
+
+
+def test_locale_boost_ranks_senegalese_exercises_first(workout_service):
+    service = workout_service
+    senegalese = [exercise for exercise in service.exercise_catalog if exercise["is_senegalese"]]
+    exercise = senegalese[0]
+    groups = exercise.get("muscle_groups", [])
+    difficulty = exercise.get("difficulty_level")
+    equipment = sorted(service.equipment_index)
+    boosted = service.get_exercise_recommendations(groups, difficulty, equipment, 120, limit=None, language="wo")
+    plain = service.get_exercise_recommendations(groups, difficulty, equipment, 120, limit=None, language="en")
+    assert boosted[0]["is_senegalese"]
+    assert sorted(e["id"] for e in boosted) == sorted(e["id"] for e in plain)
+    assert service.locale_boost("WO") == service.SENEGALESE_LOCALE_BOOST["wo"]
+    assert service.locale_boost(None) == 0.0
+
+
+def test_exercise_search_covers_names_and_muscle_groups(workout_service):
+    service = workout_service
+    client = TestClient(service.app)
+    exercise = next(e for e in service.exercise_catalog if e["is_senegalese"] and e.get("name_wo"))
+
+    results = client.post("/exercise-search", params={"query": exercise["name_wo"].upper(), "language": "en"}).json()["results"]
+    assert exercise["id"] in [result["id"] for result in results]
+
+    group = exercise["muscle_groups"][0]
+    results = client.post("/exercise-search", params={"query": group, "language": "wo"}).json()["results"]
+    matching = [e for e in service.exercise_catalog if group in e.get("muscle_groups", [])]
+    assert len(results) == min(20, len(matching))
+    flags = [result["is_senegalese"] for result in results]
+    assert flags == sorted(flags, reverse=True)
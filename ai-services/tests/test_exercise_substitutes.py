@@ -0,0 +1,101 @@
+import math
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def brute_force_similarity(service, a, b):
+    """Similarity of two exercises, computed from their catalog dicts"""
+    weights = service.SUBSTITUTE_WEIGHTS
+    groups_a, groups_b = set(a.get("muscle_groups", [])), set(b.get("muscle_groups", []))
+    muscles = len(groups_a & groups_b) / math.sqrt(len(groups_a) * len(groups_b)) if groups_a and groups_b else 0.0
+    levels = service.DIFFICULTY_LEVELS
+    level = lambda ex: levels.index(ex.get("difficulty_level")) if ex.get("difficulty_level") in levels else 1
+    return (
+        weights["muscle_groups"] * muscles
+        + weights["category"] * (a.get("category", "") == b.get("category", ""))
+        + weights["difficulty"] * (1 - abs(level(a) - level(b)) / (len(levels) - 1))
+    )
+
+
+def brute_force_allowed(service, exercise, available_equipment=None, injuries=None, exclude=()):
+    avoid = set(service.get_contraindicated_muscle_groups(injuries))
+    if avoid & set(exercise.get("muscle_groups", [])) or exercise["id"] in exclude:
+        return False
+    if available_equipment is not None:
+        return set(exercise.get("equipment_needed", [])) <= set(available_equipment) | {"none"}
+    return True
+
+
+@pytest.fixture(params=[None, 2], ids=["precomputed", "fallback"])
+def neighbours(request, workout_service, monkeypatch):
+    """Run each test with every neighbour precomputed and with too few for the constraints"""
+    service = workout_service
+    if request.param is not None:
+        monkeypatch.setattr(service, "SUBSTITUTE_NEIGHBOURS", request.param)
+        service.build_exercise_neighbours()
+    yield
+    monkeypatch.undo()
+    service.build_exercise_neighbours()
+
+
+def check_substitutes(service, exercise, k, **constraints):
+    _, rows, similarity = service.find_exercise_substitutes(exercise["id"], k, **constraints)
+    others = [
+        other for other in service.exercise_catalog
+        if other["id"] != exercise["id"] and brute_force_allowed(
+            service, other, constraints.get("available_equipment"), constraints.get("injuries"),
+            constraints.get("exclude_exercises") or ()
+        )
+    ]
+    expected = sorted((brute_force_similarity(service, exercise, other) for other in others), reverse=True)[:k]
+
+    assert similarity.tolist() == pytest.approx(expected, abs=1e-5)
+    # Equally similar exercises may come in either order, but each must be allowed and scored right
+    allowed_ids = {other["id"] for other in others}
+    for row, score in zip(rows.tolist(), similarity.tolist()):
+        other = service.exercise_catalog[row]
+        assert other["id"] in allowed_ids
+        assert score == pytest.approx(brute_force_similarity(service, exercise, other), abs=1e-5)
+
+
+def test_substitutes_match_brute_force(workout_service, neighbours):
+    service = workout_service
+    for exercise in service.exercise_catalog:
+        check_substitutes(service, exercise, 5)
+
+
+def test_constrained_substitutes_match_brute_force(workout_service, neighbours):
+    service = workout_service
+    cases = [
+        {"available_equipment": []},
+        {"injuries": ["knee"]},
+        {"injuries": ["Lower Back"], "available_equipment": ["chair"]},
+        {"exclude_exercises": [ex["id"] for ex in service.exercise_catalog[:5]]}
+    ]
+    for exercise in service.exercise_catalog:
+        for constraints in cases:
+            check_substitutes(service, exercise, 3, **constraints)
+
+
+def test_unknown_exercise_raises(workout_service):
+    with pytest.raises(KeyError):
+        workout_service.find_exercise_substitutes("missing", 3)
+
+
+def test_exercise_substitutes_endpoint(workout_service):
+    service = workout_service
+    client = TestClient(service.app)
+    exercise = service.exercise_catalog[0]
+
+    body = client.get(
+        "/exercise-substitutes", params={"exercise_id": exercise["id"], "k": 4, "injuries": ["knee"]}
+    ).json()
+    assert body["exercise"]["id"] == exercise["id"]
+    assert body["contraindicated_muscle_groups"] == ["glutes", "legs"]
+    assert len(body["substitutes"]) <= 4
+    assert all(not {"glutes", "legs"} & set(item.get("muscle_groups", [])) for item in body["substitutes"])
+    scores = [item["similarity"] for item in body["substitutes"]]
+    assert scores == sorted(scores, reverse=True)
+
+    assert client.get("/exercise-substitutes", params={"exercise_id": "missing"}).status_code == 404
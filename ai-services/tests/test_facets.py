@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from ai_common.facets import FacetIndex
+
+COLORS = ["red", "green", "blue"]
+SIZES = ["s", "m", "l", "xl"]
+
+
+@pytest.fixture
+def catalog():
+    rng = np.random.default_rng(3)
+    items = [
+        {"color": [COLORS[rng.integers(3)]], "size": list(rng.choice(SIZES, rng.integers(0, 3), replace=False))}
+        for _ in range(203)
+    ]
+    index = FacetIndex({facet: [item[facet] for item in items] for facet in ("color", "size")}, len(items), "v1")
+    return items, index
+
+
+def matching(items, filters, exclude=None):
+    def ok(item, facet, values):
+        return bool(set(item[facet]) & set(values))
+    return [
+        row for row, item in enumerate(items)
+        if all(ok(item, f, v) for f, v in filters.items())
+        and not any(ok(item, f, v) for f, v in (exclude or {}).items())
+    ]
+
+
+def test_unfiltered_counts_are_catalog_totals(catalog):
+    items, index = catalog
+    page = index.query(limit=500)
+
+    assert page["total"] == len(items)
+    assert page["rows"].tolist() == list(range(len(items)))
+    for color in COLORS:
+        assert page["facets"]["color"][color] == sum(color in item["color"] for item in items)
+
+
+def test_filters_and_counts_match_brute_force(catalog):
+    items, index = catalog
+    filters = {"color": ["red", "blue"], "size": ["m"]}
+    exclude = {"size": ["xl"]}
+
+    page = index.query(filters, exclude, limit=500)
+
+    expected = matching(items, filters, exclude)
+    assert page["rows"].tolist() == expected and page["total"] == len(expected)
+    # Each facet's counts apply every filter but its own
+    for color in COLORS:
+        assert page["facets"]["color"].get(color, 0) == len(matching(items, {"color": [color], "size": ["m"]}, exclude))
+    for size in SIZES:
+        expected_count = len(matching(items, {"color": ["red", "blue"], "size": [size]}, exclude))
+        assert page["facets"]["size"].get(size, 0) == expected_count
+
+
+def test_cursor_pages_cover_every_match_once(catalog):
+    items, index = catalog
+    filters = {"size": ["s", "l"]}
+    rows, cursor, pages = [], None, 0
+    while True:
+        page = index.query(filters, cursor=cursor, limit=7)
+        rows += page["rows"].tolist()
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert rows == matching(items, filters)
+    assert pages == -(-len(rows) // 7)
+
+
+def test_cursors_are_checked(catalog):
+    _, index = catalog
+    with pytest.raises(ValueError):
+        index.query(cursor="not a cursor!")
+    other_version = FacetIndex({"color": [["red"]]}, 1, "v2").encode_cursor(0)
+    with pytest.raises(ValueError):
+        index.query(cursor=other_version)
+    with pytest.raises(ValueError):
+        index.query({"shape": ["round"]})
+
+
+def test_unknown_values_match_nothing(catalog):
+    _, index = catalog
+    assert index.query({"color": ["purple"]})["total"] == 0
+
+
+def test_exercise_browsing_pages(workout_service):
+    client = TestClient(workout_service.app)
+    seen, cursor = [], None
+    while True:
+        params = {"category": "strength", "limit": 5, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/exercises", params=params).json()
+        seen += [exercise["id"] for exercise in body["exercises"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == body["total"] > 5
+    assert client.get("/exercises", params={"cursor": "bogus"}).status_code == 400
@@ -0,0 +1,96 @@
+import json
+from datetime import date, datetime
+from typing import List
+
+import numpy as np
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from ai_common import fastjson
+from ai_common.fastjson import JSONBytesResponse, build_model, dumps, encode_model, loads, strict_validation
+
+
+class Plan(BaseModel):
+    user_id: str
+    days: int
+    foods: List[str]
+
+
+@pytest.fixture
+def lenient(monkeypatch):
+    """The production default: neither flag set"""
+    for name in ("AI_STRICT_VALIDATION", "AI_DEBUG"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_strict_validation_flags(lenient, monkeypatch):
+    # Running under pytest alone does not switch validation on
+    assert not strict_validation()
+    monkeypatch.setenv("AI_DEBUG", "true")
+    assert strict_validation()
+    # The explicit flag wins over AI_DEBUG
+    monkeypatch.setenv("AI_STRICT_VALIDATION", "0")
+    assert not strict_validation()
+    monkeypatch.setenv("AI_STRICT_VALIDATION", "yes")
+    assert strict_validation()
+
+
+def test_build_model_validates_in_strict_mode(monkeypatch):
+    monkeypatch.setenv("AI_STRICT_VALIDATION", "1")
+    assert build_model(Plan, user_id="u1", days="3", foods=[]).days == 3
+    with pytest.raises(ValidationError):
+        build_model(Plan, user_id="u1", days="three", foods=[])
+
+
+def test_build_model_trusts_fields_otherwise(lenient):
+    plan = build_model(Plan, user_id="u1", days="three", foods=[])
+    assert plan.days == "three"
+    assert build_model(Plan, user_id="u1", days=3, foods=["a"]) == Plan(user_id="u1", days=3, foods=["a"])
+
+
+def test_dumps_encodes_numpy_dates_and_models():
+    value = {
+        "day": date(2026, 1, 2),
+        "at": datetime(2026, 1, 2, 3, 4, 5),
+        "count": np.int64(4),
+        "portion": np.float64(12.5),
+        "grams": np.array([1.5, 2.0]),
+        "plan": Plan(user_id="u1", days=1, foods=["riz"])
+    }
+    decoded = loads(dumps(value))
+    assert decoded == {
+        "day": "2026-01-02",
+        "at": "2026-01-02T03:04:05",
+        "count": 4,
+        "portion": 12.5,
+        "grams": [1.5, 2.0],
+        "plan": {"user_id": "u1", "days": 1, "foods": ["riz"]}
+    }
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    value = {"name": "Thiéboudienne", "grams": np.array([100.0, 50.5]), "day": date(2026, 3, 1), "n": np.int32(2)}
+    encoded = dumps(value)
+    monkeypatch.setattr(fastjson, "orjson", None)
+    fallback = dumps(value)
+    assert json.loads(fallback) == json.loads(encoded)
+    assert loads(fallback) == json.loads(encoded)
+    assert "Thiéboudienne".encode("utf-8") in fallback
+
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_encode_model_matches_pydantic(lenient):
+    plan = build_model(Plan, user_id="u1", days=2, foods=["riz", "mil"])
+    assert loads(encode_model(plan)) == json.loads(plan.model_dump_json())
+
+
+def test_json_bytes_response_serves_body_as_is():
+    body = dumps({"a": 1})
+    response = JSONBytesResponse(body)
+    assert response.body == body
+    assert response.media_type == "application/json"
+    assert response.headers["content-type"].startswith("application/json")
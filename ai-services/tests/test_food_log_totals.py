@@ -0,0 +1,93 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def random_log(service, seed, n_entries=300):
+    rng = random.Random(seed)
+    food_ids = [food["id"] for food in service.food_catalog] + ["unknown_food"]
+    return [
+        {
+            "user_id": rng.choice(["a", "b", "c", None]),
+            "date": (date(2026, 3, 1) + timedelta(days=rng.randrange(10))).isoformat(),
+            "food_id": rng.choice(food_ids),
+            "grams": round(rng.uniform(0, 400), 1)
+        }
+        for _ in range(n_entries)
+    ]
+
+
+def brute_force_totals(service, entries, default_user):
+    """Per-user, per-day nutrient sums, one entry at a time"""
+    users = {}
+    for entry in entries:
+        user_id = entry["user_id"] or default_user or ""
+        day = users.setdefault(user_id, {}).setdefault(entry["date"], {"entries": 0, "nutrients": [0.0] * len(service.nutrient_columns)})
+        row = service.food_id_index.get(entry["food_id"])
+        if row is None:
+            continue
+        day["entries"] += 1
+        for col, amount in enumerate(service.food_nutrient_matrix[row].tolist()):
+            day["nutrients"][col] += amount * entry["grams"]
+    return users
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_totals_match_brute_force(nutrition_service, seed):
+    service = nutrition_service
+    entries = random_log(service, seed)
+    result = service.food_log_totals(service.FoodLogTotalsRequest(user_id="me", entries=entries))
+    expected = brute_force_totals(service, entries, "me")
+
+    assert result["entries"] == len(entries)
+    assert result["unknown_food_ids"] == (["unknown_food"] if any(e["food_id"] == "unknown_food" for e in entries) else [])
+    assert sorted(user["user_id"] for user in result["users"]) == sorted(expected)
+    for user in result["users"]:
+        days = expected[user["user_id"]]
+        assert [day["date"] for day in user["days"]] == sorted(days)
+        for day in user["days"]:
+            assert day["entries"] == days[day["date"]]["entries"]
+            for name, value in zip(service.nutrient_columns, days[day["date"]]["nutrients"]):
+                assert day[name] == pytest.approx(value, rel=1e-9, abs=1e-9)
+        for name in service.nutrient_columns:
+            total = sum(day[name] for day in user["days"])
+            assert user["totals"][name] == pytest.approx(total, rel=1e-9, abs=1e-9)
+            assert user["average_daily"][name] == pytest.approx(total / len(days), rel=1e-9, abs=1e-9)
+        for name, percent in user["percent_reference_intake"].items():
+            assert percent == pytest.approx(user["average_daily"][name] / service.DAILY_REFERENCE_INTAKES[name] * 100)
+
+
+def test_day_of_unknown_foods_only_is_reported_empty(nutrition_service):
+    service = nutrition_service
+    result = service.food_log_totals(service.FoodLogTotalsRequest(user_id="me", entries=[
+        {"date": "2026-03-01", "food_id": "unknown_food", "grams": 100}
+    ]))
+    day = result["users"][0]["days"][0]
+    assert day["entries"] == 0
+    assert day["calories"] == 0
+    assert result["unknown_food_ids"] == ["unknown_food"]
+
+
+def test_empty_log(nutrition_service):
+    service = nutrition_service
+    result = service.food_log_totals(service.FoodLogTotalsRequest(user_id="me", entries=[]))
+    assert result == {"users": [], "entries": 0, "unknown_food_ids": []}
+
+
+def test_food_log_totals_endpoint(nutrition_service):
+    service = nutrition_service
+    food = service.food_catalog[0]
+    client = TestClient(service.app)
+    response = client.post("/food-log/totals", json={"user_id": "me", "entries": [
+        {"date": "2026-03-02", "food_id": food["id"], "grams": 150},
+        {"date": "2026-03-01", "food_id": food["id"], "grams": 50}
+    ]})
+    assert response.status_code == 200
+    user = response.json()["users"][0]
+    assert [day["date"] for day in user["days"]] == ["2026-03-01", "2026-03-02"]
+    assert user["totals"]["calories"] == pytest.approx(food["calories_per_100g"] * 2)
+
+    invalid = client.post("/food-log/totals", json={"entries": [{"date": "2026-03-01", "food_id": food["id"], "grams": -1}]})
+    assert invalid.status_code == 422
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+
+def brute_force_substitutes(service, food_id, k, allergen_free=(), categories=(), max_cost_per_kg=None, cheaper=False):
+    """Ids and distances of the k nearest allowed foods, checking every catalog food's dict"""
+    row = service.food_id_index[food_id]
+    space = service.food_substitute_space
+    cost = lambda food: service.estimate_food_cost(food.get("name_fr", food.get("name", "")), 1000)
+    avoid = {allergen.lower() for allergen in allergen_free}
+    ranked = []
+    for other, food in enumerate(service.food_catalog):
+        if other == row:
+            continue
+        if avoid & {allergen.lower() for allergen in food.get("allergens") or []}:
+            continue
+        if categories and food.get("category", "") not in categories:
+            continue
+        if max_cost_per_kg is not None and cost(food) > max_cost_per_kg:
+            continue
+        if cheaper and cost(food) >= cost(service.food_catalog[row]):
+            continue
+        ranked.append((float(np.linalg.norm(space[other] - space[row])), food["id"]))
+    return sorted(ranked)[:k]
+
+
+@pytest.fixture(params=[None, 3], ids=["cached", "fallback"])
+def candidates(request, nutrition_service, monkeypatch):
+    """Run each test with the default neighbour cache and with one too small for the constraints"""
+    if request.param is not None:
+        monkeypatch.setattr(nutrition_service, "SUBSTITUTE_CANDIDATES", request.param)
+    nutrition_service.food_neighbours.clear()
+    yield
+    nutrition_service.food_neighbours.clear()
+
+
+def assert_matches(service, got, expected):
+    _, rows, distances = got
+    assert distances.tolist() == pytest.approx([distance for distance, _ in expected], abs=1e-9)
+    # Equally distant foods may come in either order
+    assert sorted(service.food_catalog[row]["id"] for row in rows.tolist()) == sorted(food_id for _, food_id in expected)
+
+
+def test_nearest_foods_match_brute_force(nutrition_service, candidates):
+    service = nutrition_service
+    for food in service.food_catalog:
+        assert_matches(service, service.find_food_substitutes(food["id"], 5), brute_force_substitutes(service, food["id"], 5))
+
+
+def test_constraints_match_brute_force(nutrition_service, candidates):
+    service = nutrition_service
+    allergens = sorted(service.allergen_columns)
+    categories = sorted(set(service.food_categories.tolist()))
+    costs = sorted(service.food_cost_per_gram * 1000)
+    cases = [
+        {"allergen_free": allergens[:1]},
+        {"categories": categories[:2]},
+        {"max_cost_per_kg": costs[len(costs) // 2]},
+        {"cheaper": True},
+        {"allergen_free": allergens, "categories": categories[1:3], "cheaper": True}
+    ]
+    for food in service.food_catalog:
+        for constraints in cases:
+            got = service.find_food_substitutes(food["id"], 4, **constraints)
+            assert_matches(service, got, brute_force_substitutes(service, food["id"], 4, **constraints))
+
+
+def test_neighbours_are_cached_and_cleared_on_reload(nutrition_service):
+    service = nutrition_service
+    food_id = service.food_catalog[0]["id"]
+    service.food_neighbours.clear()
+    service.find_food_substitutes(food_id, 3)
+    assert food_id in service.food_neighbours
+    service.build_food_catalog()
+    assert not service.food_neighbours
+
+
+def test_unknown_food_raises(nutrition_service):
+    with pytest.raises(KeyError):
+        nutrition_service.find_food_substitutes("missing", 3)
+
+
+def test_food_substitutes_endpoint(nutrition_service):
+    service = nutrition_service
+    client = TestClient(service.app)
+    food = service.food_catalog[0]
+
+    response = client.get("/food-substitutes", params={"food_id": food["id"], "k": 3, "cheaper": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["food"]["id"] == food["id"]
+    assert len(body["substitutes"]) <= 3
+    assert all(item["cost_per_kg_xof"] < body["food"]["cost_per_kg_xof"] for item in body["substitutes"])
+    distances = [item["distance"] for item in body["substitutes"]]
+    assert distances == sorted(distances)
+
+    assert client.get("/food-substitutes", params={"food_id": "missing"}).status_code == 404
+    assert client.get("/food-substitutes", params={"food_id": food["id"], "k": 0}).status_code == 422
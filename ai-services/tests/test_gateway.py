@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+PROFILE = {
+    "user_id": "u1", "age": 30, "gender": "male", "height_cm": 180, "weight_kg": 80,
+    "activity_level": "moderate", "fitness_level": "beginner", "fitness_goals": ["weight_loss"],
+    "time_availability": 30, "available_equipment": ["none"], "allergies": []
+}
+
+
+@pytest.fixture(scope="module")
+def gateway(tmp_path_factory):
+    state = tmp_path_factory.mktemp("gateway")
+    patch = pytest.MonkeyPatch()
+    patch.setenv("PLAN_CACHE_PATH", str(state / "shared.sqlite"))
+    patch.setenv("NUTRITION_PLAN_CACHE_PATH", str(state / "meal_plans.sqlite"))
+    patch.setenv("JOB_WORKERS", "1")
+    patch.setenv("NUTRITION_JOB_QUEUE_PATH", str(state / "meal_jobs.sqlite"))
+    patch.setenv("WORKOUT_JOB_QUEUE_PATH", str(state / "workout_jobs.sqlite"))
+    patch.setenv("WORKOUT_PLAN_CACHE_PATH", "")
+    try:
+        import gateway
+        cwd, environ = os.getcwd(), dict(os.environ)
+        gateway.readiness.run(gateway.warm_up)
+        # Warm-up leaves the process working directory and environment alone
+        assert (os.getcwd(), dict(os.environ)) == (cwd, environ)
+    finally:
+        patch.undo()
+    assert gateway.readiness.ready, gateway.readiness.report()
+    yield gateway
+    gateway.nutrition.job_queue.stop()
+    gateway.workout.job_queue.stop()
+
+
+def test_services_get_their_own_scoped_settings(gateway, tmp_path_factory):
+    nutrition, workout = gateway.nutrition, gateway.workout
+    assert nutrition.plan_cache.path.endswith("meal_plans.sqlite")
+    # An empty prefixed value disables the cache; an unset one means the service default, not the shared name
+    assert workout.plan_cache is None
+    assert nutrition.settings.get("RANKING_RUNTIME") == ""
+    assert nutrition.settings.path("FOOD_DATABASE_PATH", "data/x.json") == os.path.join(
+        gateway.SERVICES_DIR, "nutrition-ai", "data", "x.json"
+    )
+
+
+@pytest.mark.parametrize("meal_plan", [{"days": 2}, {"days": 2, "target_calories": 2100}])
+def test_generate_program(gateway, meal_plan):
+    client = TestClient(gateway.app)
+    response = client.post("/generate-program", json={
+        "user_profile": PROFILE, "workout": {"duration_weeks": 2}, "meal_plan": meal_plan
+    })
+
+    assert response.status_code == 200
+    program = response.json()
+    balance = program["energy_balance"]
+    assert program["meal_plan"]["target_calories"] == balance["target_calories"]
+    assert balance["average_daily_workout_calories"] > 0
+    if "target_calories" in meal_plan:
+        assert balance["target_calories"] == 2100
+    else:
+        expected = balance["base_target_calories"] + balance["average_daily_workout_calories"]
+        assert abs(balance["target_calories"] - expected) <= 1
+    assert len(program["meal_plan"]["meals"]) == 2 * len(gateway.nutrition.MEAL_CALORIE_RATIOS)
+
+
+def test_generate_program_rejects_incomplete_profiles(gateway):
+    client = TestClient(gateway.app)
+    assert client.post("/generate-program", json={"user_profile": {"user_id": "x"}}).status_code == 422
+
+
+@pytest.mark.parametrize("body", [
+    # A user_profile repeated inside the plan options, and keys neither request has
+    {"workout": {"user_profile": PROFILE}},
+    {"meal_plan": {"user_profile": PROFILE, "days": 2}},
+    {"workout": {"duration_weeks": 2, "weeks": 3}},
+    {"meal_plan": {"days": -1}}
+])
+def test_generate_program_rejects_invalid_plan_options(gateway, body):
+    client = TestClient(gateway.app)
+    response = client.post("/generate-program", json={"user_profile": PROFILE, **body})
+    assert response.status_code == 422
@@ -0,0 +1,173 @@
+import sqlite3
+import threading
+import time
+
+import orjson
+import pytest
+
+from ai_common.job_queue import JobQueue, validate_callback_url
+
+
+def wait_for(queue: JobQueue, job_id: str, statuses=("succeeded", "failed"), timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} still {queue.get(job_id)['status']}")
+
+
+def make_queue(tmp_path, handlers=None, **kwargs) -> JobQueue:
+    handlers = handlers or {
+        "echo": lambda payload: orjson.dumps(payload),
+        "fail": lambda payload: (_ for _ in ()).throw(ValueError("bad request"))
+    }
+    return JobQueue(str(tmp_path / "jobs.sqlite"), handlers, workers=1, poll_interval=0.05, **kwargs)
+
+
+def test_claims_in_submission_order_and_marks_running(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.submit("echo", {"n": 1})
+    second = queue.submit("echo", {"n": 2})
+
+    with queue._connect() as conn:
+        assert queue._claim(conn)[0] == first
+        assert queue._claim(conn)[0] == second
+        assert queue._claim(conn) is None
+
+    assert queue.get(first)["status"] == "running"
+    assert queue.get(first)["attempts"] == 1
+    assert queue.counts() == {"queued": 0, "running": 2, "succeeded": 0, "failed": 0}
+
+
+def test_worker_runs_jobs_and_records_failures(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.start()
+    try:
+        ok = queue.submit("echo", {"n": 1})
+        bad = queue.submit("fail", {})
+        assert wait_for(queue, ok)["result"] == {"n": 1}
+        failed = wait_for(queue, bad)
+        assert failed["status"] == "failed"
+        assert failed["error"] == "bad request"
+    finally:
+        queue.stop()
+
+
+def test_unknown_kind_and_remote_callbacks_rejected(tmp_path):
+    queue = make_queue(tmp_path)
+    with pytest.raises(ValueError):
+        queue.submit("missing", {})
+    with pytest.raises(ValueError):
+        validate_callback_url("http://example.com/hook")
+    validate_callback_url("http://localhost:3000/hook")
+
+
+def test_start_requeues_interrupted_jobs(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.1)
+    job_id = queue.submit("echo", {"n": 1})
+    with queue._connect() as conn:
+        queue._claim(conn)
+    time.sleep(0.2)
+
+    # A restarted service picks the job up again once its lease expired, and counts the retry
+    restarted = make_queue(tmp_path)
+    restarted.start()
+    try:
+        job = wait_for(restarted, job_id)
+    finally:
+        restarted.stop()
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+
+
+def test_expired_jobs_fail_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    job_id = queue.submit("echo", {})
+    with queue._connect() as conn:
+        queue._claim(conn)
+        assert queue.requeue_expired(conn, time.time()) == 0
+        assert queue.requeue_expired(conn, time.time() + 61) == 1
+        queue._claim(conn)
+        assert queue.requeue_expired(conn, time.time() + 61) == 0
+
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["attempts"] == 2
+
+
+def test_worker_survives_database_errors(tmp_path, monkeypatch):
+    queue = make_queue(tmp_path, lease_seconds=0.2)
+    claim = queue._claim
+    calls = {"claim": 0, "run": 0}
+
+    def locked_claim(conn):
+        calls["claim"] += 1
+        if calls["claim"] == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return claim(conn)
+
+    run = queue._run
+
+    def run_losing_first_update(conn, *job):
+        calls["run"] += 1
+        if calls["run"] == 1:
+            raise sqlite3.OperationalError("database is locked")
+        run(conn, *job)
+
+    monkeypatch.setattr(queue, "_claim", locked_claim)
+    monkeypatch.setattr(queue, "_run", run_losing_first_update)
+    job_id = queue.submit("echo", {"n": 3})
+    queue.start()
+    try:
+        # The first claim fails, the first run loses its update, and the job is retried once its lease expires
+        job = wait_for(queue, job_id)
+    finally:
+        queue.stop()
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+
+
+def test_job_outliving_its_lease_is_not_taken_over(tmp_path):
+    release = threading.Event()
+    handlers = {"slow": lambda payload: orjson.dumps({"done": release.wait(5)})}
+    queue = make_queue(tmp_path, handlers=handlers, lease_seconds=0.3)
+    # Another process sharing the database file, starting and polling while the job runs
+    other = make_queue(tmp_path, handlers=handlers, lease_seconds=0.3)
+    job_id = queue.submit("slow", {})
+    queue.start()
+    try:
+        wait_for(queue, job_id, statuses=("running",))
+        other.start()
+        try:
+            # Several lease lengths pass; the heartbeat keeps the job with its worker
+            time.sleep(1.2)
+            assert queue.get(job_id)["status"] == "running"
+            release.set()
+            job = wait_for(queue, job_id)
+        finally:
+            other.stop()
+    finally:
+        queue.stop()
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
+
+
+def test_worker_that_lost_its_lease_does_not_record_a_result(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=60)
+    job_id = queue.submit("echo", {"n": 1})
+    with queue._connect() as conn:
+        first = queue._claim(conn)
+        # The lease lapses and another worker claims the job
+        conn.execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+        assert queue.requeue_expired(conn, time.time()) == 1
+        second = threading.Thread(target=lambda: queue._claim(queue._connect()), name="other-worker")
+        second.start()
+        second.join()
+
+        queue._run(conn, *first)
+        job = queue.get(job_id)
+        assert job["status"] == "running" and job["attempts"] == 2
+        worker = conn.execute("SELECT worker_id FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        assert worker.endswith("/other-worker")
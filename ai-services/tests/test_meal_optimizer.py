@@ -0,0 +1,142 @@
+import itertools
+
+import numpy as np
+import pytest
+from meal_optimizer import MACRO_WEIGHTS, keep_largest, solve_portions, solve_portions_within_budget
+
+# Calories, protein, carbs and fat per gram of rice, chicken, oil and beans
+NUTRIENTS = np.array([
+    [1.30, 0.027, 0.28, 0.003],
+    [1.65, 0.31, 0.0, 0.036],
+    [8.84, 0.0, 0.0, 1.0],
+    [3.47, 0.21, 0.63, 0.012]
+])
+DAILY_TARGETS = np.array([2000.0, 120.0, 250.0, 60.0])
+WEIGHTS = np.sqrt(MACRO_WEIGHTS) / DAILY_TARGETS
+
+
+def solve(targets, upper, ridge=0.0):
+    return solve_portions(NUTRIENTS, targets, upper, 1 / DAILY_TARGETS, time_budget_s=5.0, ridge=ridge)
+
+
+def objective(portions, target, ridge):
+    return float(np.square((portions @ NUTRIENTS - target) * WEIGHTS).sum() + ridge * np.square(portions).sum())
+
+
+# Price per gram of rice, chicken, oil and beans
+COST_PER_GRAM = np.array([0.5, 1.5, 2.0, 1.0])
+
+
+def exact_minimum(target, upper, ridge):
+    """Optimum of one slot, by trying every food at its lower bound, upper bound or free"""
+    a = NUTRIENTS * WEIGHTS
+    best = np.inf
+    for states in itertools.product((0, 1, 2), repeat=len(upper)):
+        portions = np.where(np.array(states) == 2, upper, 0.0)
+        free = [i for i, state in enumerate(states) if state == 1]
+        if free:
+            system = a[free] @ a[free].T + ridge * np.eye(len(free))
+            try:
+                portions[free] = np.linalg.solve(system, (target * WEIGHTS - portions @ a) @ a[free].T)
+            except np.linalg.LinAlgError:
+                continue
+        if (portions >= -1e-9).all() and (portions <= upper + 1e-9).all():
+            best = min(best, objective(portions, target, ridge))
+    return best
+
+
+def test_reaches_reachable_targets():
+    grams = np.array([[150.0, 120.0, 10.0, 60.0], [0.0, 200.0, 5.0, 100.0]])
+    targets = grams @ NUTRIENTS
+
+    portions, iterations = solve(targets, np.full_like(grams, 500.0))
+
+    assert iterations > 0
+    # Errors are weighed relative to daily targets, so that is the scale they are small on
+    assert (np.abs(portions @ NUTRIENTS - targets) <= 0.03 * DAILY_TARGETS).all()
+
+
+def test_respects_bounds_and_exclusions():
+    upper = np.array([[300.0, 0.0, 20.0, 0.0], [50.0, 50.0, 50.0, 50.0]])
+    targets = np.array([DAILY_TARGETS * 0.35, DAILY_TARGETS * 0.35])
+
+    portions, _ = solve(targets, upper)
+
+    assert (portions >= 0).all() and (portions <= upper).all()
+    assert portions[0, 1] == 0 and portions[0, 3] == 0
+
+
+@pytest.mark.parametrize("ridge", [0.0, 1e-7])
+def test_close_to_the_exact_optimum(ridge):
+    rng = np.random.default_rng(7)
+    upper = rng.choice([0.0, 150.0, 400.0], size=(6, 4))
+    targets = np.outer(rng.uniform(0.15, 0.4, 6), DAILY_TARGETS)
+
+    portions, _ = solve(targets, upper, ridge)
+
+    # Within 0.5% of the starting (empty slot) error of the true optimum
+    for slot in range(len(targets)):
+        gap = objective(portions[slot], targets[slot], ridge) - exact_minimum(targets[slot], upper[slot], ridge)
+        assert gap <= 5e-3 * objective(np.zeros(4), targets[slot], ridge)
+
+
+def test_keep_largest_limits_foods_per_slot():
+    contributions = np.array([[5.0, 1.0, 3.0, 0.0], [0.0, 0.0, 2.0, 1.0]])
+    upper = np.full((2, 4), 400.0)
+
+    restricted = keep_largest(contributions, upper, 2)
+
+    assert restricted[0].tolist() == [400.0, 0.0, 400.0, 0.0]
+    assert restricted[1].tolist() == [0.0, 0.0, 400.0, 400.0]
+    assert keep_largest(contributions, upper, 4) is upper
+
+
+def test_linear_penalty_shifts_portions_to_unpenalized_foods():
+    targets = np.array([DAILY_TARGETS * 0.3])
+    upper = np.full((1, 4), 400.0)
+    plain, _ = solve(targets, upper)
+    # Pricing chicken heavily replaces it with the other protein source
+    linear = np.array([[0.0, 1.0, 0.0, 0.0]])
+    priced, _ = solve_portions(NUTRIENTS, targets, upper, 1 / DAILY_TARGETS, time_budget_s=5.0, linear=linear)
+    assert priced[0, 1] < plain[0, 1]
+    assert priced[0, 3] > plain[0, 3]
+
+
+def test_budget_is_a_constraint_not_a_scale_down():
+    targets = np.array([DAILY_TARGETS * share for share in (0.25, 0.35, 0.3, 0.1)] * 2)
+    upper = np.full((8, 4), 400.0)
+    slot_days = np.repeat([0, 1], 4)
+    unconstrained, _ = solve(targets, upper)
+    day_cost = np.bincount(slot_days, weights=unconstrained @ COST_PER_GRAM)
+    cap = 0.6 * day_cost.min()
+
+    portions = solve_portions_within_budget(
+        NUTRIENTS, targets, upper, 1 / DAILY_TARGETS, 5.0, COST_PER_GRAM, slot_days, cap
+    )
+
+    assert (portions >= 0).all() and (portions <= upper).all()
+    assert (np.bincount(slot_days, weights=portions @ COST_PER_GRAM) <= cap + 1e-6).all()
+    # Scaling every portion to fit the cap loses far more of the targets than refitting under it
+    scaled = unconstrained * (cap / day_cost)[slot_days][:, None]
+    fitted_error = sum(objective(portions[s], targets[s], 0.0) for s in range(8))
+    scaled_error = sum(objective(scaled[s], targets[s], 0.0) for s in range(8))
+    assert fitted_error < 0.5 * scaled_error
+    # The same money buys more calories from the foods the fit picks
+    assert (portions @ NUTRIENTS[:, 0]).sum() > (scaled @ NUTRIENTS[:, 0]).sum()
+
+
+def test_days_within_budget_are_unchanged():
+    targets = np.array([DAILY_TARGETS * 0.3, DAILY_TARGETS * 0.3])
+    upper = np.full((2, 4), 400.0)
+    slot_days = np.array([0, 1])
+    unconstrained, _ = solve(targets, upper)
+    cost = unconstrained @ COST_PER_GRAM
+
+    # Only the second day is over budget
+    portions = solve_portions_within_budget(
+        NUTRIENTS, targets * np.array([[1.0], [2.0]]), upper, 1 / DAILY_TARGETS, 5.0, COST_PER_GRAM, slot_days, cost[0] * 1.01
+    )
+    # The first day is fitted without a price, as closely as the unconstrained solve
+    gap = abs(objective(portions[0], targets[0], 0.0) - objective(unconstrained[0], targets[0], 0.0))
+    assert gap <= 5e-3 * objective(np.zeros(4), targets[0], 0.0)
+    assert portions[1] @ COST_PER_GRAM <= cost[0] * 1.01 + 1e-6
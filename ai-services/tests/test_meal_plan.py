@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+import pytest
+from fastapi.testclient import TestClient
+
+PROFILE = {
+    "user_id": "u1", "age": 30, "gender": "male", "height_cm": 180, "weight_kg": 80,
+    "activity_level": "moderate", "fitness_goals": ["maintenance"], "allergies": []
+}
+
+
+def generate(service, **fields):
+    profile = service.UserProfile(**PROFILE)
+    return service.generate_meal_plan(profile, service.MealPlanRequest(user_profile=profile, **fields))
+
+
+def daily_costs(service, plan):
+    costs = defaultdict(float)
+    for meal in plan.meals:
+        for food in meal["foods"]:
+            costs[meal["date"]] += service.estimate_food_cost(food.get("name_fr", food["name"]), food["suggested_portion_g"])
+    return costs
+
+
+def test_breakfast_and_dinner_differ(nutrition_service):
+    plan = generate(nutrition_service, days=3)
+    meals = defaultdict(dict)
+    for meal in plan.meals:
+        meals[meal["date"]][meal["meal_type"]] = {food["id"] for food in meal["foods"]}
+    for day in meals.values():
+        assert day["breakfast"] != day["dinner"]
+
+
+def test_slot_foods_suit_the_meal(nutrition_service):
+    service = nutrition_service
+    plan = generate(service, days=3)
+    for meal in plan.meals:
+        matches = service.get_meal_keyword_matches(meal["meal_type"])
+        assert all(matches[service.food_id_index[food["id"]]] > 0 for food in meal["foods"])
+    # Fish is not a breakfast or a snack
+    assert not any(
+        food["category"] == "protein"
+        for meal in plan.meals if meal["meal_type"] in ("breakfast", "snack") for food in meal["foods"]
+    )
+
+
+@pytest.mark.parametrize("cap", [500, 1000])
+def test_daily_cost_cap_keeps_meals_substantial(nutrition_service, cap):
+    service = nutrition_service
+    free = generate(service, days=2)
+    capped = generate(service, days=2, max_daily_cost_xof=cap)
+
+    assert max(daily_costs(service, free).values()) > cap
+    # Portions are rounded to 0.1 g, which may add a fraction of a franc
+    assert all(cost <= cap + 1 for cost in daily_costs(service, capped).values())
+    assert all(
+        food["suggested_portion_g"] >= service.MIN_PORTION_G
+        for meal in capped.meals for food in meal["foods"]
+    )
+    # Cheaper foods keep most of the calories instead of shrinking every portion
+    assert all(meal["foods"] for meal in capped.meals)
+    assert capped.nutrition_summary["average_daily_calories"] >= 0.6 * free.nutrition_summary["average_daily_calories"]
+
+
+def test_generous_cap_changes_nothing(nutrition_service):
+    service = nutrition_service
+    free = generate(service, days=2)
+    capped = generate(service, days=2, max_daily_cost_xof=100000)
+    # Both fits stop on the same time budget, so portions agree to within a few grams
+    for free_meal, capped_meal in zip(free.meals, capped.meals):
+        assert [food["id"] for food in capped_meal["foods"]] == [food["id"] for food in free_meal["foods"]]
+        assert [food["suggested_portion_g"] for food in capped_meal["foods"]] == pytest.approx(
+            [food["suggested_portion_g"] for food in free_meal["foods"]], abs=5
+        )
+
+
+@pytest.mark.parametrize("days", [0, -1])
+def test_invalid_days_are_rejected(nutrition_service, days):
+    client = TestClient(nutrition_service.app)
+    response = client.post("/generate-meal-plan", json={"user_profile": PROFILE, "days": days})
+    assert response.status_code == 422
@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+PROFILE = {
+    "user_id": "u1", "age": 30, "gender": "male", "height_cm": 180, "weight_kg": 80,
+    "activity_level": "moderate", "fitness_goals": ["weight_loss"], "allergies": []
+}
+
+
+@pytest.fixture
+def plan(nutrition_service):
+    service = nutrition_service
+    profile = service.UserProfile(**PROFILE)
+    return service.assign_meal_plan_ids(
+        service.generate_meal_plan(profile, service.MealPlanRequest(user_profile=profile, days=3))
+    )
+
+
+def lunch_change(service, plan, **change):
+    return service.MealPlanChange(date=plan.meals[0]["date"], meal_type="lunch", **change)
+
+
+def assert_summary_matches_recompute(service, plan):
+    full = service.generate_nutrition_summary(plan.meals, plan.nutrition_summary["macro_targets"])
+    for name, value in full["totals"].items():
+        assert plan.nutrition_summary["totals"][name] == pytest.approx(value, abs=1e-6)
+    for incremental, recomputed in zip(plan.nutrition_summary["daily_totals"], full["daily_totals"]):
+        assert incremental["calories"] == pytest.approx(recomputed["calories"], abs=1e-6)
+
+
+def test_generated_summary_matches_food_portions(nutrition_service, plan):
+    # Portions are rounded before the foods and the summary are built from them
+    assert_summary_matches_recompute(nutrition_service, plan)
+    food_calories = sum(meal["total_calories"] for meal in plan.meals)
+    assert plan.nutrition_summary["total_calories"] == pytest.approx(food_calories, abs=1e-6)
+
+
+def test_replace_meal_updates_one_slot_and_aggregates(nutrition_service, plan):
+    service = nutrition_service
+    before = [dict(meal) for meal in plan.meals]
+    slot = service.find_meal_slot(plan, date.fromisoformat(plan.meals[0]["date"]), "lunch")
+
+    replanned = service.replan_meal_slot(plan.model_copy(deep=True), lunch_change(service, plan, action="replace_meal"))
+
+    old_ids = {food["id"] for food in before[slot]["foods"]}
+    assert not old_ids & {food["id"] for food in replanned.meals[slot]["foods"]}
+    assert [meal["id"] for i, meal in enumerate(replanned.meals) if i != slot] == \
+        [meal["id"] for i, meal in enumerate(before) if i != slot]
+    assert replanned.plan_id != plan.plan_id
+    assert_summary_matches_recompute(service, replanned)
+    assert replanned.total_cost_xof == pytest.approx(
+        service.calculate_estimated_cost(service.generate_shopping_list(replanned.meals)), abs=1e-6
+    )
+
+
+def test_exclude_food_requires_food_id(nutrition_service, plan):
+    with pytest.raises(ValueError):
+        nutrition_service.replan_meal_slot(plan, lunch_change(nutrition_service, plan, action="exclude_food"))
+
+
+def test_partial_summary_is_rebuilt(nutrition_service, plan):
+    service = nutrition_service
+    food_id = plan.meals[1]["foods"][0]["id"]
+    plan.nutrition_summary = {"days": 3}
+
+    replanned = service.replan_meal_slot(plan, lunch_change(service, plan, action="exclude_food", food_id=food_id))
+
+    assert len(replanned.nutrition_summary["daily_totals"]) == 3
+    assert_summary_matches_recompute(service, replanned)
+
+
+def test_replan_endpoint_rejects_malformed_plans(nutrition_service, plan):
+    client = TestClient(nutrition_service.app)
+    body = plan.model_dump(mode="json")
+    change = {"action": "replace_meal", "date": body["meals"][0]["date"], "meal_type": "lunch"}
+
+    outside = dict(change, date="2001-01-01")
+    assert client.post("/meal-plan/replan", json={"plan": body, "change": outside}).status_code == 400
+
+    body["meals"] = [{"meal_type": "lunch"} for _ in body["meals"]]
+    response = client.post("/meal-plan/replan", json={"plan": body, "change": change})
+    assert response.status_code == 400
+    assert "Malformed plan" in response.json()["detail"]
+
+
+def test_replan_rehashes_only_the_changed_meal(nutrition_service, plan, monkeypatch):
+    service = nutrition_service
+    hashed = []
+    content_id = service.content_id
+    monkeypatch.setattr(service, "content_id", lambda prefix, data, *args: hashed.append(prefix) or content_id(prefix, data, *args))
+
+    replanned = service.replan_meal_slot(plan, lunch_change(service, plan, action="replace_meal"))
+
+    assert hashed.count("meal") == 1
+    # Same ids as hashing the whole plan again
+    rehashed = service.assign_meal_plan_ids(replanned.model_copy(deep=True))
+    assert [meal["id"] for meal in rehashed.meals] == [meal["id"] for meal in replanned.meals]
+    assert rehashed.plan_id == replanned.plan_id
@@ -0,0 +1,150 @@
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from ai_common.admin import require_admin
+from ai_common.memory import AllocationTracker, component_sizes, deep_sizeof, model_memory
+
+
+@pytest.fixture
+def tracker():
+    tracker = AllocationTracker(site_pattern="*test_memory_admin.py", max_snapshots=2)
+    yield tracker
+    if tracemalloc.is_tracing():
+        tracker.stop()
+
+
+def test_deep_sizeof_counts_nested_containers():
+    text = "x" * 1000
+    value = {"a": [text, (1, 2.5)], "b": {text}}
+    expected = (
+        sys.getsizeof(value) + sys.getsizeof("a") + sys.getsizeof("b") + sys.getsizeof(value["a"])
+        + sys.getsizeof(text) + sys.getsizeof((1, 2.5)) + sys.getsizeof(1) + sys.getsizeof(2.5)
+        + sys.getsizeof(value["b"])
+    )
+    assert deep_sizeof(value) == expected
+
+
+def test_deep_sizeof_handles_cycles_and_objects():
+    node = SimpleNamespace(payload=np.zeros(1000))
+    node.self = node
+    size = deep_sizeof(node)
+    assert size >= np.zeros(1000).nbytes
+    assert deep_sizeof([node, node]) == sys.getsizeof([node, node]) + size
+
+
+def test_deep_sizeof_counts_array_data_once():
+    base = np.zeros(10000)
+    views = [base[:5000], base[5000:]]
+    # The views hold only headers; their shared base is counted once
+    assert deep_sizeof(views) < deep_sizeof([base, base.copy()])
+    assert deep_sizeof(views) >= base.nbytes
+    strings = np.array(["y" * 500] * 3, dtype=object)
+    assert deep_sizeof(strings) >= sys.getsizeof("y" * 500)
+
+
+def test_component_sizes_count_shared_data_under_the_first_component():
+    shared = ["z" * 10000]
+    report = component_sizes({
+        "catalogs": {"raw": {"foods": shared}, "plannable": list(shared)},
+        "indexes": {"by_id": {"z": shared}}
+    })
+    assert report["catalogs"]["components"]["raw"] > 10000
+    assert report["catalogs"]["components"]["plannable"] < 1000
+    assert report["indexes"]["total_bytes"] < 1000
+    assert report["catalogs"]["total_bytes"] == sum(report["catalogs"]["components"].values())
+
+
+def test_model_memory_from_weight_shapes():
+    weights = [
+        SimpleNamespace(shape=(10, 4), dtype=SimpleNamespace(size=4)),
+        SimpleNamespace(shape=(4,), dtype=SimpleNamespace(size=8)),
+        SimpleNamespace(shape=(None, 3), dtype=None)
+    ]
+    # Unknown dimensions count as empty and unknown dtypes as 4 bytes
+    assert model_memory(SimpleNamespace(weights=weights)) == 10 * 4 * 4 + 4 * 8
+    assert model_memory(None) is None
+
+
+def test_allocation_tracker_groups_by_site(tracker):
+    with pytest.raises(ValueError):
+        tracker.snapshot("before")
+    tracker.start()
+    tracker.snapshot("before")
+    retained = [bytearray(1024) for _ in range(200)]
+    diff = tracker.diff("before")
+
+    top = diff["sites"][0]
+    assert top["site"].startswith("test_memory_admin.py:")
+    assert top["size_diff"] >= 200 * 1024
+    assert diff["total_diff_bytes"] >= 200 * 1024
+    # Only the newest snapshots are kept
+    assert tracker.status()["snapshots"] == ["before", diff["second"]]
+    tracker.snapshot("after")
+    assert tracker.status()["snapshots"] == [diff["second"], "after"]
+    with pytest.raises(KeyError):
+        tracker.diff("before", "after")
+    del retained
+
+    assert tracker.stop() == {"tracing": False, "frames": 0, "snapshots": []}
+
+
+def admin_app():
+    app = FastAPI()
+
+    @app.get("/admin/ping", dependencies=[Depends(require_admin)])
+    def ping():
+        return {"ok": True}
+
+    return app
+
+
+def test_require_admin_without_token_allows_local_clients_only(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert TestClient(admin_app()).get("/admin/ping").status_code == 403
+    app = admin_app()
+
+    async def local_client(scope, receive, send):
+        await app({**scope, "client": ("127.0.0.1", 50000)}, receive, send)
+
+    assert TestClient(local_client).get("/admin/ping").json() == {"ok": True}
+
+
+def test_require_admin_with_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    client = TestClient(admin_app())
+    assert client.get("/admin/ping").status_code == 403
+    assert client.get("/admin/ping", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/ping", headers={"X-Admin-Token": "s3cret"}).json() == {"ok": True}
+
+
+@pytest.mark.parametrize("fixture", ["nutrition_service", "workout_service"])
+def test_service_memory_endpoints(request, fixture, monkeypatch):
+    service = request.getfixturevalue(fixture)
+    client = TestClient(service.app)
+    assert client.get("/admin/memory").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+    report = client.get("/admin/memory", headers=headers).json()
+    assert report["process"]["pid"] > 0
+    assert report["components"]["catalogs"]["total_bytes"] > 0
+
+    # Precomputed catalog arrays are indexes; caches only hold what requests fill in
+    if fixture == "workout_service":
+        assert {"exercise_neighbours", "exercise_neighbour_similarity"} <= set(report["components"]["indexes"]["components"])
+        assert set(report["components"]["caches"]["components"]) == {"session_templates"}
+
+    assert client.post("/admin/memory/snapshots", params={"name": "a"}, headers=headers).status_code == 400
+    try:
+        assert client.post("/admin/memory/tracing/start", headers=headers).json()["tracing"] is True
+        assert client.post("/admin/memory/snapshots", params={"name": "a"}, headers=headers).json()["name"] == "a"
+        assert client.get("/admin/memory/diff", params={"first": "a"}, headers=headers).status_code == 200
+        assert client.get("/admin/memory/diff", params={"first": "missing", "second": "a"}, headers=headers).status_code == 404
+    finally:
+        assert client.post("/admin/memory/tracing/stop", headers=headers).json()["tracing"] is False
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ai_common.model_runtime import ItemScorer, ModelRunner, load_runner
+
+
+class SumRunner(ModelRunner):
+    runtime = "test"
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        self.calls += 1
+        return features.sum(axis=1, keepdims=True)
+
+
+def test_runner_without_predict_fails_when_built():
+    class Incomplete(ModelRunner):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_predict_takes_last_output_column():
+    class TwoClassRunner(ModelRunner):
+        def _predict(self, features):
+            return np.stack([1 - features[:, 0], features[:, 0]], axis=1)
+
+    assert TwoClassRunner().predict(np.array([[0.25], [0.75]])).tolist() == [0.25, 0.75]
+
+
+def test_scores_are_cached_per_context_until_the_catalog_changes():
+    runner = SumRunner()
+    scorer = ItemScorer(runner, max_entries=2)
+    scorer.set_catalog("v1", np.array([[1.0], [2.0]]))
+
+    assert scorer.scores((10,)).tolist() == [11.0, 12.0]
+    scorer.scores((10,))
+    assert (runner.calls, scorer.hits, scorer.misses) == (1, 1, 1)
+
+    scorer.set_catalog("v2", np.array([[5.0]]))
+    assert scorer.scores((10,)).tolist() == [15.0]
+    assert runner.calls == 2
+
+
+def test_failing_model_falls_back_to_rules():
+    class BrokenRunner(ModelRunner):
+        def _predict(self, features):
+            raise ValueError("wrong input shape")
+
+    scorer = ItemScorer(BrokenRunner())
+    scorer.set_catalog("v1", np.ones((3, 2)))
+    assert scorer.scores((1,)) is None
+    assert scorer.failed
+
+
+def test_load_runner_validates_runtime(tmp_path):
+    assert load_runner("") is None
+    assert load_runner("onnx", path=str(tmp_path / "missing.onnx")) is None
+    with pytest.raises(ValueError):
+        load_runner("torch")
@@ -0,0 +1,83 @@
+import pytest
+
+PROFILE = {
+    "user_id": "u1", "age": 30, "gender": "female", "height_cm": 165, "weight_kg": 60,
+    "activity_level": "light", "fitness_goals": ["maintenance"], "allergies": []
+}
+MACRO_FIELDS = {
+    "calories": "calories_per_100g", "protein_g": "protein_per_100g",
+    "carbs_g": "carbs_per_100g", "fat_g": "fat_per_100g"
+}
+
+
+def catalog_amount(service, food_id, column):
+    """Amount per gram of one nutrient, read from the food's own catalog entry"""
+    food = service.food_catalog[service.food_id_index[food_id]]
+    if column in MACRO_FIELDS:
+        return food.get(MACRO_FIELDS[column], 0) / 100
+    if column.startswith("vitamin_"):
+        return (food.get("vitamins") or {}).get(column[len("vitamin_"):], 0) / 100
+    return (food.get("minerals") or {}).get(column, 0) / 100
+
+
+def brute_force_totals(service, foods):
+    return {
+        column: sum(food["suggested_portion_g"] * catalog_amount(service, food["id"], column) for food in foods)
+        for column in service.nutrient_columns
+    }
+
+
+@pytest.fixture
+def plan(nutrition_service):
+    service = nutrition_service
+    profile = service.UserProfile(**PROFILE)
+    return service.generate_meal_plan(profile, service.MealPlanRequest(user_profile=profile, days=2))
+
+
+def test_columns_cover_catalog_micronutrients(nutrition_service):
+    service = nutrition_service
+    vitamins = {name for food in service.food_catalog for name in (food.get("vitamins") or {})}
+    minerals = {name for food in service.food_catalog for name in (food.get("minerals") or {})}
+    assert service.nutrient_columns[:4] == list(MACRO_FIELDS)
+    assert set(service.nutrient_columns[4:]) == {f"vitamin_{name}" for name in vitamins} | minerals
+    assert service.food_nutrient_matrix.shape == (len(service.food_catalog), len(service.nutrient_columns))
+
+
+def test_matrix_rows_match_catalog_entries(nutrition_service):
+    service = nutrition_service
+    for food in service.food_catalog[:25]:
+        row = service.food_nutrient_matrix[service.food_id_index[food["id"]]]
+        for column, value in zip(service.nutrient_columns, row):
+            assert value == pytest.approx(catalog_amount(service, food["id"], column))
+
+
+def test_foods_nutrient_vector_matches_brute_force(nutrition_service, plan):
+    service = nutrition_service
+    foods = plan.meals[0]["foods"] + plan.meals[1]["foods"]
+    expected = brute_force_totals(service, foods)
+    vector = service.foods_nutrient_vector(foods)
+    for column, value in zip(service.nutrient_columns, vector):
+        assert value == pytest.approx(expected[column], abs=1e-9)
+
+
+def test_foods_nutrient_vector_ignores_unknown_foods(nutrition_service):
+    service = nutrition_service
+    assert not service.foods_nutrient_vector([{"id": "missing", "suggested_portion_g": 100}]).any()
+
+
+def test_summary_daily_micronutrients_match_brute_force(nutrition_service, plan):
+    service = nutrition_service
+    summary = plan.nutrition_summary
+    for day in summary["daily_totals"]:
+        foods = [food for meal in plan.meals if meal["date"] == day["date"] for food in meal["foods"]]
+        expected = brute_force_totals(service, foods)
+        for column in service.nutrient_columns:
+            assert day[column] == pytest.approx(expected[column], abs=1e-6)
+
+    for column in service.nutrient_columns:
+        assert summary["totals"][column] == pytest.approx(
+            sum(day[column] for day in summary["daily_totals"]), abs=1e-6
+        )
+        assert summary["average_daily"][column] == pytest.approx(summary["totals"][column] / summary["days"])
+    for name, percent in summary["percent_reference_intake"].items():
+        assert percent == pytest.approx(summary["average_daily"][name] / service.DAILY_REFERENCE_INTAKES[name] * 100)
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import time
+import zlib
+
+from ai_common.plan_cache import PlanCache
+
+
+def make_cache(tmp_path, **kwargs) -> PlanCache:
+    cache = PlanCache(str(tmp_path / "plans.sqlite"), **kwargs)
+    cache.set_catalog_version("v1")
+    return cache
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", b'{"plan": 1}')
+
+    assert cache.get("a") == b'{"plan": 1}'
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_plan_id_is_stored_with_the_payload(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("request", b'{"plan_id":"plan_1"}', plan_id="plan_1")
+    cache.put("other", b"{}")
+
+    assert cache.get_entry("request") == (b'{"plan_id":"plan_1"}', "plan_1")
+    assert cache.get_entry("other") == (b"{}", None)
+    assert cache.get_entry("missing") is None
+
+
+def test_cache_files_without_plan_ids_are_migrated(tmp_path):
+    path = tmp_path / "plans.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE plans (key TEXT PRIMARY KEY, catalog_version TEXT NOT NULL, payload BLOB NOT NULL, "
+            "size INTEGER NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO plans VALUES ('old', 'v1', ?, 3, ?, 0)", (zlib.compress(b"old"), time.time() + 60))
+    conn.close()
+
+    cache = make_cache(tmp_path)
+    assert cache.get_entry("old") == (b"old", None)
+    cache.put("new", b"new", plan_id="plan_2")
+    assert cache.get_entry("new") == (b"new", "plan_2")
+
+
+def test_entries_expire(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=3600)
+    cache.put("short", b"x", ttl_seconds=0)
+    cache.put("long", b"y")
+
+    assert cache.get("short") is None
+    assert cache.get("long") == b"y"
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path):
+    payload = os.urandom(2000)
+    cache = make_cache(tmp_path, max_bytes=5000, compression_level=0)
+    cache.put("a", payload)
+    time.sleep(0.01)
+    cache.put("b", payload)
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", payload)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == payload and cache.get("c") == payload
+    assert cache.stats()["size_bytes"] <= 5000
+
+
+def test_catalog_change_invalidates_entries(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", b"old")
+    cache.close()
+
+    # Reopened on the same catalog the entry survives a restart; on a new one it is dropped
+    reopened = make_cache(tmp_path)
+    assert reopened.get("a") == b"old"
+    assert reopened.set_catalog_version("v2") == 1
+    assert reopened.get("a") is None
+    assert reopened.stats()["size_bytes"] == 0
+
+
+def test_replacing_a_key_keeps_size_accounting(tmp_path):
+    cache = make_cache(tmp_path, compression_level=0)
+    cache.put("a", b"1" * 100)
+    size = cache.stats()["size_bytes"]
+    cache.put("a", b"2" * 100)
+
+    assert cache.stats()["size_bytes"] == size
+    assert cache.get("a") == b"2" * 100
+
+
+def test_service_serves_repeated_requests_from_the_cache(nutrition_service):
+    service = nutrition_service
+    request = service.MealPlanRequest(user_profile={
+        "user_id": "cache", "age": 41, "gender": "female", "height_cm": 158, "weight_kg": 70,
+        "activity_level": "light", "fitness_goals": ["maintenance"]
+    }, days=2)
+    hits = service.plan_cache.hits
+
+    first = service.get_or_generate_meal_plan(request)
+    second = service.get_or_generate_meal_plan(request)
+
+    assert first == second
+    assert service.plan_cache.hits == hits + 1
+    # The plan_id comes back with the payload, from the cache row rather than the JSON
+    payload, plan_id = second
+    assert service.loads(payload)["plan_id"] == plan_id
+    assert service.plan_cache.get_entry(plan_id) == (payload, plan_id)
+
+
+def test_entries_without_a_plan_id_are_regenerated(nutrition_service):
+    service = nutrition_service
+    request = service.MealPlanRequest(user_profile={
+        "user_id": "legacy", "age": 52, "gender": "male", "height_cm": 172, "weight_kg": 77,
+        "activity_level": "light", "fitness_goals": ["maintenance"]
+    }, days=1)
+    key = service.meal_plan_request_key(request)
+    service.plan_cache.put(key, b'{"legacy":true}')
+
+    payload, plan_id = service.get_or_generate_meal_plan(request, key)
+    assert service.loads(payload)["plan_id"] == plan_id
+    assert service.plan_cache.get_entry(key) == (payload, plan_id)
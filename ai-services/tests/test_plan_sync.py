@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from ai_common.plan_sync import (
+    content_id, etag_matches, full_plan_delta, plan_content_id, plan_delta, plan_etag
+)
+
+
+def plan(plan_id, sessions, **fields):
+    return {"total_weeks": 4, **fields, "sessions": sessions, "plan_id": plan_id}
+
+
+def test_content_id_ignores_id_and_json_representation():
+    meal = {"id": "old", "calories": 500, "portions": [np.float64(120.0), 80.5]}
+    same = {"id": "other", "calories": 500.0, "portions": [120, 80.5]}
+
+    assert content_id("meal", meal) == content_id("meal", same)
+    assert content_id("meal", meal).startswith("meal_")
+    assert content_id("meal", meal) != content_id("meal", {**same, "calories": 501})
+
+
+def test_plan_content_id_follows_item_ids():
+    fields = {"user_id": "u", "plan_id": "ignored"}
+    assert plan_content_id("plan", fields, ["a", "b"]) == plan_content_id("plan", {"user_id": "u"}, ["a", "b"])
+    assert plan_content_id("plan", fields, ["a", "b"]) != plan_content_id("plan", fields, ["b", "a"])
+
+
+def test_etag_matches():
+    tag = plan_etag("plan_1")
+    assert etag_matches(tag, "plan_1")
+    assert etag_matches(f'W/{tag}', "plan_1")
+    assert etag_matches(f'"plan_0", {tag}', "plan_1")
+    assert etag_matches("*", "plan_1")
+    assert not etag_matches('"plan_2"', "plan_1")
+    assert not etag_matches(None, "plan_1")
+    assert not etag_matches("plan_1", "plan_1")
+
+
+def test_plan_delta():
+    old = plan("p1", [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+    new = plan("p2", [{"id": "a"}, {"id": "d", "n": 1}, {"id": "c"}], total_weeks=5)
+
+    delta = plan_delta(old, new, "sessions")
+
+    assert delta == {
+        "plan_id": "p2", "base_plan_id": "p1", "full": False,
+        "fields": {"total_weeks": 5},
+        "items_field": "sessions",
+        "upserted": [{"id": "d", "n": 1}],
+        "removed": ["b"],
+        "order": ["a", "d", "c"]
+    }
+    # Applying the delta to the old version rebuilds the new one
+    items = {item["id"]: item for item in old["sessions"] + delta["upserted"]}
+    rebuilt = {**old, **delta["fields"], "plan_id": delta["plan_id"], "sessions": [items[i] for i in delta["order"]]}
+    assert rebuilt == new
+
+
+def test_plan_delta_of_unchanged_plan_is_empty():
+    same = plan("p1", [{"id": "a"}])
+    delta = plan_delta(same, same, "sessions")
+    assert (delta["fields"], delta["upserted"], delta["removed"]) == ({}, [], [])
+
+
+def test_full_plan_delta():
+    new = plan("p2", [])
+    assert full_plan_delta("gone", new) == {"plan_id": "p2", "base_plan_id": "gone", "full": True, "plan": new}
+
+
+@pytest.mark.parametrize("fixture, generate, delta, profile", [
+    ("nutrition_service", "/generate-meal-plan", "/meal-plan/delta", {"activity_level": "light"}),
+    ("workout_service", "/generate-workout-plan", "/workout-plan/delta", {
+        "fitness_level": "beginner", "time_availability": 30, "available_equipment": ["none"]
+    })
+])
+def test_plan_endpoints_tag_plans_with_their_id(request, fixture, generate, delta, profile):
+    client = TestClient(request.getfixturevalue(fixture).app)
+    body = {"user_profile": {
+        "user_id": "etag", "age": 33, "gender": "female", "height_cm": 165, "weight_kg": 62,
+        "fitness_goals": ["maintenance"], **profile
+    }}
+
+    response = client.post(generate, json=body)
+    plan_id = response.json()["plan_id"]
+    assert response.headers["ETag"] == plan_etag(plan_id)
+    # Served from the cache, the ETag comes with the cached entry
+    assert client.post(generate, json=body, headers={"If-None-Match": plan_etag(plan_id)}).status_code == 304
+
+    synced = client.post(delta, json={"plan_id": plan_id, "since": "plan_old"})
+    assert synced.headers["ETag"] == plan_etag(plan_id)
+    assert synced.json()["plan_id"] == plan_id
+    assert client.post(delta, json={"plan_id": plan_id, "since": plan_id}).status_code == 304
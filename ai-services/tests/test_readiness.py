@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ai_common.readiness import Readiness, ReadinessGate
+
+
+def gated_app(readiness):
+    app = FastAPI()
+    app.add_middleware(ReadinessGate, readiness=readiness, retry_after_seconds=7)
+
+    @app.get("/health/ready")
+    async def ready():
+        return readiness.report()
+
+    @app.get("/plans")
+    async def plans():
+        return {"plans": []}
+
+    return app
+
+
+def test_phases_are_timed_and_flip_ready():
+    readiness = Readiness("svc")
+
+    def warm_up(r):
+        with r.phase("catalog"):
+            pass
+        with r.phase("models"):
+            pass
+
+    readiness.run(warm_up)
+    report = readiness.report()
+    assert readiness.ready and readiness.wait(0)
+    assert report["status"] == "ready"
+    assert [phase["name"] for phase in report["phases"]] == ["catalog", "models"]
+    assert all(phase["status"] == "done" and phase["duration_ms"] >= 0 for phase in report["phases"])
+
+
+def test_failed_phase_keeps_service_unready():
+    readiness = Readiness("svc")
+
+    def warm_up(r):
+        with r.phase("catalog"):
+            raise RuntimeError("missing file")
+
+    readiness.run(warm_up)
+    report = readiness.report()
+    assert not readiness.ready
+    assert report["status"] == "failed"
+    assert report["error"] == "missing file"
+    assert report["phases"][0]["status"] == "failed"
+    assert report["phases"][0]["error"] == "missing file"
+
+
+def test_gate_answers_503_until_ready():
+    readiness = Readiness("svc")
+    client = TestClient(gated_app(readiness))
+
+    response = client.get("/plans")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+    assert response.json() == {"detail": "svc is warming up"}
+    # Health checks are always served
+    assert client.get("/health/ready").json()["status"] == "warming_up"
+
+    readiness.run(lambda r: None)
+    assert client.get("/plans").json() == {"plans": []}
+
+
+def test_gate_matches_health_paths_under_a_mount():
+    readiness = Readiness("svc")
+    outer = FastAPI()
+    outer.mount("/nutrition", gated_app(readiness))
+    client = TestClient(outer)
+    assert client.get("/nutrition/health/ready").status_code == 200
+    assert client.get("/nutrition/plans").status_code == 503
+
+
+def test_start_runs_warm_up_in_the_background():
+    readiness = Readiness("svc")
+    release = threading.Event()
+    app = gated_app(readiness)
+
+    @app.on_event("startup")
+    async def startup():
+        readiness.start(lambda r: release.wait(5))
+
+    with TestClient(app) as client:
+        # The warm-up blocks, but health checks still answer
+        assert client.get("/health/ready").json()["ready"] is False
+        assert client.get("/plans").status_code == 503
+        release.set()
+        assert readiness.wait(5)
+        assert client.get("/plans").status_code == 200
+
+
+@pytest.mark.parametrize("fixture", ["nutrition_service", "workout_service"])
+def test_services_report_their_warm_up_phases(request, fixture):
+    service = request.getfixturevalue(fixture)
+    report = TestClient(service.app).get("/health/ready").json()
+    assert report["ready"] is True
+    assert report["phases"]
+    assert all(phase["status"] == "done" for phase in report["phases"])
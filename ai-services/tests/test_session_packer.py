@@ -0,0 +1,51 @@
+import itertools
+
+import numpy as np
+import pytest
+from session_packer import TIME_STEP_MINUTES, pack_knapsack
+
+
+def brute_force_best(times, values, budget):
+    steps = np.maximum(1, np.ceil(times / TIME_STEP_MINUTES - 1e-9))
+    capacity = np.floor(budget / TIME_STEP_MINUTES + 1e-9)
+    best = 0.0
+    for size in range(len(times) + 1):
+        for subset in itertools.combinations(range(len(times)), size):
+            if steps[list(subset)].sum() <= capacity:
+                best = max(best, values[list(subset)].sum())
+    return best
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_matches_brute_force_within_budget(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 10))
+    times = rng.uniform(0.3, 12, n).round(2)
+    values = rng.uniform(0, 50, n)
+    budget = float(rng.uniform(0, 30))
+
+    selected = pack_knapsack(times, values, budget)
+
+    assert times[selected].sum() <= budget + 1e-9
+    assert list(selected) == sorted(set(selected.tolist()))
+    assert values[selected].sum() == pytest.approx(brute_force_best(times, values, budget))
+
+
+def test_edge_cases():
+    assert pack_knapsack(np.array([5.0]), np.array([1.0]), 0).size == 0
+    assert pack_knapsack(np.array([]), np.array([]), 10).size == 0
+    # Worthless items and items longer than the budget are never taken
+    assert pack_knapsack(np.array([1.0, 20.0]), np.array([0.0, 9.0]), 10).size == 0
+    assert pack_knapsack(np.array([4.0, 4.0, 4.0]), np.array([1.0, 2.0, 3.0]), 8).tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("difficulty", ["beginner", "expert"])
+def test_session_packing_respects_budget(workout_service, difficulty):
+    service = workout_service
+    candidates = service.exercise_catalog[:12]
+    budget = 15.0
+
+    packed = service.pack_session_exercises(candidates, ["legs", "chest"], difficulty, budget)
+
+    assert packed and len(packed) < len(candidates)
+    assert sum(service.estimate_exercise_time(ex, difficulty) for ex in packed) <= budget + 1e-9
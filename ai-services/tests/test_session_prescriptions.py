@@ -0,0 +1,157 @@
+import math
+
+import pytest
+
+PROFILE = {
+    "user_id": "u1", "age": 35, "gender": "female", "height_cm": 168, "weight_kg": 65,
+    "fitness_level": "intermediate", "fitness_goals": ["muscle_gain"], "time_availability": 45,
+    "available_equipment": ["none", "dumbbells"]
+}
+
+
+@pytest.fixture
+def plan_request(workout_service):
+    return workout_service.WorkoutPlanRequest(user_profile=PROFILE, duration_weeks=8, workouts_per_week=3)
+
+
+@pytest.fixture
+def plan(workout_service, plan_request):
+    return workout_service.generate_workout_plan(plan_request.user_profile, plan_request)
+
+
+@pytest.fixture
+def short_session_plan(workout_service):
+    """A long plan of 30-minute sessions, where late weeks outgrow the time without trimming"""
+    plan_request = workout_service.WorkoutPlanRequest(
+        user_profile={**PROFILE, "fitness_level": "beginner", "time_availability": 30}, duration_weeks=12, workouts_per_week=3
+    )
+    return workout_service.generate_workout_plan(plan_request.user_profile, plan_request)
+
+
+def reference_week(week, offset=0):
+    """One week of the progression, computed on its own"""
+    step = max(0, week - offset)
+    deload = (step + 1) % 4 == 0
+    return {
+        "week_number": week + 1,
+        "intensity_multiplier": (1 + step * 0.05) * (0.8 if deload else 1.0),
+        "volume_multiplier": (1 + step * 0.10) * (0.7 if deload else 1.0),
+        "is_deload": deload
+    }
+
+
+def reference_exercise(exercise, difficulty, week):
+    """Prescription of one exercise in one week, from its catalog entry"""
+    sets_range = exercise.get("sets_recommended", {}).get(difficulty, [3, 4])
+    reps_range = exercise.get("reps_recommended", {}).get(difficulty, [8, 12])
+    sets = round(sum(sets_range) / len(sets_range) * week["volume_multiplier"])
+    reps = round(sum(reps_range) / len(reps_range) * week["intensity_multiplier"])
+    sets = min(max(sets, 1), math.ceil(max(sets_range) * 1.5))
+    reps = min(max(reps, 1), math.ceil(max(reps_range) * 1.5))
+    return sets, reps, exercise.get("rest_time_seconds", 90)
+
+
+def exercise_minutes(sets, reps, rest):
+    return (sets * reps * 3 + rest * (sets - 1)) / 60
+
+
+def reference_session(exercises, difficulty, week, available_minutes):
+    """Sets, reps and rest of each exercise, trimming one set at a time from the largest until the session fits"""
+    prescribed = [list(reference_exercise(exercise, difficulty, week)) for exercise in exercises]
+    while sum(exercise_minutes(*item) for item in prescribed) > available_minutes:
+        most = max(item[0] for item in prescribed)
+        if most <= 1:
+            break
+        next(item for item in prescribed if item[0] == most)[0] -= 1
+    return prescribed
+
+
+def test_progression_weeks_match_scalar_formula(workout_service, plan_request):
+    service = workout_service
+    intensity = {"multiplier": 1.0}
+    for offset in (0, 2):
+        weeks = service.generate_progression_plan(
+            service.UserProfile(**PROFILE), plan_request, intensity, start_week=1, progression_offset=offset
+        )["weeks"]
+        assert [week["week_number"] for week in weeks] == list(range(2, 9))
+        for week in weeks:
+            expected = reference_week(week["week_number"] - 1, offset)
+            assert week["is_deload"] == expected["is_deload"]
+            assert week["intensity_multiplier"] == pytest.approx(expected["intensity_multiplier"])
+            assert week["volume_multiplier"] == pytest.approx(expected["volume_multiplier"])
+
+
+@pytest.mark.parametrize("plan_fixture, n_sessions", [("plan", 24), ("short_session_plan", 36)])
+def test_every_session_prescription_matches_reference(workout_service, request, plan_fixture, n_sessions):
+    service = workout_service
+    plan = request.getfixturevalue(plan_fixture)
+    catalog = {exercise["id"]: exercise for exercise in service.exercise_catalog}
+    assert len(plan.sessions) == n_sessions
+
+    for index, session in enumerate(plan.sessions):
+        prescription = session.prescription
+        week = reference_week(index // 3)
+        assert prescription["week_number"] == week["week_number"]
+        assert prescription["is_deload"] == week["is_deload"]
+        assert [item["exercise_id"] for item in prescription["exercises"]] == [ex["id"] for ex in session.exercises]
+
+        fixed = session.warm_up + session.cool_down
+        fixed_minutes = sum(ex.get("estimated_time_minutes", 5) for ex in fixed)
+        fixed_calories = sum(ex.get("estimated_calories_per_minute", 5) * ex.get("estimated_time_minutes", 5) for ex in fixed)
+        expected = reference_session(
+            [catalog[item["exercise_id"]] for item in prescription["exercises"]], session.difficulty_level, week,
+            session.duration_minutes - fixed_minutes
+        )
+
+        main_minutes = main_calories = 0.0
+        for item, (sets, reps, rest) in zip(prescription["exercises"], expected):
+            minutes = exercise_minutes(sets, reps, rest)
+            calories = minutes * catalog[item["exercise_id"]].get("estimated_calories_per_minute", 5)
+            assert (item["sets"], item["reps"], item["rest_seconds"]) == (sets, reps, rest)
+            assert item["estimated_time_minutes"] == pytest.approx(minutes, abs=0.051)
+            assert item["estimated_calories"] == pytest.approx(calories, abs=0.051)
+            main_minutes += minutes
+            main_calories += calories
+
+        assert prescription["estimated_time_minutes"] == pytest.approx(main_minutes + fixed_minutes, abs=0.051)
+        assert prescription["estimated_calories"] == pytest.approx(main_calories + fixed_calories, abs=0.051)
+
+
+def test_prescriptions_fit_the_time_budget(workout_service, short_session_plan):
+    service = workout_service
+    catalog = {exercise["id"]: exercise for exercise in service.exercise_catalog}
+    trimmed = 0
+    for index, session in enumerate(short_session_plan.sessions):
+        assert session.duration_minutes == 30
+        assert session.prescription["estimated_time_minutes"] <= 30
+        week = reference_week(index // 3)
+        untrimmed = [reference_exercise(catalog[ex["id"]], session.difficulty_level, week) for ex in session.exercises]
+        trimmed += [item["sets"] for item in session.prescription["exercises"]] != [sets for sets, _, _ in untrimmed]
+    # Late weeks would run past 30 minutes without trimming
+    assert trimmed > 0
+
+
+def test_deload_week_lowers_volume(workout_service, plan):
+    by_week = {}
+    for session in plan.sessions:
+        by_week.setdefault(session.prescription["week_number"], session.prescription["volume_multiplier"])
+    assert by_week[4] < by_week[3]
+    assert by_week[5] > by_week[3]
+
+
+def test_first_session_offsets_the_week(workout_service, plan):
+    service = workout_service
+    weeks = plan.progression_plan["weeks"]
+    sessions = plan.sessions[:3]
+    shifted = service.apply_session_prescriptions(sessions, weeks, 3, first_session=6)
+    assert [session.prescription["week_number"] for session in shifted] == [3, 3, 3]
+
+    # Sessions past the last week keep the last week's prescription
+    late = service.apply_session_prescriptions(sessions, weeks, 3, first_session=100)
+    assert {session.prescription["week_number"] for session in late} == {8}
+
+
+def test_empty_inputs_are_returned_unchanged(workout_service, plan):
+    service = workout_service
+    assert service.apply_session_prescriptions([], plan.progression_plan["weeks"], 3) == []
+    assert service.apply_session_prescriptions(plan.sessions, [], 3) is plan.sessions
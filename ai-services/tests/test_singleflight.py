@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from ai_common.hashing import canonical_request_hash
+from ai_common.singleflight import SingleFlight
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_identical_concurrent_calls_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    def generate(value):
+        calls.append(value)
+        time.sleep(0.05)
+        return value * 2
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("same", generate, 21) for _ in range(5)), flight.do("other", generate, 1))
+        return results, flight.in_flight()
+
+    results, in_flight = run(scenario())
+    assert results == [42] * 5 + [2]
+    assert sorted(calls) == [1, 21]
+    assert flight.coalesced == 4
+    assert in_flight == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        time.sleep(0.05)
+        raise ValueError("catalog not loaded")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    # A later call runs again instead of reusing the failure
+    with pytest.raises(ValueError):
+        run(flight.do("key", failing))
+    assert len(attempts) == 2
+
+
+def test_request_hash_ignores_volatile_fields_and_key_order():
+    request = {"days": 7, "user_profile": {"age": 30, "preferences": {"request_id": "a", "spicy": True}}}
+    reordered = {"user_profile": {"preferences": {"spicy": True, "request_id": "b"}, "age": 30}, "days": 7}
+    volatile = ("user_profile.preferences.request_id", "missing.path")
+
+    assert canonical_request_hash(request, volatile) == canonical_request_hash(reordered, volatile)
+    assert canonical_request_hash(request, volatile) != canonical_request_hash({**request, "days": 6}, volatile)
+    assert canonical_request_hash(request, volatile, salt="2026-01-01") != canonical_request_hash(request, volatile)
@@ -0,0 +1,49 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ai_common.tracing import RequestTracing, Tracer, current_request_id, current_span, parse_traceparent
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def traced_app():
+    tracer = Tracer("test-service")
+    app = FastAPI()
+    app.add_middleware(RequestTracing, tracer=tracer)
+
+    @app.get("/work")
+    def work():
+        span = current_span()
+        with tracer.span("inner") as inner:
+            return {"request_id": current_request_id(), "span": span.span_id, "inner_parent": inner.parent_id}
+
+    return app
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID)
+    for header in (None, "", "garbage", f"00-{TRACE_ID}-{PARENT_ID}", f"00-{'z' * 32}-{PARENT_ID}-01"):
+        assert parse_traceparent(header) is None
+
+
+def test_caller_request_id_and_trace_are_continued():
+    client = TestClient(traced_app())
+
+    response = client.get("/work", headers={"x-request-id": "req-1", "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+
+    body = response.json()
+    assert response.headers["x-request-id"] == body["request_id"] == "req-1"
+    trace_id, span_id = parse_traceparent(response.headers["traceparent"])
+    assert trace_id == TRACE_ID and span_id == body["span"]
+    assert body["inner_parent"] == body["span"]
+    assert response.headers["x-response-time"].endswith("ms")
+
+
+def test_requests_without_headers_start_their_own_trace():
+    client = TestClient(traced_app())
+
+    first, second = client.get("/work"), client.get("/work")
+
+    assert first.headers["x-request-id"] != second.headers["x-request-id"]
+    assert parse_traceparent(first.headers["traceparent"])[0] != parse_traceparent(second.headers["traceparent"])[0]
@@ -0,0 +1,66 @@
+import pytest
+from fastapi.testclient import TestClient
+
+PROFILE = {
+    "user_id": "u1", "age": 30, "gender": "male", "height_cm": 180, "weight_kg": 80,
+    "fitness_level": "beginner", "fitness_goals": ["weight_loss"], "time_availability": 30,
+    "available_equipment": ["none"]
+}
+
+
+@pytest.fixture
+def plan_request(workout_service):
+    return workout_service.WorkoutPlanRequest(user_profile=PROFILE, duration_weeks=4, workouts_per_week=3)
+
+
+@pytest.fixture
+def plan(workout_service, plan_request):
+    service = workout_service
+    return service.assign_workout_plan_ids(service.generate_workout_plan(plan_request.user_profile, plan_request))
+
+
+def log(service, statuses):
+    return [service.SessionLogEntry(session_index=i, status=status) for i, status in enumerate(statuses)]
+
+
+def test_keeps_logged_sessions_and_regenerates_the_rest(workout_service, plan, plan_request):
+    service = workout_service
+    adapted = service.adapt_workout_plan(plan.model_copy(deep=True), plan_request, log(service, ["completed"] * 4))
+
+    assert adapted.total_workouts == 12
+    assert [s.id for s in adapted.sessions[:4]] == [s.id for s in plan.sessions[:4]]
+    assert [s.category for s in adapted.sessions] == [s.category for s in plan.sessions]
+
+
+def test_missed_weeks_do_not_progress(workout_service, plan, plan_request):
+    service = workout_service
+    adapted = service.adapt_workout_plan(plan.model_copy(deep=True), plan_request, log(service, ["missed"] * 3))
+
+    # Week 2 repeats week 1's progression instead of advancing
+    weeks = adapted.progression_plan["weeks"]
+    assert weeks[1]["intensity_multiplier"] == plan.progression_plan["weeks"][0]["intensity_multiplier"]
+    assert weeks[1]["intensity_multiplier"] < plan.progression_plan["weeks"][1]["intensity_multiplier"]
+
+
+def test_uses_the_plan_schedule_over_the_request(workout_service, plan, plan_request):
+    service = workout_service
+    five_a_week = plan_request.model_copy(update={"workouts_per_week": 5, "duration_weeks": 2})
+
+    adapted = service.adapt_workout_plan(plan.model_copy(deep=True), five_a_week, log(service, ["completed"] * 3))
+
+    assert adapted.workouts_per_week == 3
+    assert adapted.total_workouts == 12
+    assert [s.category for s in adapted.sessions] == [s.category for s in plan.sessions]
+    assert len(adapted.progression_plan["weeks"]) == 4
+
+
+def test_rejects_indexes_outside_the_plan(workout_service, plan, plan_request):
+    service = workout_service
+    with pytest.raises(ValueError):
+        service.adapt_workout_plan(plan, plan_request, [service.SessionLogEntry(session_index=12, status="completed")])
+
+    client = TestClient(service.app)
+    body = {"plan": plan.model_dump(mode="json"), "request": plan_request.model_dump(mode="json")}
+    for index, status_code in ((-5, 422), (12, 400), (11, 200)):
+        body["session_log"] = [{"session_index": index, "status": "completed"}]
+        assert client.post("/workout-plan/adapt", json=body).status_code == status_code
@@ -5,14 +5,17 @@ AI-powered workout planning and exercise recommendation service
 """
 
 import os
+import sys
 import json
 import logging
-from typing import List, Dict, Optional, Any
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime, date, timedelta
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 import tensorflow as tf
 from tensorflow import keras
@@ -21,15 +24,37 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 import requests
 from dotenv import load_dotenv
 
+# Shared service utilities live next to the service directories
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ai_common.admin import require_admin
+from ai_common.columnar_export import PlanExporter
+from ai_common.fastjson import JSONBytesResponse, build_model, dumps, encode_model, loads, strict_validation
+from ai_common.facets import FacetIndex
+from ai_common.hashing import canonical_request_hash
+from ai_common.job_queue import JobQueue
+from ai_common.log_config import configure_logging
+from ai_common.memory import AllocationTracker, component_sizes, model_memory, process_memory
+from ai_common.model_runtime import ItemScorer, encode_label, load_runner, model_fingerprint, run_dummy_batch
+from ai_common.plan_cache import PlanCache
+from ai_common.plan_sync import (
+    content_id, etag_matches, full_plan_delta, plan_content_id, plan_delta, plan_etag
+)
+from ai_common.readiness import Readiness, ReadinessGate
+from ai_common.settings import ServiceSettings
+from ai_common.singleflight import SingleFlight
+from ai_common.tracing import RequestTracing, Tracer
+from session_packer import pack_knapsack
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: JSON lines written by a background thread
+configure_logging("workout-ai")
 logger = logging.getLogger(__name__)
+tracer = Tracer("workout-ai")
+
+# Settings, with data, model and cache paths relative to this directory
+settings = ServiceSettings(os.path.dirname(os.path.abspath(__file__)))
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -47,12 +72,103 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requests wait for warm-up to finish (503 until then), health checks excepted
+readiness = Readiness("workout-ai")
+app.add_middleware(ReadinessGate, readiness=readiness)
+
+# Request ids, a span per request and timing headers (outermost, so 503s are traced too)
+app.add_middleware(RequestTracing, tracer=tracer)
+
 # Global variables for models and data
 workout_model = None
 exercise_database = None
 senegalese_exercises = None
 scaler = None
 label_encoders = {}
+plan_cache = None
+plan_exporter = None
+catalog_version = ""
+job_queue = None
+
+# Unified exercise catalog (general and Senegalese exercises, deduplicated by id)
+# and its columnar view, built once in load_models
+exercise_catalog = []
+exercise_row_index = {}
+exercise_time_minutes = {}          # difficulty -> (n_exercises,) estimated minutes
+exercise_calories_per_minute = None  # (n_exercises,)
+exercise_sets = {}                  # difficulty -> (n_exercises, 2) average and maximum recommended sets
+exercise_reps = {}                  # difficulty -> (n_exercises, 2) average and maximum recommended reps
+exercise_rest_seconds = None        # (n_exercises,)
+muscle_group_index = {}
+exercise_muscle_matrix = None        # (n_exercises, n_muscle_groups) bool
+exercise_is_senegalese = None        # (n_exercises,) bool
+exercise_difficulty = None           # (n_exercises,) difficulty level
+equipment_index = {}
+exercise_equipment_matrix = None     # (n_exercises, n_equipment) bool, equipment needed
+exercise_search_text = []            # lowercased names, category and muscle groups
+exercise_facets = None               # FacetIndex over the catalog for /exercises
+exercise_ranker = None               # optional model scoring the catalog per profile
+exercise_muscle_unit = None          # (n_exercises, n_muscle_groups) unit-length muscle group vectors
+exercise_profile_codes = None        # (n_exercises,) code of the (category, difficulty) pair
+profile_similarity = None            # (n_codes, n_codes) category and difficulty part of the similarity
+exercise_neighbours = None           # (n_exercises, n_neighbours) most similar rows, most similar first
+exercise_neighbour_similarity = None  # (n_exercises, n_neighbours) their similarities
+
+DIFFICULTY_LEVELS = ["beginner", "intermediate", "advanced"]
+
+# Calories-equivalent value of each targeted muscle group an exercise covers
+COVERAGE_WEIGHT = 15.0
+
+# Ranking bonus of Senegalese exercises by user language, in targeted muscle groups
+SENEGALESE_LOCALE_BOOST = {"wo": 0.75, "fr": 0.5}
+
+# Weights of the exercise substitute similarity (each part is between 0 and 1)
+SUBSTITUTE_WEIGHTS = {"muscle_groups": 0.6, "category": 0.25, "difficulty": 0.15}
+SUBSTITUTE_NEIGHBOURS = 64  # most similar exercises precomputed per exercise
+
+# Prescribed sets and reps never exceed this multiple of the top of the recommended range
+PRESCRIPTION_MAX_SCALE = 1.5
+
+# Bump when the generated plan format changes so cached plans are recomputed
+PLAN_FORMAT_VERSION = 8
+
+# Generated sessions reused across weeks and plans, keyed by their inputs
+session_templates: Dict[tuple, "WorkoutSession"] = {}
+SESSION_TEMPLATE_CACHE_SIZE = 4096
+
+# Muscle groups to avoid for common injuries
+INJURY_MUSCLE_GROUPS = {
+    "knee": ["legs", "glutes"],
+    "ankle": ["legs"],
+    "hip": ["legs", "glutes", "core"],
+    "back": ["back", "core"],
+    "lower_back": ["back", "core"],
+    "shoulder": ["shoulders", "chest", "arms"],
+    "elbow": ["arms"],
+    "wrist": ["arms", "chest"],
+    "neck": ["shoulders", "back"]
+}
+
+# Identical concurrent plan requests share one computation
+plan_requests = SingleFlight()
+
+# Opt-in tracemalloc snapshots for /admin/memory, grouped by line of this file
+memory_tracker = AllocationTracker(__file__)
+
+# Request fields that do not influence the generated plan (client retry metadata)
+WORKOUT_PLAN_VOLATILE_FIELDS = (
+    "user_profile.preferences.request_id",
+    "user_profile.preferences.client_timestamp",
+)
+
+# Columns of the session export (name, Arrow type), filled by workout_plan_export_rows
+SESSION_EXPORT_COLUMNS = [
+    ("user_id", "string"), ("start_date", "date"), ("week_number", "int32"), ("session_index", "int32"),
+    ("session_id", "string"), ("session_category", "string"), ("difficulty_level", "string"),
+    ("is_deload", "bool"), ("exercise_id", "string"), ("exercise_category", "string"),
+    ("is_senegalese", "bool"), ("sets", "int32"), ("reps", "int32"), ("rest_seconds", "int32"),
+    ("time_minutes", "float64"), ("calories", "float64")
+]
 
 class UserProfile(BaseModel):
     """User profile for workout planning"""
@@ -116,6 +232,7 @@ class WorkoutSession(BaseModel):
     target_muscle_groups: List[str]
     equipment_needed: List[str]
     notes: str
+    prescription: Optional[Dict[str, Any]] = None
 
 class WorkoutPlanResponse(BaseModel):
     """Response for workout plan generation"""
@@ -129,6 +246,24 @@ class WorkoutPlanResponse(BaseModel):
     progression_plan: Dict[str, Any]
     equipment_requirements: List[str]
     nutrition_recommendations: List[str]
+    plan_id: Optional[str] = None
+
+class SessionLogEntry(BaseModel):
+    """Logged outcome of a planned session"""
+    session_index: int = Field(..., ge=0, description="Position of the session in the plan")
+    status: str = Field(..., description="completed or missed")
+
+class WorkoutAdaptRequest(BaseModel):
+    """Request to adapt the remaining part of a workout plan"""
+    plan: WorkoutPlanResponse
+    request: WorkoutPlanRequest = Field(..., description="Original plan request with the current user profile")
+    session_log: List[SessionLogEntry] = Field(default_factory=list)
+
+class WorkoutPlanSyncRequest(BaseModel):
+    """Request for what changed since the version of a plan a client holds"""
+    since: str = Field(..., description="plan_id of the version the client holds")
+    request: Optional[WorkoutPlanRequest] = Field(None, description="Sync to the current plan for this request")
+    plan_id: Optional[str] = Field(None, description="Sync to this cached version instead, e.g. after an adapt")
 
 class WorkoutRecommendation(BaseModel):
     """Workout recommendation"""
@@ -142,44 +277,309 @@ class WorkoutRecommendation(BaseModel):
 def load_models():
     """Load AI models and data"""
     global workout_model, exercise_database, senegalese_exercises, scaler, label_encoders
+    global plan_cache, plan_exporter, catalog_version, exercise_ranker, exercise_facets
+    
+    session_templates.clear()
+    packed_selection.cache_clear()
     
     try:
         # Load workout recommendation model
-        model_path = os.getenv("WORKOUT_MODEL_PATH", "models/workout_recommendation_model.h5")
+        model_path = settings.path("WORKOUT_MODEL_PATH", "models/workout_recommendation_model.h5")
         if os.path.exists(model_path):
             workout_model = keras.models.load_model(model_path)
             logger.info("Workout model loaded successfully")
         
         # Load exercise database
-        exercise_db_path = os.getenv("EXERCISE_DATABASE_PATH", "data/exercise_database.json")
+        exercise_db_path = settings.path("EXERCISE_DATABASE_PATH", "data/exercise_database.json")
         if os.path.exists(exercise_db_path):
             with open(exercise_db_path, 'r', encoding='utf-8') as f:
                 exercise_database = json.load(f)
             logger.info("Exercise database loaded successfully")
         
         # Load Senegalese exercises specifically
-        senegalese_path = os.getenv("SENEGALESE_EXERCISES_PATH", "data/senegalese_exercises.json")
+        senegalese_path = settings.path("SENEGALESE_EXERCISES_PATH", "data/senegalese_exercises.json")
         if os.path.exists(senegalese_path):
             with open(senegalese_path, 'r', encoding='utf-8') as f:
                 senegalese_exercises = json.load(f)
             logger.info("Senegalese exercises database loaded successfully")
         
         # Load scaler and encoders
-        scaler_path = os.getenv("SCALER_PATH", "models/scaler.pkl")
+        scaler_path = settings.path("SCALER_PATH", "models/scaler.pkl")
         if os.path.exists(scaler_path):
             scaler = joblib.load(scaler_path)
         
         # Load label encoders
-        encoders_path = os.getenv("ENCODERS_PATH", "models/label_encoders.pkl")
+        encoders_path = settings.path("ENCODERS_PATH", "models/label_encoders.pkl")
         if os.path.exists(encoders_path):
             label_encoders = joblib.load(encoders_path)
         
+        # Index exercises for session packing
+        build_exercise_arrays()
+        
+        # Optional model ranking: keras uses the model above, tflite / onnx an exported copy
+        ranking_runtime = settings.get("RANKING_RUNTIME", "").lower()
+        ranking_path = settings.path(
+            "RANKING_MODEL_PATH",
+            model_path if ranking_runtime == "keras" else f"{os.path.splitext(model_path)[0]}.{ranking_runtime}"
+        )
+        runner = load_runner(ranking_runtime, workout_model, ranking_path, int(settings.get("RANKING_THREADS", "1")))
+        exercise_ranker = ItemScorer(runner, scaler) if runner is not None else None
+        
+        # Cached plans are only valid for the catalog (and ranking model) they were computed from
+        catalog_version = canonical_request_hash({
+            "format": PLAN_FORMAT_VERSION,
+            "exercises": exercise_database, "senegalese_exercises": senegalese_exercises,
+            "ranking": model_fingerprint(ranking_runtime, ranking_path) if exercise_ranker else ""
+        })[:16]
+        if exercise_ranker is not None:
+            exercise_ranker.set_catalog(catalog_version, exercise_item_features())
+            logger.info(f"Exercise ranking model ready ({runner.runtime})")
+        exercise_facets = build_exercise_facets(catalog_version)
+        
+        # Load persistent plan cache
+        cache_path = settings.path("PLAN_CACHE_PATH", "cache/workout_plans.sqlite")
+        if cache_path:
+            plan_cache = PlanCache(
+                cache_path,
+                ttl_seconds=int(settings.get("PLAN_CACHE_TTL_SECONDS", "86400")),
+                max_bytes=int(settings.get("PLAN_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+            )
+            dropped = plan_cache.set_catalog_version(catalog_version)
+            logger.info(f"Plan cache ready at {cache_path} (catalog {catalog_version}, {dropped} stale entries dropped)")
+        
+        # Optional columnar export of every generated plan for analytics
+        if plan_exporter is not None:
+            plan_exporter.close()
+            plan_exporter = None
+        export_dir = settings.path("PLAN_EXPORT_DIR", "")
+        if export_dir:
+            plan_exporter = PlanExporter(
+                export_dir, SESSION_EXPORT_COLUMNS, workout_plan_export_rows,
+                export_format=settings.get("PLAN_EXPORT_FORMAT", "parquet"),
+                row_group_rows=int(settings.get("PLAN_EXPORT_ROW_GROUP_ROWS", str(64 * 1024))),
+                file_rows=int(settings.get("PLAN_EXPORT_FILE_ROWS", str(1024 * 1024))),
+                prefix="session_exercises"
+            )
+            logger.info(f"Exporting generated plans to {export_dir} ({plan_exporter.export_format})")
+        
         logger.info("All models and data loaded successfully")
         
     except Exception as e:
         logger.error(f"Error loading models: {e}")
         raise
 
+def estimate_exercise_time(exercise: Dict[str, Any], difficulty: str) -> float:
+    """Estimated minutes for an exercise at a difficulty level"""
+    sets_range = exercise.get("sets_recommended", {}).get(difficulty, [3, 4])
+    reps_range = exercise.get("reps_recommended", {}).get(difficulty, [8, 12])
+    rest_time = exercise.get("rest_time_seconds", 90)
+    
+    avg_sets = sum(sets_range) / len(sets_range)
+    avg_reps = sum(reps_range) / len(reps_range)
+    
+    # Estimate time: (sets * reps * 3 seconds) + (rest time * (sets-1))
+    estimated_time = (avg_sets * avg_reps * 3) + (rest_time * (avg_sets - 1))
+    return estimated_time / 60
+
+def recommended_volume(exercises: List[Dict[str, Any]], key: str, difficulty: str, default: List[int]) -> np.ndarray:
+    """(n_exercises, 2) average and maximum of a recommended sets or reps range"""
+    ranges = [ex.get(key, {}).get(difficulty, default) for ex in exercises]
+    return np.array([[sum(r) / len(r), max(r)] for r in ranges], dtype=float).reshape(-1, 2)
+
+def build_exercise_catalog() -> List[Dict[str, Any]]:
+    """Merge the general and Senegalese exercise files into one catalog, one entry per id"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for source, is_senegalese in ((exercise_database, False), (senegalese_exercises, True)):
+        for exercise in source or []:
+            entry = {**merged.get(exercise["id"], {}), **exercise}
+            entry["is_senegalese"] = bool(exercise.get("is_senegalese", is_senegalese) or entry.get("is_senegalese"))
+            merged[exercise["id"]] = entry
+    return list(merged.values())
+
+def build_exercise_facets(version: str) -> FacetIndex:
+    """Facet posting lists over the unified catalog, in catalog order"""
+    return FacetIndex({
+        "category": [[ex.get("category", "")] for ex in exercise_catalog],
+        "difficulty": [[ex.get("difficulty_level", "")] for ex in exercise_catalog],
+        "muscle_group": [ex.get("muscle_groups", []) for ex in exercise_catalog],
+        "equipment": [ex.get("equipment_needed", []) for ex in exercise_catalog],
+        "is_senegalese": [[str(ex["is_senegalese"]).lower()] for ex in exercise_catalog]
+    }, len(exercise_catalog), version)
+
+def locale_boost(language: Optional[str]) -> float:
+    """Ranking bonus given to Senegalese exercises for a user language"""
+    return SENEGALESE_LOCALE_BOOST.get((language or "").lower(), 0.0)
+
+def build_exercise_arrays():
+    """Build the unified catalog and precompute its time, calorie, volume, muscle group and filter columns"""
+    global exercise_catalog, exercise_row_index, exercise_time_minutes, exercise_calories_per_minute
+    global exercise_sets, exercise_reps, exercise_rest_seconds
+    global muscle_group_index, exercise_muscle_matrix, exercise_is_senegalese, exercise_difficulty
+    global equipment_index, exercise_equipment_matrix, exercise_search_text
+    
+    exercise_catalog = build_exercise_catalog()
+    exercises = exercise_catalog
+    exercise_row_index = {exercise["id"]: row for row, exercise in enumerate(exercises)}
+    exercise_is_senegalese = np.array([ex["is_senegalese"] for ex in exercises], dtype=bool)
+    exercise_difficulty = np.array([ex.get("difficulty_level", "") for ex in exercises], dtype=object)
+    exercise_time_minutes = {
+        difficulty: np.array([estimate_exercise_time(ex, difficulty) for ex in exercises], dtype=float)
+        for difficulty in DIFFICULTY_LEVELS
+    }
+    exercise_calories_per_minute = np.array(
+        [ex.get("estimated_calories_per_minute", 5) for ex in exercises], dtype=float
+    )
+    exercise_sets = {
+        difficulty: recommended_volume(exercises, "sets_recommended", difficulty, [3, 4])
+        for difficulty in DIFFICULTY_LEVELS
+    }
+    exercise_reps = {
+        difficulty: recommended_volume(exercises, "reps_recommended", difficulty, [8, 12])
+        for difficulty in DIFFICULTY_LEVELS
+    }
+    exercise_rest_seconds = np.array([ex.get("rest_time_seconds", 90) for ex in exercises], dtype=float)
+    
+    groups = sorted({mg for ex in exercises for mg in ex.get("muscle_groups", [])})
+    muscle_group_index = {mg: col for col, mg in enumerate(groups)}
+    exercise_muscle_matrix = np.zeros((len(exercises), len(groups)), dtype=bool)
+    for row, ex in enumerate(exercises):
+        for mg in ex.get("muscle_groups", []):
+            exercise_muscle_matrix[row, muscle_group_index[mg]] = True
+    
+    equipment = sorted({eq for ex in exercises for eq in ex.get("equipment_needed", [])})
+    equipment_index = {eq: col for col, eq in enumerate(equipment)}
+    exercise_equipment_matrix = np.zeros((len(exercises), len(equipment)), dtype=bool)
+    for row, ex in enumerate(exercises):
+        for eq in ex.get("equipment_needed", []):
+            exercise_equipment_matrix[row, equipment_index[eq]] = True
+    
+    exercise_search_text = [
+        "\n".join([
+            ex.get("name") or "", ex.get("name_fr") or "", ex.get("name_wo") or "",
+            ex.get("category") or "", " ".join(ex.get("muscle_groups", []))
+        ]).lower()
+        for ex in exercises
+    ]
+    
+    build_exercise_neighbours()
+
+def exercise_similarity(rows: np.ndarray) -> np.ndarray:
+    """(len(rows), n_exercises) similarity of some exercises to every exercise, between 0 and 1"""
+    similarity = exercise_muscle_unit[rows] @ exercise_muscle_unit.T
+    similarity += profile_similarity[exercise_profile_codes[rows]][:, exercise_profile_codes]
+    return similarity
+
+def build_exercise_neighbours(block_size: int = 1024):
+    """Precompute each exercise's most similar exercises, a block of rows at a time"""
+    global exercise_muscle_unit, exercise_profile_codes, profile_similarity
+    global exercise_neighbours, exercise_neighbour_similarity
+    
+    n = len(exercise_catalog)
+    norms = np.linalg.norm(exercise_muscle_matrix, axis=1, keepdims=True)
+    # The muscle group weight is folded into the unit vectors, so their dot product is weighted
+    exercise_muscle_unit = (
+        exercise_muscle_matrix / np.where(norms > 0, norms, 1) * np.sqrt(SUBSTITUTE_WEIGHTS["muscle_groups"])
+    ).astype(np.float32)
+    
+    # Category and difficulty take few values, so their part is a lookup table over the pairs
+    categories, category_codes = np.unique([ex.get("category", "") for ex in exercise_catalog], return_inverse=True)
+    levels = np.array([
+        DIFFICULTY_LEVELS.index(level) if level in DIFFICULTY_LEVELS else 1 for level in exercise_difficulty
+    ], dtype=int)
+    exercise_profile_codes = category_codes * len(DIFFICULTY_LEVELS) + levels
+    pair_category = np.repeat(np.arange(len(categories)), len(DIFFICULTY_LEVELS))
+    pair_level = np.tile(np.arange(len(DIFFICULTY_LEVELS)), len(categories))
+    profile_similarity = (
+        SUBSTITUTE_WEIGHTS["category"] * (pair_category[:, None] == pair_category[None, :])
+        + SUBSTITUTE_WEIGHTS["difficulty"]
+        * (1 - np.abs(pair_level[:, None] - pair_level[None, :]) / (len(DIFFICULTY_LEVELS) - 1))
+    ).astype(np.float32)
+    
+    count = min(SUBSTITUTE_NEIGHBOURS, max(0, n - 1))
+    exercise_neighbours = np.zeros((n, count), dtype=np.int32)
+    exercise_neighbour_similarity = np.zeros((n, count), dtype=np.float32)
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(n, start + block_size))
+        similarity = exercise_similarity(rows)
+        similarity[np.arange(len(rows)), rows] = -np.inf
+        top = np.argpartition(-similarity, count - 1, axis=1)[:, :count] if count else np.zeros((len(rows), 0), dtype=int)
+        top_similarity = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_similarity, axis=1, kind="stable")
+        exercise_neighbours[rows] = np.take_along_axis(top, order, axis=1)
+        exercise_neighbour_similarity[rows] = np.take_along_axis(top_similarity, order, axis=1)
+
+def find_exercise_substitutes(
+    exercise_id: str,
+    k: int = 5,
+    available_equipment: Optional[List[str]] = None,
+    injuries: Optional[List[str]] = None,
+    exclude_exercises: Optional[List[str]] = None
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Catalog row of an exercise and its k most similar alternatives doable with the
+    equipment and safe for the injuries, with their similarities. Raises KeyError
+    for exercises outside the catalog.
+    """
+    row = exercise_row_index[exercise_id]
+    avoid_cols = [muscle_group_index[mg] for mg in get_contraindicated_muscle_groups(injuries) if mg in muscle_group_index]
+    missing_equipment = []
+    if available_equipment is not None:
+        # Bodyweight exercises are always possible
+        available = set(available_equipment) | {"none"}
+        missing_equipment = [col for eq, col in equipment_index.items() if eq not in available]
+    excluded = [exercise_row_index[ex_id] for ex_id in exclude_exercises or [] if ex_id in exercise_row_index]
+    
+    def allowed(rows: np.ndarray) -> np.ndarray:
+        keep = np.ones(len(rows), dtype=bool)
+        if avoid_cols:
+            keep &= ~exercise_muscle_matrix[np.ix_(rows, avoid_cols)].any(axis=1)
+        if missing_equipment:
+            keep &= ~exercise_equipment_matrix[np.ix_(rows, missing_equipment)].any(axis=1)
+        if excluded:
+            keep &= ~np.isin(rows, excluded)
+        return keep
+    
+    # Masks apply to the precomputed neighbours, unless too few of them pass
+    rows, similarity = exercise_neighbours[row], exercise_neighbour_similarity[row]
+    keep = allowed(rows)
+    if keep.sum() < k and len(rows) < len(exercise_catalog) - 1:
+        all_similarity = exercise_similarity(np.array([row]))[0]
+        candidates = np.flatnonzero(allowed(np.arange(len(exercise_catalog))))
+        candidates = candidates[candidates != row]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-all_similarity[candidates], k)[:k]]
+        rows = candidates[np.argsort(-all_similarity[candidates], kind="stable")]
+        return row, rows, all_similarity[rows]
+    return row, rows[keep][:k], similarity[keep][:k]
+
+def exercise_item_features() -> np.ndarray:
+    """(n_exercises, 5) ranking model item features"""
+    exercises = exercise_catalog
+    return np.array([
+        [
+            encode_label(label_encoders, "category", ex.get("category", "")),
+            encode_label(label_encoders, "difficulty_level", ex.get("difficulty_level", "")),
+            ex.get("estimated_calories_per_minute", 5),
+            ex.get("rest_time_seconds", 90),
+            len(ex.get("muscle_groups", []))
+        ]
+        for ex in exercises
+    ], dtype=float).reshape(-1, 5)
+
+def exercise_context_features(user_profile: UserProfile) -> tuple:
+    """Ranking model context features for a profile, in model input order"""
+    goal = user_profile.fitness_goals[0] if user_profile.fitness_goals else "general_fitness"
+    return (
+        user_profile.age,
+        encode_label(label_encoders, "gender", user_profile.gender.lower()),
+        user_profile.height_cm,
+        user_profile.weight_kg,
+        encode_label(label_encoders, "fitness_level", user_profile.fitness_level),
+        encode_label(label_encoders, "fitness_goal", goal),
+        user_profile.experience_years,
+        user_profile.time_availability
+    )
+
 def calculate_workout_intensity(fitness_level: str, goals: List[str]) -> Dict[str, float]:
     """Calculate workout intensity based on fitness level and goals"""
     base_intensity = {
@@ -205,64 +605,111 @@ def calculate_workout_intensity(fitness_level: str, goals: List[str]) -> Dict[st
         "flexibility": 0.8
     }
 
+def get_contraindicated_muscle_groups(injuries: List[str]) -> List[str]:
+    """Muscle groups to avoid given the user's injuries"""
+    groups = set()
+    for injury in injuries or []:
+        groups.update(INJURY_MUSCLE_GROUPS.get(injury.lower().replace(" ", "_"), []))
+    return sorted(groups)
+
 def get_exercise_recommendations(
     muscle_groups: List[str], 
     difficulty: str, 
     equipment: List[str],
     time_available: int,
-    exclude_exercises: List[str] = None
+    exclude_exercises: List[str] = None,
+    exclude_muscle_groups: List[str] = None,
+    limit: Optional[int] = 10,
+    user_profile: Optional[UserProfile] = None,
+    language: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    """Get exercise recommendations based on criteria"""
-    if not exercise_database:
+    """
+    Get exercise recommendations based on criteria (each fitting time_available on its own).
+    Senegalese exercises get a relevance bonus for the user's language, and with a
+    ranking model and a profile the model's score orders equally relevant exercises.
+    """
+    if not exercise_catalog:
         return []
     
+    # Filter the catalog columns: difficulty, targeted and injured muscle groups, equipment and time
+    mask = exercise_difficulty == difficulty
+    target_cols = sorted({muscle_group_index[mg] for mg in muscle_groups if mg in muscle_group_index})
+    mask &= exercise_muscle_matrix[:, target_cols].any(axis=1)
+    avoid_cols = [muscle_group_index[mg] for mg in exclude_muscle_groups or [] if mg in muscle_group_index]
+    if avoid_cols:
+        mask &= ~exercise_muscle_matrix[:, avoid_cols].any(axis=1)
+    missing_equipment = [col for eq, col in equipment_index.items() if eq not in equipment]
+    if missing_equipment:
+        mask &= ~exercise_equipment_matrix[:, missing_equipment].any(axis=1)
+    
+    # Estimated time for each exercise, precomputed at load
+    times = exercise_time_minutes.get(difficulty)
+    if times is None:
+        times = np.array([estimate_exercise_time(ex, difficulty) for ex in exercise_catalog], dtype=float)
+    mask &= times <= time_available
+    for exercise_id in exclude_exercises or []:
+        if exercise_id in exercise_row_index:
+            mask[exercise_row_index[exercise_id]] = False
+    rows = np.flatnonzero(mask)
+    
+    # Sort by relevance (with the locale bonus), model score and time efficiency
+    language = language or (user_profile.language if user_profile else None)
+    relevance = exercise_muscle_matrix[rows][:, target_cols].sum(axis=1) + locale_boost(language) * exercise_is_senegalese[rows]
+    scores = None
+    if exercise_ranker is not None and user_profile is not None:
+        # The whole catalog is scored in one batch, then cached for the profile
+        scores = exercise_ranker.scores(exercise_context_features(user_profile))
+    model_scores = scores[rows] if scores is not None else np.zeros(len(rows))
+    rows = rows[np.lexsort((times[rows], -model_scores, -relevance))][:limit]
+    
     recommendations = []
-    exclude_exercises = exclude_exercises or []
+    for row in rows.tolist():
+        exercise_copy = exercise_catalog[row].copy()
+        exercise_copy["estimated_time_minutes"] = float(times[row])
+        exercise_copy["recommended_sets"] = exercise_copy.get("sets_recommended", {}).get(difficulty, [3, 4])
+        exercise_copy["recommended_reps"] = exercise_copy.get("reps_recommended", {}).get(difficulty, [8, 12])
+        recommendations.append(exercise_copy)
     
-    for exercise in exercise_database:
-        # Skip if exercise is excluded
-        if exercise["id"] in exclude_exercises:
-            continue
-        
-        # Check if exercise targets desired muscle groups
-        if not any(mg in exercise.get("muscle_groups", []) for mg in muscle_groups):
-            continue
-        
-        # Check difficulty level
-        if exercise.get("difficulty_level") != difficulty:
-            continue
-        
-        # Check equipment availability
-        exercise_equipment = exercise.get("equipment_needed", [])
-        if exercise_equipment and not all(eq in equipment for eq in exercise_equipment):
-            continue
-        
-        # Calculate estimated time for this exercise
-        sets_range = exercise.get("sets_recommended", {}).get(difficulty, [3, 4])
-        reps_range = exercise.get("reps_recommended", {}).get(difficulty, [8, 12])
-        rest_time = exercise.get("rest_time_seconds", 90)
-        
-        avg_sets = sum(sets_range) / len(sets_range)
-        avg_reps = sum(reps_range) / len(reps_range)
-        
-        # Estimate time: (sets * reps * 3 seconds) + (rest time * (sets-1))
-        estimated_time = (avg_sets * avg_reps * 3) + (rest_time * (avg_sets - 1))
-        estimated_time_minutes = estimated_time / 60
-        
-        if estimated_time_minutes <= time_available:
-            exercise_copy = exercise.copy()
-            exercise_copy["estimated_time_minutes"] = estimated_time_minutes
-            exercise_copy["recommended_sets"] = sets_range
-            exercise_copy["recommended_reps"] = reps_range
-            recommendations.append(exercise_copy)
+    return recommendations
+
+@lru_cache(maxsize=4096)
+def packed_selection(
+    exercise_ids: tuple,
+    muscle_groups: tuple,
+    difficulty: str,
+    budget_minutes: float,
+    senegalese_bonus: float = 0.0
+) -> tuple:
+    """Positions of the exercises to keep so the session fits its time budget (memoized)"""
+    rows = np.array([exercise_row_index[exercise_id] for exercise_id in exercise_ids], dtype=int)
+    if difficulty in exercise_time_minutes:
+        times = exercise_time_minutes[difficulty][rows]
+    else:
+        # Levels outside DIFFICULTY_LEVELS have no precomputed times and fall back to the recommended defaults
+        times = np.array([estimate_exercise_time(exercise_catalog[row], difficulty) for row in rows], dtype=float)
     
-    # Sort by relevance and time efficiency
-    recommendations.sort(key=lambda x: (
-        len(set(muscle_groups) & set(x.get("muscle_groups", []))),
-        -x.get("estimated_time_minutes", 0)
-    ), reverse=True)
+    # Value = calories burned plus a bonus per targeted muscle group covered (and the locale bonus)
+    target_cols = [muscle_group_index[mg] for mg in muscle_groups if mg in muscle_group_index]
+    coverage = exercise_muscle_matrix[rows][:, target_cols].sum(axis=1) + senegalese_bonus * exercise_is_senegalese[rows]
+    values = exercise_calories_per_minute[rows] * times + COVERAGE_WEIGHT * coverage
     
-    return recommendations[:10]  # Return top 10 recommendations
+    return tuple(pack_knapsack(times, values, budget_minutes).tolist())
+
+def pack_session_exercises(
+    candidates: List[Dict[str, Any]],
+    muscle_groups: List[str],
+    difficulty: str,
+    budget_minutes: float,
+    language: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Keep the subset of candidates with the best coverage and calorie burn within the budget"""
+    if not candidates:
+        return candidates
+    selected = packed_selection(
+        tuple(ex["id"] for ex in candidates), tuple(muscle_groups), difficulty, float(budget_minutes),
+        locale_boost(language)
+    )
+    return [candidates[i] for i in selected]
 
 def generate_workout_session(
     session_type: str,
@@ -270,9 +717,11 @@ def generate_workout_session(
     difficulty: str,
     equipment: List[str],
     time_available: int,
-    language: str = "fr"
+    language: str = "fr",
+    injuries: List[str] = None
 ) -> WorkoutSession:
     """Generate a single workout session"""
+    avoid_groups = get_contraindicated_muscle_groups(injuries)
     
     # Define session structure based on type
     session_structures = {
@@ -300,17 +749,29 @@ def generate_workout_session(
     main_workout_time = int(time_available * structure["main_workout_ratio"])
     cool_down_time = int(time_available * structure["cool_down_ratio"])
     
-    # Get exercise recommendations
-    main_exercises = get_exercise_recommendations(
-        muscle_groups, difficulty, equipment, main_workout_time
+    # Get exercise recommendations, then pack each part into its time budget
+    main_exercises = pack_session_exercises(
+        get_exercise_recommendations(
+            muscle_groups, difficulty, equipment, main_workout_time,
+            exclude_muscle_groups=avoid_groups, limit=None, language=language
+        ),
+        muscle_groups, difficulty, main_workout_time, language
     )
     
-    warm_up_exercises = get_exercise_recommendations(
-        ["full_body"], "beginner", ["none"], warm_up_time
+    warm_up_exercises = pack_session_exercises(
+        get_exercise_recommendations(
+            ["full_body"], "beginner", ["none"], warm_up_time,
+            exclude_muscle_groups=avoid_groups, limit=None, language=language
+        ),
+        ["full_body"], "beginner", warm_up_time, language
     )
     
-    cool_down_exercises = get_exercise_recommendations(
-        ["full_body"], "beginner", ["none"], cool_down_time
+    cool_down_exercises = pack_session_exercises(
+        get_exercise_recommendations(
+            ["full_body"], "beginner", ["none"], cool_down_time,
+            exclude_muscle_groups=avoid_groups, limit=None, language=language
+        ),
+        ["full_body"], "beginner", cool_down_time, language
     )
     
     # Calculate total calories
@@ -335,8 +796,9 @@ def generate_workout_session(
     
     name = session_names.get(language, session_names["fr"]).get(session_type, "Workout")
     
-    return WorkoutSession(
-        id=f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+    session = build_model(
+        WorkoutSession,
+        id="",
         name=name,
         name_fr=name if language == "fr" else None,
         category=session_type,
@@ -353,6 +815,94 @@ def generate_workout_session(
         )),
         notes=generate_workout_notes(session_type, language)
     )
+    session.id = content_id("session", session.model_dump())
+    return session
+
+def get_session_template(
+    session_type: str,
+    muscle_groups: List[str],
+    difficulty: str,
+    equipment: List[str],
+    time_available: int,
+    language: str = "fr",
+    injuries: List[str] = None
+) -> WorkoutSession:
+    """Return a cached session for these inputs, generating it on first use"""
+    key = (
+        session_type, tuple(muscle_groups), difficulty, tuple(sorted(equipment)),
+        time_available, language, tuple(get_contraindicated_muscle_groups(injuries))
+    )
+    template = session_templates.get(key)
+    if template is None:
+        template = generate_workout_session(
+            session_type, muscle_groups, difficulty, equipment, time_available, language, injuries
+        )
+        if len(session_templates) >= SESSION_TEMPLATE_CACHE_SIZE:
+            session_templates.pop(next(iter(session_templates)))
+        session_templates[key] = template
+    
+    return template.model_copy()
+
+def get_weekly_split(workouts_per_week: int) -> List[str]:
+    """Session types for each workout of the week"""
+    if workouts_per_week == 3:
+        return ["strength", "cardio", "strength"]
+    elif workouts_per_week == 4:
+        return ["strength", "cardio", "strength", "flexibility"]
+    elif workouts_per_week == 5:
+        return ["strength", "cardio", "strength", "cardio", "strength"]
+    return ["strength"] * workouts_per_week
+
+def get_focus_areas(user_profile: UserProfile, request: WorkoutPlanRequest) -> List[str]:
+    """Focus areas for strength sessions, leaving out injured areas when possible"""
+    focus_areas = request.focus_areas
+    if not focus_areas:
+        if "muscle_gain" in user_profile.fitness_goals:
+            focus_areas = ["chest", "back", "legs", "shoulders", "arms"]
+        elif "weight_loss" in user_profile.fitness_goals:
+            focus_areas = ["full_body", "core"]
+        else:
+            focus_areas = ["full_body"]
+    
+    avoid_groups = get_contraindicated_muscle_groups(user_profile.injuries)
+    safe_areas = [area for area in focus_areas if area not in avoid_groups]
+    return safe_areas or focus_areas
+
+def build_plan_sessions(
+    user_profile: UserProfile,
+    request: WorkoutPlanRequest,
+    first_session: int,
+    last_session: int
+) -> List[WorkoutSession]:
+    """Generate the sessions of a plan between two session positions"""
+    weekly_split = get_weekly_split(request.workouts_per_week)
+    focus_areas = get_focus_areas(user_profile, request)
+    
+    sessions = []
+    for session_index in range(first_session, last_session):
+        day = session_index % request.workouts_per_week
+        session_type = weekly_split[day % len(weekly_split)]
+        
+        # Determine muscle groups for this session
+        if session_type == "strength":
+            # Rotate through focus areas
+            muscle_groups = [focus_areas[session_index % len(focus_areas)]]
+        elif session_type == "cardio":
+            muscle_groups = ["full_body"]
+        else:  # flexibility
+            muscle_groups = ["full_body"]
+        
+        sessions.append(get_session_template(
+            session_type=session_type,
+            muscle_groups=muscle_groups,
+            difficulty=user_profile.fitness_level,
+            equipment=user_profile.available_equipment,
+            time_available=user_profile.time_availability,
+            language=user_profile.language,
+            injuries=user_profile.injuries
+        ))
+    
+    return sessions
 
 def generate_workout_plan(user_profile: UserProfile, request: WorkoutPlanRequest) -> WorkoutPlanResponse:
     """Generate personalized workout plan"""
@@ -361,64 +911,20 @@ def generate_workout_plan(user_profile: UserProfile, request: WorkoutPlanRequest
     intensity = calculate_workout_intensity(user_profile.fitness_level, user_profile.fitness_goals)
     
     # Determine focus areas if not specified
-    if not request.focus_areas:
-        if "muscle_gain" in user_profile.fitness_goals:
-            request.focus_areas = ["chest", "back", "legs", "shoulders", "arms"]
-        elif "weight_loss" in user_profile.fitness_goals:
-            request.focus_areas = ["full_body", "core"]
-        else:
-            request.focus_areas = ["full_body"]
+    request.focus_areas = get_focus_areas(user_profile, request)
     
     # Generate sessions for each week
-    sessions = []
     start_date = date.today()
     total_sessions = request.duration_weeks * request.workouts_per_week
-    
-    # Define weekly workout split
-    weekly_split = []
-    if request.workouts_per_week == 3:
-        weekly_split = ["strength", "cardio", "strength"]
-    elif request.workouts_per_week == 4:
-        weekly_split = ["strength", "cardio", "strength", "flexibility"]
-    elif request.workouts_per_week == 5:
-        weekly_split = ["strength", "cardio", "strength", "cardio", "strength"]
-    else:
-        weekly_split = ["strength"] * request.workouts_per_week
-    
-    session_count = 0
-    for week in range(request.duration_weeks):
-        for day in range(request.workouts_per_week):
-            if session_count >= total_sessions:
-                break
-            
-            session_type = weekly_split[day % len(weekly_split)]
-            
-            # Determine muscle groups for this session
-            if session_type == "strength":
-                # Rotate through focus areas
-                muscle_groups = [request.focus_areas[session_count % len(request.focus_areas)]]
-            elif session_type == "cardio":
-                muscle_groups = ["full_body"]
-            else:  # flexibility
-                muscle_groups = ["full_body"]
-            
-            # Generate session
-            session = generate_workout_session(
-                session_type=session_type,
-                muscle_groups=muscle_groups,
-                difficulty=user_profile.fitness_level,
-                equipment=user_profile.available_equipment,
-                time_available=user_profile.time_availability,
-                language=user_profile.language
-            )
-            
-            sessions.append(session)
-            session_count += 1
+    with tracer.span("build_plan_sessions", {"sessions": total_sessions}):
+        sessions = build_plan_sessions(user_profile, request, 0, total_sessions)
     
     # Generate progression plan
     progression_plan = generate_progression_plan(
         user_profile, request, intensity
     )
+    with tracer.span("apply_session_prescriptions"):
+        sessions = apply_session_prescriptions(sessions, progression_plan["weeks"], request.workouts_per_week)
     
     # Generate equipment requirements
     equipment_requirements = list(set(
@@ -431,7 +937,8 @@ def generate_workout_plan(user_profile: UserProfile, request: WorkoutPlanRequest
         user_profile, sessions
     )
     
-    return WorkoutPlanResponse(
+    return build_model(
+        WorkoutPlanResponse,
         user_id=user_profile.user_id,
         start_date=start_date,
         end_date=start_date + timedelta(weeks=request.duration_weeks),
@@ -444,33 +951,328 @@ def generate_workout_plan(user_profile: UserProfile, request: WorkoutPlanRequest
         nutrition_recommendations=nutrition_recommendations
     )
 
-def generate_progression_plan(user_profile: UserProfile, request: WorkoutPlanRequest, intensity: Dict[str, float]) -> Dict[str, Any]:
-    """Generate progression plan for the workout program"""
+def adapt_workout_plan(
+    plan: WorkoutPlanResponse,
+    request: WorkoutPlanRequest,
+    session_log: List[SessionLogEntry]
+) -> WorkoutPlanResponse:
+    """Regenerate only the not-yet-done part of a plan from the session log"""
+    user_profile = request.user_profile
+    workouts_per_week = plan.workouts_per_week
+    total_sessions = plan.total_weeks * workouts_per_week
+    # The plan's own schedule decides the split and the weeks, whatever the original request said
+    request = request.model_copy(update={
+        "workouts_per_week": workouts_per_week,
+        "duration_weeks": plan.total_weeks
+    })
+    
+    statuses = {entry.session_index: entry.status for entry in session_log}
+    if statuses and max(statuses) >= total_sessions:
+        raise ValueError(f"session_index {max(statuses)} is outside the plan's {total_sessions} sessions")
+    first_pending = max(statuses) + 1 if statuses else 0
+    current_week = first_pending // workouts_per_week
+    
+    # Weeks where at least half the sessions were missed do not count as progression
+    missed_weeks = 0
+    for week in range(current_week):
+        week_statuses = [statuses.get(week * workouts_per_week + day) for day in range(workouts_per_week)]
+        if week_statuses.count("missed") * 2 >= workouts_per_week:
+            missed_weeks += 1
+    
+    intensity = calculate_workout_intensity(user_profile.fitness_level, user_profile.fitness_goals)
+    remaining_progression = generate_progression_plan(
+        user_profile, request, intensity, start_week=current_week, progression_offset=missed_weeks
+    )
+    progression_plan = dict(remaining_progression)
+    progression_plan["weeks"] = plan.progression_plan.get("weeks", [])[:current_week] + remaining_progression["weeks"]
+    
+    request.focus_areas = get_focus_areas(user_profile, request)
+    remaining_sessions = apply_session_prescriptions(
+        build_plan_sessions(user_profile, request, first_pending, total_sessions),
+        progression_plan["weeks"],
+        workouts_per_week,
+        first_session=first_pending
+    )
+    sessions = list(plan.sessions[:first_pending]) + remaining_sessions
+    
+    return build_model(
+        WorkoutPlanResponse,
+        user_id=plan.user_id,
+        start_date=plan.start_date,
+        end_date=plan.end_date,
+        total_weeks=plan.total_weeks,
+        workouts_per_week=workouts_per_week,
+        total_workouts=len(sessions),
+        sessions=sessions,
+        progression_plan=progression_plan,
+        equipment_requirements=list(set(
+            eq for session in sessions
+            for eq in session.equipment_needed
+        )),
+        nutrition_recommendations=generate_nutrition_recommendations(user_profile, sessions)
+    )
+
+def assign_workout_plan_ids(plan: WorkoutPlanResponse) -> WorkoutPlanResponse:
+    """
+    Content-hash ids for each session and for the plan, so unchanged sessions
+    keep their ids across versions. A session's position is hashed with it, as
+    weeks repeat the same session.
+    """
+    plan.sessions = [
+        session.model_copy(update={"id": content_id("session", {**session.model_dump(), "position": position})})
+        for position, session in enumerate(plan.sessions)
+    ]
+    plan.plan_id = plan_content_id(
+        "workout_plan",
+        plan.model_dump(exclude={"sessions", "plan_id"}),
+        [session.id for session in plan.sessions]
+    )
+    return plan
+
+def workout_plan_request_key(request: WorkoutPlanRequest) -> str:
+    """Canonical hash of a workout plan request (plans start today, so the date is part of the key)"""
+    return canonical_request_hash(
+        request.model_dump(mode="json"),
+        WORKOUT_PLAN_VOLATILE_FIELDS,
+        salt=date.today().isoformat()
+    )
+
+def get_or_generate_workout_plan(request: WorkoutPlanRequest, key: Optional[str] = None) -> Tuple[bytes, str]:
+    """Return the JSON-encoded workout plan for a request and its plan_id, served from the plan cache when possible"""
+    key = key or workout_plan_request_key(request)
+    
+    if plan_cache is not None:
+        with tracer.span("plan_cache.get") as span:
+            entry = plan_cache.get_entry(key)
+            # Entries cached before plan ids were stored with them are regenerated
+            cached = entry if entry is not None and entry[1] else None
+            span.set_attribute("hit", cached is not None)
+        if cached is not None:
+            return cached
+    
+    with tracer.span("generate_workout_plan", {"weeks": request.duration_weeks, "workouts_per_week": request.workouts_per_week}):
+        workout_plan = assign_workout_plan_ids(generate_workout_plan(request.user_profile, request))
+    with tracer.span("encode_plan"):
+        payload = encode_model(workout_plan)
+    if plan_exporter is not None:
+        with tracer.span("export_plan"):
+            plan_exporter.export(loads(payload))
+    
+    if plan_cache is not None:
+        # Under the request for reuse, and under its plan_id for delta syncs
+        with tracer.span("plan_cache.put"):
+            plan_cache.put(key, payload, plan_id=workout_plan.plan_id)
+            plan_cache.put(workout_plan.plan_id, payload, plan_id=workout_plan.plan_id)
+    
+    return payload, workout_plan.plan_id
+
+def plan_response(payload: bytes, plan_id: str, if_none_match: Optional[str] = None):
+    """Serve an encoded plan as-is (re-validated in strict mode) with its ETag, or 304 if the client has it"""
+    headers = {"ETag": plan_etag(plan_id)}
+    if etag_matches(if_none_match, plan_id):
+        return Response(status_code=304, headers=headers)
+    if strict_validation():
+        WorkoutPlanResponse.model_validate_json(payload)
+    return JSONBytesResponse(payload, headers=headers)
+
+def run_workout_plan_job(payload: Dict[str, Any]) -> bytes:
+    """Job handler: generate the workout plan for a queued request"""
+    return get_or_generate_workout_plan(WorkoutPlanRequest.model_validate(payload))[0]
+
+def run_workout_plan_batch_job(payload: Dict[str, Any]) -> bytes:
+    """Job handler: generate workout plans for a whole cohort of queued requests"""
+    plans = [get_or_generate_workout_plan(WorkoutPlanRequest.model_validate(item))[0] for item in payload["requests"]]
+    return b"[" + b",".join(plans) + b"]"
+
+def workout_plan_export_rows(plan: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Session rows of an encoded workout plan as column lists, one row per main exercise"""
+    columns = {name: [] for name, _ in SESSION_EXPORT_COLUMNS}
+    workouts_per_week = max(1, plan.get("workouts_per_week", 1))
+    for index, session in enumerate(plan.get("sessions", [])):
+        prescription = session.get("prescription") or {}
+        prescribed = {item["exercise_id"]: item for item in prescription.get("exercises", [])}
+        for exercise in session.get("exercises", []):
+            item = prescribed.get(exercise["id"], {})
+            row = (
+                plan.get("user_id"), plan.get("start_date"),
+                prescription.get("week_number", index // workouts_per_week + 1), index,
+                session.get("id"), session.get("category"), session.get("difficulty_level"),
+                prescription.get("is_deload", False), exercise["id"], exercise.get("category"),
+                exercise.get("is_senegalese", False), item.get("sets"), item.get("reps"),
+                item.get("rest_seconds", exercise.get("rest_time_seconds")),
+                item.get("estimated_time_minutes", exercise.get("estimated_time_minutes")),
+                item.get("estimated_calories")
+            )
+            for (name, _), value in zip(SESSION_EXPORT_COLUMNS, row):
+                columns[name].append(value)
+    return columns
+
+def generate_progression_plan(
+    user_profile: UserProfile,
+    request: WorkoutPlanRequest,
+    intensity: Dict[str, float],
+    start_week: int = 0,
+    progression_offset: int = 0
+) -> Dict[str, Any]:
+    """Generate progression plan for the workout program (from start_week, shifted back by missed weeks)"""
     
     progression = {
         "weeks": [],
         "intensity_increase": 0.05,  # 5% increase per week
         "volume_increase": 0.10,     # 10% increase per week
-        "deload_week": 4             # Deload every 4 weeks
+        "deload_week": 4,            # Deload every 4 weeks
+        "progression_offset": progression_offset
     }
     
-    for week in range(request.duration_weeks):
-        week_plan = {
+    # Week vectors for the whole program at once
+    weeks = np.arange(start_week, max(start_week, request.duration_weeks))
+    steps = np.maximum(0, weeks - progression_offset)
+    is_deload = (steps + 1) % progression["deload_week"] == 0
+    intensity_multipliers = (1 + steps * progression["intensity_increase"]) * np.where(is_deload, 0.8, 1.0)
+    volume_multipliers = (1 + steps * progression["volume_increase"]) * np.where(is_deload, 0.7, 1.0)
+    
+    progression["weeks"] = [
+        {
             "week_number": week + 1,
-            "intensity_multiplier": 1 + (week * progression["intensity_increase"]),
-            "volume_multiplier": 1 + (week * progression["volume_increase"]),
-            "is_deload": (week + 1) % progression["deload_week"] == 0,
-            "focus": "Progression continue" if not (week + 1) % progression["deload_week"] == 0 else "Récupération"
+            "intensity_multiplier": intensity_multiplier,
+            "volume_multiplier": volume_multiplier,
+            "is_deload": deload,
+            "focus": "Récupération" if deload else "Progression continue"
         }
-        
-        if week_plan["is_deload"]:
-            week_plan["intensity_multiplier"] *= 0.8
-            week_plan["volume_multiplier"] *= 0.7
-        
-        progression["weeks"].append(week_plan)
+        for week, intensity_multiplier, volume_multiplier, deload in zip(
+            weeks.tolist(), intensity_multipliers.tolist(), volume_multipliers.tolist(), is_deload.tolist()
+        )
+    ]
     
     return progression
 
+def apply_session_prescriptions(
+    sessions: List[WorkoutSession],
+    progression_weeks: List[Dict[str, Any]],
+    workouts_per_week: int,
+    first_session: int = 0
+) -> List[WorkoutSession]:
+    """
+    Attach concrete sets, reps, rest, time and calories to each session for its week.
+    
+    Sessions are positions first_session.. of the plan. Sets follow the week's
+    volume multiplier and reps its intensity multiplier, computed as one
+    broadcast of the distinct session templates against the week vectors.
+    Sets are then trimmed until each session fits its duration_minutes.
+    """
+    if not sessions or not progression_weeks:
+        return sessions
+    
+    # Distinct session templates and their padded per-exercise arrays
+    template_index: Dict[tuple, int] = {}
+    templates = []
+    session_template = np.empty(len(sessions), dtype=int)
+    for position, session in enumerate(sessions):
+        key = (
+            session.difficulty_level,
+            tuple(ex["id"] for ex in session.exercises),
+            tuple(ex["id"] for ex in session.warm_up + session.cool_down)
+        )
+        if key not in template_index:
+            template_index[key] = len(templates)
+            templates.append(session)
+        session_template[position] = template_index[key]
+    
+    width = max(len(template.exercises) for template in templates)
+    rows = np.zeros((len(templates), width), dtype=int)
+    mask = np.zeros((len(templates), width), dtype=bool)
+    base_sets = np.zeros((len(templates), width, 2))
+    base_reps = np.zeros((len(templates), width, 2))
+    # Warm-up and cool-down keep their template time and calories every week
+    fixed_minutes = np.zeros(len(templates))
+    fixed_calories = np.zeros(len(templates))
+    for t, template in enumerate(templates):
+        template_rows = [exercise_row_index[ex["id"]] for ex in template.exercises]
+        count = len(template_rows)
+        rows[t, :count] = template_rows
+        mask[t, :count] = True
+        sets = exercise_sets.get(template.difficulty_level)
+        reps = exercise_reps.get(template.difficulty_level)
+        base_sets[t, :count] = sets[template_rows] if sets is not None else [3.5, 4]
+        base_reps[t, :count] = reps[template_rows] if reps is not None else [10, 12]
+        fixed = template.warm_up + template.cool_down
+        fixed_minutes[t] = sum(ex.get("estimated_time_minutes", 5) for ex in fixed)
+        fixed_calories[t] = sum(ex.get("estimated_calories_per_minute", 5) * ex.get("estimated_time_minutes", 5) for ex in fixed)
+    
+    # Week vectors, indexed by each session's week
+    multipliers = np.array(
+        [[week["intensity_multiplier"], week["volume_multiplier"]] for week in progression_weeks], dtype=float
+    )
+    session_week = np.minimum(
+        (first_session + np.arange(len(sessions))) // workouts_per_week, len(progression_weeks) - 1
+    )
+    intensity = multipliers[session_week, 0][:, None]
+    volume = multipliers[session_week, 1][:, None]
+    
+    # (n_sessions, width) prescriptions
+    template_sets = base_sets[session_template]
+    template_reps = base_reps[session_template]
+    sets = np.clip(np.rint(template_sets[..., 0] * volume), 1, np.ceil(template_sets[..., 1] * PRESCRIPTION_MAX_SCALE))
+    reps = np.clip(np.rint(template_reps[..., 0] * intensity), 1, np.ceil(template_reps[..., 1] * PRESCRIPTION_MAX_SCALE))
+    session_rows = rows[session_template]
+    rest = exercise_rest_seconds[session_rows]
+    
+    # Same time model as estimate_exercise_time: 3 seconds per rep plus rest between sets
+    valid = mask[session_template]
+    session_fixed_minutes = fixed_minutes[session_template]
+    minutes = np.where(valid, (sets * reps * 3 + rest * (sets - 1)) / 60, 0.0)
+    session_minutes = minutes.sum(axis=1) + session_fixed_minutes
+    
+    # Progression must not outgrow the time the user has: drop one set at a time
+    # from the exercise with the most sets until each session fits
+    budget = np.array([session.duration_minutes for session in sessions], dtype=float)
+    while True:
+        trimmable = valid & (sets > 1)
+        over = np.flatnonzero((session_minutes > budget) & trimmable.any(axis=1))
+        if not len(over):
+            break
+        target = np.argmax(np.where(trimmable[over], sets[over], 0), axis=1)
+        sets[over, target] -= 1
+        minutes[over] = np.where(valid[over], (sets[over] * reps[over] * 3 + rest[over] * (sets[over] - 1)) / 60, 0.0)
+        session_minutes[over] = minutes[over].sum(axis=1) + session_fixed_minutes[over]
+    
+    calories = minutes * exercise_calories_per_minute[session_rows]
+    session_calories = calories.sum(axis=1) + fixed_calories[session_template]
+    
+    prescribed = []
+    for position, session in enumerate(sessions):
+        count = len(session.exercises)
+        week = progression_weeks[session_week[position]]
+        prescription = {
+            "week_number": week["week_number"],
+            "intensity_multiplier": week["intensity_multiplier"],
+            "volume_multiplier": week["volume_multiplier"],
+            "is_deload": week["is_deload"],
+            "exercises": [
+                {
+                    "exercise_id": ex["id"],
+                    "sets": int(ex_sets),
+                    "reps": int(ex_reps),
+                    "rest_seconds": int(ex_rest),
+                    "estimated_time_minutes": round(ex_minutes, 1),
+                    "estimated_calories": round(ex_calories, 1)
+                }
+                for ex, ex_sets, ex_reps, ex_rest, ex_minutes, ex_calories in zip(
+                    session.exercises,
+                    sets[position, :count].tolist(),
+                    reps[position, :count].tolist(),
+                    rest[position, :count].tolist(),
+                    minutes[position, :count].tolist(),
+                    calories[position, :count].tolist()
+                )
+            ],
+            "estimated_time_minutes": round(float(session_minutes[position]), 1),
+            "estimated_calories": round(float(session_calories[position]), 1)
+        }
+        prescribed.append(session.model_copy(update={"prescription": prescription}))
+    
+    return prescribed
+
 def generate_nutrition_recommendations(user_profile: UserProfile, sessions: List[WorkoutSession]) -> List[str]:
     """Generate nutrition recommendations based on workout plan"""
     recommendations = []
@@ -509,30 +1311,174 @@ def generate_workout_notes(session_type: str, language: str) -> str:
     
     return notes.get(language, notes["fr"]).get(session_type, "")
 
+# Common profiles whose sessions and rankings are computed during warm-up
+WARMUP_PROFILES = [
+    {"age": 30, "gender": "male", "height_cm": 175, "weight_kg": 78, "fitness_level": "beginner",
+     "fitness_goals": ["weight_loss"], "time_availability": 30, "available_equipment": ["none"]},
+    {"age": 30, "gender": "female", "height_cm": 163, "weight_kg": 65, "fitness_level": "beginner",
+     "fitness_goals": ["weight_loss"], "time_availability": 45, "available_equipment": ["none"]},
+    {"age": 28, "gender": "male", "height_cm": 178, "weight_kg": 72, "fitness_level": "intermediate",
+     "fitness_goals": ["muscle_gain"], "time_availability": 60, "available_equipment": ["none"]},
+    {"age": 35, "gender": "female", "height_cm": 165, "weight_kg": 62, "fitness_level": "intermediate",
+     "fitness_goals": ["endurance"], "time_availability": 45, "available_equipment": ["none"]}
+]
+
+def warm_up(readiness: Readiness):
+    """Load and index the catalogs, warm models and caches, then start the job queue"""
+    global job_queue
+    with readiness.phase("load_models"):
+        load_models()
+    
+    profiles = [UserProfile(user_id=f"warmup-{i}", **profile) for i, profile in enumerate(WARMUP_PROFILES)]
+    with readiness.phase("models"):
+        # A dummy batch (or the real ranking batches) traces the model graph
+        if exercise_ranker is not None:
+            for profile in profiles:
+                exercise_ranker.scores(exercise_context_features(profile))
+        elif workout_model is not None:
+            run_dummy_batch(workout_model)
+    
+    with readiness.phase("session_templates"):
+        # Fills the session template and packing caches for the common weekly splits
+        for profile in profiles:
+            for workouts_per_week in (3, 4, 5):
+                generate_workout_plan(profile, WorkoutPlanRequest(user_profile=profile, workouts_per_week=workouts_per_week))
+    
+    with readiness.phase("job_queue"):
+        # Start the durable plan job queue
+        job_queue = JobQueue(
+            settings.path("JOB_QUEUE_PATH", "cache/workout_jobs.sqlite"),
+            {
+                "workout-plan": run_workout_plan_job,
+                "workout-plan-batch": run_workout_plan_batch_job
+            },
+            workers=int(settings.get("JOB_WORKERS", "2"))
+        )
+        job_queue.start()
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize models on startup"""
-    load_models()
+    """Warm up in the background; /health/live answers meanwhile and /health/ready once done"""
+    readiness.start(warm_up)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers and finish the export file"""
+    if job_queue is not None:
+        job_queue.stop()
+    if plan_exporter is not None:
+        plan_exporter.close()
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
-        "status": "healthy",
+        "status": "healthy" if readiness.ready else readiness.report()["status"],
         "timestamp": datetime.now().isoformat(),
-        "models_loaded": workout_model is not None
+        "models_loaded": workout_model is not None,
+        "ranking": exercise_ranker.stats() if exercise_ranker else None,
+        "tracing": tracer.exporter.stats() if tracer.exporter else None,
+        "plan_export": plan_exporter.stats() if plan_exporter else None
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: catalogs indexed, caches warm and models run once, with per-phase timings"""
+    return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
 @app.post("/generate-workout-plan", response_model=WorkoutPlanResponse)
-async def generate_workout_plan_endpoint(request: WorkoutPlanRequest):
+async def generate_workout_plan_endpoint(request: WorkoutPlanRequest, if_none_match: Optional[str] = Header(None)):
     """Generate personalized workout plan"""
     try:
-        workout_plan = generate_workout_plan(request.user_profile, request)
-        return workout_plan
+        # Key is computed before generation, which fills in default focus areas
+        key = workout_plan_request_key(request)
+        payload, plan_id = await plan_requests.do(key, get_or_generate_workout_plan, request, key)
+        return plan_response(payload, plan_id, if_none_match)
     except Exception as e:
         logger.error(f"Error generating workout plan: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/workout-plan/adapt", response_model=WorkoutPlanResponse)
+async def adapt_workout_plan_endpoint(request: WorkoutAdaptRequest):
+    """Adapt the remaining weeks of a plan to logged sessions, injuries or new equipment"""
+    try:
+        plan = assign_workout_plan_ids(adapt_workout_plan(request.plan, request.request, request.session_log))
+        payload = encode_model(plan)
+        # Keep the adapted version addressable for delta syncs
+        if plan_cache is not None:
+            plan_cache.put(plan.plan_id, payload, plan_id=plan.plan_id)
+        return plan_response(payload, plan.plan_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error adapting workout plan: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/workout-plan/delta")
+async def workout_plan_delta_endpoint(sync: WorkoutPlanSyncRequest, if_none_match: Optional[str] = Header(None)):
+    """Only the sessions and plan fields that changed since the version a client holds (304 if none)"""
+    if sync.request is not None:
+        key = workout_plan_request_key(sync.request)
+        try:
+            payload, plan_id = await plan_requests.do(key, get_or_generate_workout_plan, sync.request, key)
+        except Exception as e:
+            logger.error(f"Error generating workout plan: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    elif sync.plan_id:
+        payload = plan_cache.get(sync.plan_id) if plan_cache is not None else None
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Plan not found in the plan cache")
+        # Plans are cached under their plan_id
+        plan_id = sync.plan_id
+    else:
+        raise HTTPException(status_code=400, detail="Send the plan request or the plan_id to sync to")
+    
+    headers = {"ETag": plan_etag(plan_id)}
+    if plan_id == sync.since or etag_matches(if_none_match, plan_id):
+        return Response(status_code=304, headers=headers)
+    
+    # Versions the cache no longer holds are synced in full
+    base = plan_cache.get(sync.since) if plan_cache is not None else None
+    plan = loads(payload)
+    delta = plan_delta(loads(base), plan, "sessions") if base is not None else full_plan_delta(sync.since, plan)
+    return JSONBytesResponse(dumps(delta), headers=headers)
+
+def submit_plan_job(kind: str, payload: Dict[str, Any], callback_url: Optional[str]) -> Dict[str, Any]:
+    """Queue a plan job and describe where to poll for it"""
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue not started")
+    try:
+        job_id = job_queue.submit(kind, payload, callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.post("/jobs/workout-plan", status_code=202)
+async def submit_workout_plan_job(request: WorkoutPlanRequest, callback_url: Optional[str] = None):
+    """Queue workout plan generation and return a job id immediately"""
+    return submit_plan_job("workout-plan", request.model_dump(mode="json"), callback_url)
+
+@app.post("/jobs/workout-plan/batch", status_code=202)
+async def submit_workout_plan_batch_job(batch: List[WorkoutPlanRequest], callback_url: Optional[str] = None):
+    """Queue workout plan generation for a cohort of users as a single job"""
+    payload = {"requests": [request.model_dump(mode="json") for request in batch]}
+    return submit_plan_job("workout-plan-batch", payload, callback_url)
+
+@app.get("/jobs/{job_id}")
+async def get_plan_job(job_id: str):
+    """Get job status, including the generated plan once it has succeeded"""
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue not started")
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/workout-recommendations")
 async def get_workout_recommendations(user_profile: UserProfile):
     """Get personalized workout recommendations"""
@@ -585,9 +1531,19 @@ async def get_workout_recommendations(user_profile: UserProfile):
                 senegalese_context="La natation est excellente pour l'endurance et rafraîchissante au Sénégal."
             ))
         
+        # Exercises for the user's focus areas, personalized when a ranking model is loaded
+        focus_areas = get_focus_areas(user_profile, WorkoutPlanRequest(user_profile=user_profile))
+        recommended_exercises = get_exercise_recommendations(
+            focus_areas, user_profile.fitness_level, user_profile.available_equipment,
+            user_profile.time_availability,
+            exclude_muscle_groups=get_contraindicated_muscle_groups(user_profile.injuries),
+            user_profile=user_profile
+        )
+        
         return {
             "user_id": user_profile.user_id,
             "recommendations": recommendations,
+            "recommended_exercises": recommended_exercises,
             "calculated_metrics": {
                 "recommended_workouts_per_week": 3 if user_profile.fitness_level == "beginner" else 4,
                 "recommended_session_duration": user_profile.time_availability,
@@ -601,51 +1557,159 @@ async def get_workout_recommendations(user_profile: UserProfile):
 
 @app.get("/exercises")
 async def get_exercises(
-    category: Optional[str] = None,
-    difficulty: Optional[str] = None,
-    muscle_group: Optional[str] = None
+    category: Optional[List[str]] = Query(None),
+    difficulty: Optional[List[str]] = Query(None),
+    muscle_group: Optional[List[str]] = Query(None),
+    equipment: Optional[List[str]] = Query(None),
+    is_senegalese: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
 ):
-    """Get exercise database with optional filtering"""
-    if not exercise_database:
+    """Browse the exercise catalog with combined filters, facet counts and cursor pagination"""
+    if not exercise_catalog or exercise_facets is None:
         raise HTTPException(status_code=404, detail="Exercise database not loaded")
     
-    exercises = exercise_database
-    
-    if category:
-        exercises = [ex for ex in exercises if ex.get("category") == category]
+    filters = {
+        "category": category,
+        "difficulty": difficulty,
+        "muscle_group": muscle_group,
+        "equipment": equipment,
+        "is_senegalese": [str(is_senegalese).lower()] if is_senegalese is not None else None
+    }
+    try:
+        page = exercise_facets.query(filters, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if difficulty:
-        exercises = [ex for ex in exercises if ex.get("difficulty_level") == difficulty]
+    return {
+        "exercises": [exercise_catalog[row] for row in page["rows"].tolist()],
+        "total": page["total"],
+        "next_cursor": page["next_cursor"],
+        "facets": page["facets"]
+    }
+
+@app.get("/exercise-substitutes")
+async def get_exercise_substitutes(
+    exercise_id: str,
+    k: int = Query(5, ge=1, le=50),
+    available_equipment: Optional[List[str]] = Query(None),
+    injuries: Optional[List[str]] = Query(None),
+    exclude: Optional[List[str]] = Query(None)
+):
+    """Closest alternatives to an exercise, doable with the given equipment and safe for the given injuries"""
+    if not exercise_catalog:
+        raise HTTPException(status_code=404, detail="Exercise database not loaded")
     
-    if muscle_group:
-        exercises = [ex for ex in exercises if muscle_group in ex.get("muscle_groups", [])]
+    try:
+        row, rows, similarity = find_exercise_substitutes(exercise_id, k, available_equipment, injuries, exclude)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Exercise not found: {exercise_id}")
     
-    return {"exercises": exercises}
+    return {
+        "exercise": exercise_catalog[row],
+        "contraindicated_muscle_groups": get_contraindicated_muscle_groups(injuries),
+        "substitutes": [
+            {**exercise_catalog[substitute], "similarity": round(float(score), 4)}
+            for substitute, score in zip(rows.tolist(), similarity.tolist())
+        ]
+    }
 
 @app.post("/exercise-search")
 async def search_exercises(query: str, language: str = "fr"):
-    """Search for exercises in the database"""
-    if not exercise_database:
+    """Search for exercises in the database (names in all languages, category and muscle groups)"""
+    if not exercise_catalog:
         raise HTTPException(status_code=404, detail="Exercise database not loaded")
     
     query_lower = query.lower()
-    results = []
-    
-    for exercise in exercise_database:
-        # Search in multiple languages
-        searchable_text = [
-            exercise.get("name", ""),
-            exercise.get("name_fr", ""),
-            exercise.get("name_wo", ""),
-            exercise.get("category", ""),
-            " ".join(exercise.get("muscle_groups", []))
-        ]
-        
-        if any(query_lower in text.lower() for text in searchable_text if text):
-            results.append(exercise)
+    rows = [row for row, text in enumerate(exercise_search_text) if query_lower in text]
+    
+    # Senegalese exercises first for languages with a locale bonus
+    if locale_boost(language) > 0:
+        rows.sort(key=lambda row: not exercise_is_senegalese[row])
     
-    return {"results": results[:20]}  # Limit to 20 results
+    return {"results": [exercise_catalog[row] for row in rows[:20]]}  # Limit to 20 results
+
+def memory_components() -> Dict[str, Dict[str, Any]]:
+    """The service's long-lived data, by group, for /admin/memory"""
+    return {
+        "catalogs": {
+            "exercise_database": exercise_database,
+            "senegalese_exercises": senegalese_exercises,
+            "exercise_catalog": exercise_catalog
+        },
+        "indexes": {
+            "exercise_row_index": exercise_row_index,
+            "exercise_time_minutes": exercise_time_minutes,
+            "exercise_calories_per_minute": exercise_calories_per_minute,
+            "exercise_sets": exercise_sets,
+            "exercise_reps": exercise_reps,
+            "exercise_rest_seconds": exercise_rest_seconds,
+            "exercise_muscle_matrix": exercise_muscle_matrix,
+            "exercise_is_senegalese": exercise_is_senegalese,
+            "exercise_difficulty": exercise_difficulty,
+            "exercise_equipment_matrix": exercise_equipment_matrix,
+            "exercise_search_text": exercise_search_text,
+            "exercise_facets": exercise_facets,
+            "exercise_muscle_unit": exercise_muscle_unit,
+            "exercise_profile_codes": exercise_profile_codes,
+            "profile_similarity": profile_similarity,
+            "exercise_neighbours": exercise_neighbours,
+            "exercise_neighbour_similarity": exercise_neighbour_similarity
+        },
+        "caches": {
+            "session_templates": session_templates
+        },
+        "models": {
+            "exercise_ranker": exercise_ranker,
+            "scaler": scaler,
+            "label_encoders": label_encoders
+        }
+    }
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+def get_memory_report():
+    """Process memory and the size of each catalog, index, cache and model"""
+    return {
+        "service": "workout-ai",
+        "timestamp": datetime.now().isoformat(),
+        "process": process_memory(),
+        "components": component_sizes(memory_components()),
+        "workout_model_bytes": model_memory(workout_model),
+        "plan_cache": plan_cache.stats() if plan_cache is not None else None,
+        # lru_cache contents are not reachable for sizing, only their counters
+        "packed_selection_cache": packed_selection.cache_info()._asdict(),
+        "tracing": memory_tracker.status()
+    }
+
+@app.post("/admin/memory/tracing/start", dependencies=[Depends(require_admin)])
+def start_memory_tracing(frames: int = Query(16, ge=1, le=64)):
+    """Start tracemalloc; allocations made before this are not tracked"""
+    return memory_tracker.start(frames)
+
+@app.post("/admin/memory/tracing/stop", dependencies=[Depends(require_admin)])
+def stop_memory_tracing():
+    """Stop tracemalloc and drop its snapshots"""
+    return memory_tracker.stop()
+
+@app.post("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+def take_memory_snapshot(name: str, limit: int = Query(20, ge=1, le=200)):
+    """Take a named snapshot and return its top allocation sites"""
+    try:
+        return memory_tracker.snapshot(name, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+def get_memory_diff(first: str, second: Optional[str] = None, limit: int = Query(20, ge=1, le=200)):
+    """Allocation growth by site between two snapshots, or between one and now"""
+    try:
+        return memory_tracker.diff(first, second, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
+    # Uvicorn's loggers go through the queue too; RequestTracing writes the access log
+    uvicorn.run(app, host="0.0.0.0", port=8002, log_config=None, access_log=False)
\ No newline at end of file
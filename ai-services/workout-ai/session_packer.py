@@ -0,0 +1,45 @@
+"""
+Arcadis Fit - Workout session packer
+0/1 knapsack selecting exercises that fit a session's time budget
+"""
+
+import numpy as np
+
+# Time resolution of the packing, in minutes
+TIME_STEP_MINUTES = 0.5
+
+
+def pack_knapsack(times: np.ndarray, values: np.ndarray, budget_minutes: float) -> np.ndarray:
+    """
+    Select items maximizing total value with total time within the budget.
+
+    Each item is used at most once. Times are rounded up to TIME_STEP_MINUTES
+    so the selection never exceeds the budget. The DP runs one vectorized
+    pass over the capacity axis per item. Returns the selected item indices
+    in their original order.
+    """
+    capacity = int(np.floor(budget_minutes / TIME_STEP_MINUTES + 1e-9))
+    if capacity <= 0 or len(times) == 0:
+        return np.array([], dtype=int)
+
+    weights = np.maximum(1, np.ceil(np.asarray(times) / TIME_STEP_MINUTES - 1e-9).astype(int))
+    values = np.asarray(values, dtype=float)
+
+    # best[c] is the best value using at most c time steps
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((len(weights), capacity + 1), dtype=bool)
+    for i, weight in enumerate(weights):
+        if weight > capacity or values[i] <= 0:
+            continue
+        candidate = np.full(capacity + 1, -np.inf)
+        candidate[weight:] = best[:capacity + 1 - weight] + values[i]
+        taken[i] = candidate > best
+        best = np.maximum(best, candidate)
+
+    selected = []
+    remaining = capacity
+    for i in range(len(weights) - 1, -1, -1):
+        if taken[i, remaining]:
+            selected.append(i)
+            remaining -= weights[i]
+    return np.array(selected[::-1], dtype=int)
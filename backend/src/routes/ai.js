@@ -2,6 +2,7 @@ const express = require('express');
 const { body, validationResult } = require('express-validator');
 const { createClient } = require('@supabase/supabase-js');
 const axios = require('axios');
+const crypto = require('crypto');
 
 const { logger } = require('../utils/logger');
 const { asyncHandler, validationErrorHandler, APIError } = require('../middleware/errorHandler');
@@ -17,6 +18,23 @@ const supabase = createClient(
 const NUTRITION_AI_URL = process.env.NUTRITION_AI_URL || 'http://localhost:8001';
 const WORKOUT_AI_URL = process.env.WORKOUT_AI_URL || 'http://localhost:8002';
 
+/**
+ * Request id and W3C trace context for calls to the AI services, so their logs
+ * and spans join this request. Incoming X-Request-ID and traceparent headers
+ * are passed on; otherwise they are created once per request, so every AI call
+ * it makes shares one id and one trace.
+ */
+const aiTraceHeaders = (req) => {
+  if (!req.aiTrace) {
+    req.aiTrace = {
+      'x-request-id': req.get('x-request-id') || crypto.randomUUID(),
+      traceparent: req.get('traceparent')
+        || `00-${crypto.randomBytes(16).toString('hex')}-${crypto.randomBytes(8).toString('hex')}-01`
+    };
+  }
+  return req.aiTrace;
+};
+
 // Validation schemas
 const aiRecommendationValidation = [
   body('type').isIn(['workout', 'nutrition', 'general']).withMessage('Invalid recommendation type'),
@@ -38,6 +56,7 @@ router.get('/health',
       // Check Nutrition AI service
       try {
         const nutritionResponse = await axios.get(`${NUTRITION_AI_URL}/health`, {
+          headers: aiTraceHeaders(req),
           timeout: 5000
         });
         healthChecks.nutrition_ai = {
@@ -55,6 +74,7 @@ router.get('/health',
       // Check Workout AI service
       try {
         const workoutResponse = await axios.get(`${WORKOUT_AI_URL}/health`, {
+          headers: aiTraceHeaders(req),
           timeout: 5000
         });
         healthChecks.workout_ai = {
@@ -133,7 +153,9 @@ router.post('/recommendations',
             language: user.language_preference || 'fr'
           };
 
-          const workoutResponse = await axios.post(`${WORKOUT_AI_URL}/workout-recommendations`, userProfile);
+          const workoutResponse = await axios.post(`${WORKOUT_AI_URL}/workout-recommendations`, userProfile, {
+            headers: aiTraceHeaders(req)
+          });
           recommendations.workout = workoutResponse.data;
         } catch (error) {
           logger.error('Error getting workout recommendations:', error);
@@ -161,7 +183,9 @@ router.post('/recommendations',
             language: user.language_preference || 'fr'
           };
 
-          const nutritionResponse = await axios.post(`${NUTRITION_AI_URL}/nutrition-recommendations`, userProfile);
+          const nutritionResponse = await axios.post(`${NUTRITION_AI_URL}/nutrition-recommendations`, userProfile, {
+            headers: aiTraceHeaders(req)
+          });
           recommendations.nutrition = nutritionResponse.data;
         } catch (error) {
           logger.error('Error getting nutrition recommendations:', error);